@@ -0,0 +1,138 @@
+"""
+TheNexusAvenger
+
+Compares parsing, serializing, and writing large difficulty files with the json module and JsonCodec.
+Run from the root of the repository with python -m benchmark.BenchmarkJsonCodec [notes] [repeats].
+"""
+
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from data import JsonCodec
+
+DEFAULT_NOTES = 50000
+DEFAULT_REPEATS = 5
+
+
+def createDifficulty(notes: int) -> dict:
+    """Creates a V2 difficulty with the given amount of notes and similar amounts of events and obstacles.
+
+    :param notes: Amount of notes to create.
+    :return: Data of the difficulty.
+    """
+
+    randomGenerator = random.Random(notes)
+    difficulty = {
+        "_version": "2.2.0",
+        "_notes": [],
+        "_obstacles": [],
+        "_events": [],
+        "_customData": {"_time": 0.0, "_bookmarks": []},
+    }
+    for i in range(notes):
+        difficulty["_notes"].append({
+            "_time": round(i * 0.25 + randomGenerator.random() * 0.1, randomGenerator.choice([3, 6, 15])),
+            "_lineIndex": randomGenerator.randint(0, 3),
+            "_lineLayer": randomGenerator.randint(0, 2),
+            "_type": randomGenerator.randint(0, 1),
+            "_cutDirection": randomGenerator.randint(0, 8),
+        })
+        difficulty["_events"].append({
+            "_time": i * 0.25,
+            "_type": randomGenerator.randint(0, 4),
+            "_value": randomGenerator.randint(0, 7),
+        })
+        if i % 10 == 0:
+            difficulty["_obstacles"].append({
+                "_time": i * 0.25,
+                "_lineIndex": randomGenerator.randint(0, 3),
+                "_type": 0,
+                "_duration": randomGenerator.random() * 4,
+                "_width": 1,
+            })
+    return difficulty
+
+
+class DiscardedFile:
+    def write(self, data: bytes) -> None:
+        """Discards written data.
+
+        :param data: Data to discard.
+        """
+
+        pass
+
+
+def writeWithJson(difficulty: dict, file: DiscardedFile) -> None:
+    """Writes a difficulty the way map files were written with the json module.
+
+    :param difficulty: Difficulty to write.
+    :param file: File to write to.
+    """
+
+    JsonCodec.removeNullValues(difficulty)
+    file.write(json.dumps(difficulty, separators=(",", ":"), ensure_ascii=False).encode("utf8"))
+
+
+def getPeakMemory(function) -> int:
+    """Returns the peak memory allocated while calling a function.
+
+    :param function: Function to call.
+    :return: The peak memory in bytes.
+    """
+
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def timeFunction(function, repeats: int) -> float:
+    """Returns the lowest time of calling a function.
+
+    :param function: Function to time.
+    :param repeats: Amount of times to call the function.
+    :return: The lowest time of the calls in seconds.
+    """
+
+    times = []
+    for _ in range(repeats):
+        startTime = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - startTime)
+    return min(times)
+
+
+if __name__ == "__main__":
+    notes = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NOTES
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_REPEATS
+    difficulty = createDifficulty(notes)
+    encodedDifficulty = json.dumps(difficulty, separators=(",", ":"), ensure_ascii=False).encode("utf8")
+    print("Difficulty with " + str(notes) + " notes (" + str(len(encodedDifficulty)) + " bytes).")
+    print("\tFast JSON library: " + ("orjson" if JsonCodec.orjson is not None else "not installed"))
+
+    # Check the output is the same.
+    if JsonCodec.dumps(difficulty, separators=(",", ":")) != encodedDifficulty:
+        raise AssertionError("JsonCodec output does not match the json module.")
+    if JsonCodec.loads(encodedDifficulty) != json.loads(encodedDifficulty):
+        raise AssertionError("JsonCodec parsed data does not match the json module.")
+    streamedDifficulty = io.BytesIO()
+    JsonCodec.dump(difficulty, streamedDifficulty, separators=(",", ":"), skipNullValues=True)
+    if streamedDifficulty.getvalue() != encodedDifficulty:
+        raise AssertionError("JsonCodec streamed output does not match the json module.")
+
+    # Time parsing and serializing.
+    for name, jsonFunction, codecFunction in [
+        ("Parsing", lambda: json.loads(encodedDifficulty), lambda: JsonCodec.loads(encodedDifficulty)),
+        ("Serializing", lambda: json.dumps(difficulty, separators=(",", ":"), ensure_ascii=False).encode("utf8"), lambda: JsonCodec.dumps(difficulty, separators=(",", ":"))),
+        ("Writing without null values", lambda: writeWithJson(difficulty, DiscardedFile()), lambda: JsonCodec.dump(difficulty, DiscardedFile(), separators=(",", ":"), skipNullValues=True)),
+    ]:
+        jsonTime = timeFunction(jsonFunction, repeats)
+        codecTime = timeFunction(codecFunction, repeats)
+        print("\t" + name + ": json " + str(round(jsonTime * 1000, 1)) + " ms, JsonCodec " + str(round(codecTime * 1000, 1)) + " ms (" + str(round(jsonTime / codecTime, 1)) + "x)")
+        print("\t\tPeak memory: json " + str(getPeakMemory(jsonFunction) // 1024) + " KiB, JsonCodec " + str(getPeakMemory(codecFunction) // 1024) + " KiB")
@@ -0,0 +1,147 @@
+"""
+TheNexusAvenger
+
+Times downloading and processing a library of maps end to end against a local stand-in for BeatSaver and Beat Sage.
+A temporary database is created with the songs, and the library is processed more than once so that
+runs with nothing downloaded and runs with everything up to date are both measured.
+Run from the root of the repository with python -m benchmark.BenchmarkLibrary.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import struct
+import tempfile
+import time
+import wave
+from benchmark.BenchmarkProcessSteps import DEFAULT_RESULTS_PATH, getCommit
+from benchmark.StandInServer import DEFAULT_JOB_DELAY, DEFAULT_NOTES, StandInServer
+from data import Configuration
+from data.Database import Database
+from process.http import BeatSage
+from process.http import BeatSaver
+from process.job.DownloadAndProcessMaps import downloadAndProcessMaps
+
+DEFAULT_BEATSAVER_MAPS = 100
+DEFAULT_BEAT_SAGE_MAPS = 2
+DEFAULT_RUNS = 2
+SONG_SAMPLE_RATE = 22050
+SONG_SECONDS = 20
+SONG_BEATS_PER_MINUTE = 120
+
+
+def writeSongFile(path: str) -> None:
+    """Writes an audio file with a click on every beat for Beat Sage songs.
+    The file is a WAV file, which is decoded the same as the downloaded MP3 files.
+
+    :param path: Path to write the audio file to.
+    """
+
+    samplesPerBeat = round(SONG_SAMPLE_RATE * 60 / SONG_BEATS_PER_MINUTE)
+    samples = bytearray()
+    for i in range(SONG_SAMPLE_RATE * SONG_SECONDS):
+        beatSample = i % samplesPerBeat
+        value = math.sin(beatSample * 0.3) * math.exp(-beatSample / 400) * 20000
+        samples.extend(struct.pack("<h", round(value)))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(SONG_SAMPLE_RATE)
+        file.writeframes(bytes(samples))
+
+
+def createLibrary(database: Database, downloadsPath: str, serverUrl: str, beatSaverMaps: int, beatSageMaps: int) -> None:
+    """Adds the songs of the library to a database.
+    The songs of the Beat Sage maps are written to the downloads since they can't be downloaded from the stand-in.
+
+    :param database: Database to add the songs to.
+    :param downloadsPath: Directory of the downloads.
+    :param serverUrl: Base URL of the stand-in server.
+    :param beatSaverMaps: Amount of BeatSaver maps to add.
+    :param beatSageMaps: Amount of Beat Sage maps to add.
+    """
+
+    for i in range(beatSaverMaps):
+        database.execute("INSERT INTO BeatSaverMaps VALUES (?,?,?,1,?,?,?,NULL);", ["Artist " + str(i), "Song " + str(i), "", i % 2, format(i + 1, "x"), "A" if i % 3 == 0 else None])
+    for i in range(beatSageMaps):
+        songName = "Beat Sage Song " + str(i)
+        database.execute("INSERT INTO BeatSageMaps VALUES (?,?,?,1,1,?,NULL,?,NULL);", ["Beat Sage Artist", songName, "", "https://www.youtube.com/watch?v=" + str(i), serverUrl + "/covers/" + str(i) + ".png"])
+        writeSongFile(os.path.join(downloadsPath, "Songs", "Beat Sage Artist - " + songName + ".mp3"))
+    database.commit()
+
+
+if __name__ == "__main__":
+    # Parse the arguments.
+    parser = argparse.ArgumentParser(description="Times downloading and processing a library of maps against a local stand-in for BeatSaver and Beat Sage.")
+    parser.add_argument("--beatsaver-maps", type=int, default=DEFAULT_BEATSAVER_MAPS, help="Amount of BeatSaver maps in the library.")
+    parser.add_argument("--beatsage-maps", type=int, default=DEFAULT_BEAT_SAGE_MAPS, help="Amount of Beat Sage maps in the library.")
+    parser.add_argument("--notes", type=int, default=DEFAULT_NOTES, help="Amount of notes in each difficulty of the maps.")
+    parser.add_argument("--job-delay", type=float, default=DEFAULT_JOB_DELAY, help="Time in seconds for Beat Sage jobs to complete.")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Maximum BeatSaver API requests per second before rate limit responses are returned. 0 disables the rate limit.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Amount of times to process the library.")
+    parser.add_argument("--output", default=None, help="File to write the results to. Defaults to a timestamped file in maps/Benchmarks.")
+    arguments = parser.parse_args()
+
+    # Start the stand-in server.
+    server = StandInServer(arguments.notes, arguments.job_delay, arguments.rate_limit)
+    serverUrl = server.start()
+    BeatSaver.BEATSAVER_API_URL = serverUrl
+    BeatSage.BEAT_SAGE_URL = serverUrl
+    print("Started the stand-in server at " + serverUrl)
+
+    # Create the library and process it.
+    runResults = []
+    with tempfile.TemporaryDirectory() as workingDirectory:
+        downloadsPath = os.path.join(workingDirectory, "Downloads")
+        database = Database(os.path.join(workingDirectory, "database.sqlite"))
+        try:
+            createLibrary(database, downloadsPath, serverUrl, arguments.beatsaver_maps, arguments.beatsage_maps)
+            totalMaps = (arguments.beatsaver_maps if Configuration.sourceEnabled("BeatSaver") else 0) + (arguments.beatsage_maps if Configuration.sourceEnabled("BeatSage") else 0)
+            for run in range(arguments.runs):
+                print("Run " + str(run + 1) + " of " + str(arguments.runs))
+                startTime = time.perf_counter()
+                stageTimes = downloadAndProcessMaps(database, downloadsPath, os.path.join(workingDirectory, "Maps"))
+                totalTime = time.perf_counter() - startTime
+                runResults.append({
+                    "TotalTime": totalTime,
+                    "MapsPerSecond": totalMaps / totalTime,
+                    "StageTimes": stageTimes,
+                })
+        finally:
+            database.close()
+            server.stop()
+
+    # Print the results.
+    print("Results:")
+    for run, runResult in enumerate(runResults):
+        print("\tRun " + str(run + 1) + ": " + str(round(runResult["TotalTime"], 2)) + " seconds (" + str(round(runResult["MapsPerSecond"], 2)) + " maps per second)")
+        for stageName, stageTime in runResult["StageTimes"].items():
+            print("\t\t" + stageName + ": " + str(round(stageTime, 2)) + " seconds")
+    print("\tRequests: " + ", ".join(name + " " + str(count) for name, count in sorted(server.requestCounts.items())))
+
+    # Write the results.
+    outputPath = arguments.output
+    if outputPath is None:
+        outputPath = os.path.join(DEFAULT_RESULTS_PATH, "Library-" + time.strftime("%Y%m%d-%H%M%S") + ".json")
+    if os.path.dirname(outputPath) != "" and not os.path.exists(os.path.dirname(outputPath)):
+        os.makedirs(os.path.dirname(outputPath))
+    with open(outputPath, "w") as file:
+        file.write(json.dumps({
+            "Time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "Commit": getCommit(),
+            "Python": platform.python_version(),
+            "Platform": platform.platform(),
+            "BeatSaverMaps": arguments.beatsaver_maps,
+            "BeatSageMaps": arguments.beatsage_maps,
+            "Notes": arguments.notes,
+            "JobDelay": arguments.job_delay,
+            "RateLimit": arguments.rate_limit,
+            "ProcessingJobs": Configuration.getConfiguration("ProcessingJobs", 1),
+            "BeatSaverDownloadWorkers": Configuration.getConfiguration("BeatSaverDownloadWorkers", BeatSaver.DEFAULT_DOWNLOAD_WORKERS),
+            "Runs": runResults,
+            "Requests": server.requestCounts,
+        }, indent=4))
+    print("Wrote results to " + outputPath)
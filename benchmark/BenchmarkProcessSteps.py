@@ -0,0 +1,197 @@
+"""
+TheNexusAvenger
+
+Times loading, each processing step, and writing of synthetic maps across size tiers.
+The results are written as JSON so that runs can be compared.
+Run from the root of the repository with python -m benchmark.BenchmarkProcessSteps.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from benchmark import SyntheticMaps
+from contextlib import redirect_stdout
+from data.MapFileSet import loadMap
+from data.Song import Song
+from process.ProcessMap import BEATSAVER_PROCESS_STEPS
+from typing import Dict, List, Optional
+
+DEFAULT_REPEATS = 3
+DEFAULT_RESULTS_PATH = os.path.realpath(os.path.join(__file__, "..", "..", "maps", "Benchmarks"))
+SIZE_TIERS = {
+    "Small": {"Notes": 500, "Events": 0, "Difficulties": 2},
+    "Medium": {"Notes": 2000, "Events": 2000, "Difficulties": 4},
+    "Large": {"Notes": 10000, "Events": 0, "Difficulties": 5},
+}
+CONTAINERS = ["Zip", "Directory"]
+
+
+def getCommit() -> Optional[str]:
+    """Returns the current git commit of the repository.
+
+    :return: The commit hash, or None if it could not be determined.
+    """
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(__file__), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timeMap(song: Song, outputDirectory: str, repeats: int) -> Dict[str, List[float]]:
+    """Times loading, processing, and writing a map.
+    The steps are run in order on the same map so each step sees the changes of the previous steps.
+
+    :param song: Song of the map to time.
+    :param outputDirectory: Directory to write the processed map to.
+    :param repeats: Amount of times to process the map.
+    :return: The times of each operation in seconds.
+    """
+
+    operationTimes = {}
+
+    def recordTime(name: str, startTime: float) -> None:
+        """Records the time of an operation.
+
+        :param name: Name of the operation.
+        :param startTime: Time the operation started.
+        """
+
+        if name not in operationTimes.keys():
+            operationTimes[name] = []
+        operationTimes[name].append(time.perf_counter() - startTime)
+
+    for _ in range(repeats):
+        if os.path.exists(outputDirectory):
+            shutil.rmtree(outputDirectory)
+        with redirect_stdout(io.StringIO()):
+            # Load the map.
+            startTime = time.perf_counter()
+            mapFiles = loadMap(song, outputDirectory)
+            recordTime("loadMap", startTime)
+
+            # Run the steps.
+            for processStep in BEATSAVER_PROCESS_STEPS:
+                startTime = time.perf_counter()
+                processStep(mapFiles)
+                recordTime(processStep.name, startTime)
+
+            # Write the map as a new map.
+            startTime = time.perf_counter()
+            mapFiles.write(True)
+            recordTime("write", startTime)
+
+            # Write the map again over the unchanged output.
+            mapFiles.fileRecords = mapFiles.writtenFileRecords
+            startTime = time.perf_counter()
+            mapFiles.write(True)
+            recordTime("writeUnchanged", startTime)
+            mapFiles.close()
+    return operationTimes
+
+
+def runBenchmarks(tiers: List[str], formatVersions: List[str], containers: List[str], repeats: int) -> List[dict]:
+    """Runs the benchmarks for the combinations of tiers, formats, and containers.
+
+    :param tiers: Names of the size tiers to run.
+    :param formatVersions: Map formats to run.
+    :param containers: Containers of the maps to run (Zip or Directory).
+    :param repeats: Amount of times to process each map.
+    :return: The results of the benchmarks.
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as workingDirectory:
+        for tierName in tiers:
+            tier = SIZE_TIERS[tierName]
+            for formatVersion in formatVersions:
+                for container in containers:
+                    # Create the map.
+                    song = SyntheticMaps.createSong(os.path.join(workingDirectory, "Downloads"), formatVersion, tier["Notes"], tier["Events"], tier["Difficulties"], container == "Zip", len(results) + 1)
+                    print(tierName + " " + formatVersion + " " + container + " (" + str(tier["Notes"]) + " notes, " + str(tier["Events"]) + " events, " + str(tier["Difficulties"]) + " difficulties)")
+
+                    # Time the map.
+                    operationTimes = timeMap(song, os.path.join(workingDirectory, "Output"), repeats)
+                    timings = {}
+                    for name, times in operationTimes.items():
+                        timings[name] = {
+                            "Minimum": min(times) * 1000,
+                            "Median": statistics.median(times) * 1000,
+                            "Mean": statistics.mean(times) * 1000,
+                        }
+                        print("\t" + name + ": " + str(round(timings[name]["Median"], 2)) + " ms")
+                    results.append({
+                        "Tier": tierName,
+                        "Format": formatVersion,
+                        "Container": container,
+                        "Notes": tier["Notes"],
+                        "Events": tier["Events"],
+                        "Difficulties": tier["Difficulties"],
+                        "Timings": timings,
+                    })
+    return results
+
+
+def compareResults(results: List[dict], previousResults: List[dict]) -> None:
+    """Prints the change of the median times from previous results.
+
+    :param results: Results of the current run.
+    :param previousResults: Results of the previous run.
+    """
+
+    previousTimings = {}
+    for result in previousResults:
+        previousTimings[(result["Tier"], result["Format"], result["Container"])] = result["Timings"]
+    print("Change from the previous results (previous median / current median):")
+    for result in results:
+        key = (result["Tier"], result["Format"], result["Container"])
+        if key not in previousTimings.keys():
+            continue
+        print("\t" + " ".join(key))
+        for name, timing in result["Timings"].items():
+            if name in previousTimings[key].keys() and timing["Median"] > 0:
+                print("\t\t" + name + ": " + str(round(previousTimings[key][name]["Median"] / timing["Median"], 2)) + "x")
+
+
+if __name__ == "__main__":
+    # Parse the arguments.
+    parser = argparse.ArgumentParser(description="Times loading, each processing step, and writing of synthetic maps.")
+    parser.add_argument("--tiers", default=",".join(SIZE_TIERS.keys()), help="Size tiers to run (" + ", ".join(SIZE_TIERS.keys()) + ").")
+    parser.add_argument("--formats", default=",".join(SyntheticMaps.FORMAT_VERSIONS), help="Map formats to run (" + ", ".join(SyntheticMaps.FORMAT_VERSIONS) + ").")
+    parser.add_argument("--containers", default=",".join(CONTAINERS), help="Containers of the maps to run (" + ", ".join(CONTAINERS) + ").")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Amount of times to process each map.")
+    parser.add_argument("--output", default=None, help="File to write the results to. Defaults to a timestamped file in maps/Benchmarks.")
+    parser.add_argument("--compare", default=None, help="Results file of a previous run to compare against.")
+    arguments = parser.parse_args()
+
+    # Run the benchmarks.
+    benchmarkResults = runBenchmarks(arguments.tiers.split(","), arguments.formats.split(","), arguments.containers.split(","), arguments.repeats)
+
+    # Write the results.
+    outputPath = arguments.output
+    if outputPath is None:
+        outputPath = os.path.join(DEFAULT_RESULTS_PATH, "ProcessSteps-" + time.strftime("%Y%m%d-%H%M%S") + ".json")
+    if os.path.dirname(outputPath) != "" and not os.path.exists(os.path.dirname(outputPath)):
+        os.makedirs(os.path.dirname(outputPath))
+    with open(outputPath, "w") as file:
+        file.write(json.dumps({
+            "Time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "Commit": getCommit(),
+            "Python": platform.python_version(),
+            "Platform": platform.platform(),
+            "Repeats": arguments.repeats,
+            "Results": benchmarkResults,
+        }, indent=4))
+    print("Wrote results to " + outputPath)
+
+    # Compare the results.
+    if arguments.compare is not None:
+        with open(arguments.compare) as file:
+            compareResults(benchmarkResults, json.loads(file.read())["Results"])
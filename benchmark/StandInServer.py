@@ -0,0 +1,285 @@
+"""
+TheNexusAvenger
+
+Local HTTP server that stands in for the BeatSaver and Beat Sage endpoints used by process/http.
+Maps are generated with SyntheticMaps, and Beat Sage jobs complete after a delay.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from benchmark import SyntheticMaps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Dict, List, Optional
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+DEFAULT_JOB_DELAY = 2
+DEFAULT_NOTES = 1000
+COVER_IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(1024)
+
+
+class StandInServer:
+    def __init__(self, notes: int = DEFAULT_NOTES, jobDelay: float = DEFAULT_JOB_DELAY, rateLimitRequests: int = 0, rateLimitWindow: float = 1, missingMapIds: Optional[List[str]] = None, rateLimitDownloads: bool = False):
+        """Creates the stand-in server.
+
+        :param notes: Amount of notes in each difficulty of the served maps.
+        :param jobDelay: Time in seconds before a Beat Sage job is complete.
+        :param rateLimitRequests: Maximum amount of BeatSaver API requests in each rate limit window. 0 disables the rate limit.
+        :param rateLimitWindow: Length of the rate limit window in seconds.
+        :param missingMapIds: Ids of BeatSaver maps that are not found, like deleted maps.
+        :param rateLimitDownloads: Whether the BeatSaver downloads also count towards the rate limit.
+        """
+
+        self.notes = notes
+        self.jobDelay = jobDelay
+        self.rateLimitRequests = rateLimitRequests
+        self.rateLimitWindow = rateLimitWindow
+        self.missingMapIds = set(mapId.lower() for mapId in (missingMapIds or []))
+        self.rateLimitDownloads = rateLimitDownloads
+        self.lock = threading.Lock()
+        self.mapArchives = {}
+        self.beatSageJobs = {}
+        self.rateLimitWindowStart = 0
+        self.rateLimitWindowRequests = 0
+        self.requestCounts = {}
+        self.httpServer = None
+        self.thread = None
+
+    def start(self) -> str:
+        """Starts the server on a free local port.
+
+        :return: The base URL of the server.
+        """
+
+        standInServer = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                """Handles a GET request.
+                """
+
+                standInServer.handleGet(self)
+
+            def do_POST(self) -> None:
+                """Handles a POST request.
+                """
+
+                standInServer.handlePost(self)
+
+            def log_message(self, format: str, *args) -> None:
+                """Hides the log of the requests.
+                """
+
+                pass
+
+        self.httpServer = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self.httpServer.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpServer.serve_forever, daemon=True)
+        self.thread.start()
+        return self.getUrl()
+
+    def stop(self) -> None:
+        """Stops the server.
+        """
+
+        self.httpServer.shutdown()
+        self.httpServer.server_close()
+
+    def getUrl(self) -> str:
+        """Returns the base URL of the server.
+
+        :return: The base URL of the server.
+        """
+
+        return "http://127.0.0.1:" + str(self.httpServer.server_address[1])
+
+    def getMapArchive(self, mapId: str, formatVersion: str = "V2") -> bytes:
+        """Returns the ZIP file of a map, creating it the first time it is requested.
+
+        :param mapId: Id of the map.
+        :param formatVersion: Format of the map when it is created.
+        :return: The contents of the ZIP file.
+        """
+
+        with self.lock:
+            if mapId not in self.mapArchives.keys():
+                mapFiles = SyntheticMaps.createMapFiles(formatVersion, "Song " + mapId, self.notes, self.notes, 2, int(hashlib.sha1(mapId.encode()).hexdigest()[:8], 16))
+                archive = BytesIO()
+                with ZipFile(archive, "w") as file:
+                    for fileName, fileData in mapFiles.items():
+                        file.writestr(ZipInfo(fileName, SyntheticMaps.ZIP_FILE_TIME), fileData, ZIP_DEFLATED)
+                self.mapArchives[mapId] = archive.getvalue()
+            return self.mapArchives[mapId]
+
+    def getMapData(self, mapId: str) -> dict:
+        """Returns the BeatSaver map information of a map.
+
+        :param mapId: Id of the map.
+        :return: The map information.
+        """
+
+        mapArchive = self.getMapArchive(mapId)
+        return {
+            "id": mapId,
+            "versions": [{
+                "hash": hashlib.sha1(mapArchive).hexdigest(),
+                "downloadURL": self.getUrl() + "/download/" + mapId + ".zip",
+            }],
+        }
+
+    def countRequest(self, name: str) -> None:
+        """Counts a request to an endpoint.
+
+        :param name: Name of the endpoint.
+        """
+
+        with self.lock:
+            self.requestCounts[name] = self.requestCounts.get(name, 0) + 1
+
+    def getRateLimitResetAfter(self) -> Optional[int]:
+        """Counts a BeatSaver API request against the rate limit.
+
+        :return: The time in milliseconds until the rate limit resets if the request is rate limited, or None if it is allowed.
+        """
+
+        if self.rateLimitRequests <= 0:
+            return None
+        with self.lock:
+            currentTime = time.monotonic()
+            if currentTime - self.rateLimitWindowStart >= self.rateLimitWindow:
+                self.rateLimitWindowStart = currentTime
+                self.rateLimitWindowRequests = 0
+            self.rateLimitWindowRequests += 1
+            if self.rateLimitWindowRequests <= self.rateLimitRequests:
+                return None
+            return round((self.rateLimitWindow - (currentTime - self.rateLimitWindowStart)) * 1000)
+
+    def sendResponse(self, request: BaseHTTPRequestHandler, data: bytes, contentType: str, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        """Sends a response to a request.
+
+        :param request: Request to respond to.
+        :param data: Body of the response.
+        :param contentType: Content type of the response.
+        :param status: Status code of the response.
+        :param headers: Additional headers of the response.
+        """
+
+        request.send_response(status)
+        request.send_header("Content-Type", contentType)
+        request.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def sendFile(self, request: BaseHTTPRequestHandler, data: bytes, contentType: str) -> None:
+        """Sends a file, supporting Range and If-Range requests for resumed downloads.
+
+        :param request: Request to respond to.
+        :param data: Contents of the file.
+        :param contentType: Content type of the file.
+        """
+
+        eTag = "\"" + hashlib.sha1(data).hexdigest() + "\""
+        rangeMatch = re.match(r"bytes=(\d+)-$", request.headers.get("Range", ""))
+        if rangeMatch is None or request.headers.get("If-Range", eTag) != eTag:
+            self.sendResponse(request, data, contentType, headers={"ETag": eTag})
+            return
+        startByte = int(rangeMatch.group(1))
+        if startByte >= len(data):
+            self.sendResponse(request, b"", contentType, 416, {"Content-Range": "bytes */" + str(len(data))})
+            return
+        self.sendResponse(request, data[startByte:], contentType, 206, {"Content-Range": "bytes " + str(startByte) + "-" + str(len(data) - 1) + "/" + str(len(data)), "ETag": eTag})
+
+    def handleGet(self, request: BaseHTTPRequestHandler) -> None:
+        """Handles a GET request.
+
+        :param request: Request to handle.
+        """
+
+        # Handle the BeatSaver API requests.
+        path = request.path.split("?")[0]
+        if path.startswith("/maps/"):
+            self.countRequest("BeatSaverApi")
+            resetAfter = self.getRateLimitResetAfter()
+            if resetAfter is not None:
+                self.countRequest("BeatSaverRateLimited")
+                self.sendResponse(request, json.dumps({"identifier": "RATE_LIMIT_EXCEEDED", "resetAfter": resetAfter}).encode(), "application/json", 429)
+            elif path.startswith("/maps/ids/"):
+                mapIds = path[len("/maps/ids/"):].split(",")
+                if any(mapId.lower() in self.missingMapIds for mapId in mapIds):
+                    self.sendResponse(request, b"{\"error\":\"Not Found\"}", "application/json", 404)
+                    return
+                if len(mapIds) == 1:
+                    responseData = self.getMapData(mapIds[0])
+                else:
+                    responseData = {mapId: self.getMapData(mapId) for mapId in mapIds}
+                self.sendResponse(request, json.dumps(responseData).encode(), "application/json")
+            elif path.startswith("/maps/id/"):
+                if path[len("/maps/id/"):].lower() in self.missingMapIds:
+                    self.sendResponse(request, b"{\"error\":\"Not Found\"}", "application/json", 404)
+                    return
+                self.sendResponse(request, json.dumps(self.getMapData(path[len("/maps/id/"):])).encode(), "application/json")
+            else:
+                self.sendResponse(request, b"{}", "application/json", 404)
+            return
+
+        # Handle the BeatSaver downloads.
+        if path.startswith("/download/") and path.endswith(".zip"):
+            self.countRequest("BeatSaverDownload")
+            resetAfter = self.getRateLimitResetAfter() if self.rateLimitDownloads else None
+            if resetAfter is not None:
+                self.countRequest("BeatSaverRateLimited")
+                self.sendResponse(request, json.dumps({"identifier": "RATE_LIMIT_EXCEEDED", "resetAfter": resetAfter}).encode(), "application/json", 429)
+                return
+            if path[len("/download/"):-len(".zip")].lower() in self.missingMapIds:
+                self.sendResponse(request, b"", "text/plain", 404)
+                return
+            self.sendFile(request, self.getMapArchive(path[len("/download/"):-len(".zip")]), "application/zip")
+            return
+
+        # Handle the covers.
+        if path.startswith("/covers/"):
+            self.countRequest("Cover")
+            self.sendFile(request, COVER_IMAGE, "image/png")
+            return
+
+        # Handle polling Beat Sage jobs.
+        if path.startswith("/beatsaber_custom_level_download/"):
+            self.countRequest("BeatSagePoll")
+            jobId = path[len("/beatsaber_custom_level_download/"):]
+            with self.lock:
+                submitTime = self.beatSageJobs.get(jobId)
+            if submitTime is None:
+                self.sendResponse(request, b"{\"detail\":\"Not found.\"}", "application/json", 404)
+            elif time.monotonic() - submitTime < self.jobDelay:
+                self.sendResponse(request, b"{\"status\":\"PENDING\"}", "application/json")
+            else:
+                self.sendResponse(request, self.getMapArchive("BeatSage-" + jobId), "application/octet-stream")
+            return
+        self.sendResponse(request, b"", "text/plain", 404)
+
+    def handlePost(self, request: BaseHTTPRequestHandler) -> None:
+        """Handles a POST request.
+
+        :param request: Request to handle.
+        """
+
+        # Read the body.
+        remainingBytes = int(request.headers.get("Content-Length", "0"))
+        while remainingBytes > 0:
+            remainingBytes -= len(request.rfile.read(min(remainingBytes, 64 * 1024)))
+
+        # Handle creating Beat Sage jobs.
+        if request.path == "/beatsaber_custom_level_create":
+            self.countRequest("BeatSageCreate")
+            jobId = str(uuid.uuid4())
+            with self.lock:
+                self.beatSageJobs[jobId] = time.monotonic()
+            self.sendResponse(request, json.dumps({"id": jobId}).encode(), "application/json")
+            return
+        self.sendResponse(request, b"", "text/plain", 404)
@@ -0,0 +1,294 @@
+"""
+TheNexusAvenger
+
+Generates deterministic synthetic maps for benchmarking.
+Maps can be created with the V2, V3, and V4 formats as ZIP files or directories.
+"""
+
+import json
+import os
+import random
+from data.Song import Song
+from typing import Dict, List
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+FORMAT_VERSIONS = ["V2", "V3", "V4"]
+DIFFICULTIES = [
+    ("Easy", 1, 10),
+    ("Normal", 3, 12),
+    ("Hard", 5, 14),
+    ("Expert", 7, 16),
+    ("ExpertPlus", 9, 22),
+]
+BEATS_PER_MINUTE = 128
+COVER_FILE_SIZE = 20000
+SONG_FILE_SIZE = 500000
+# Modified time of the files in ZIP files, which is fixed so the files are identical for the same seed.
+ZIP_FILE_TIME = (2020, 1, 1, 0, 0, 0)
+
+
+def createDifficulty(formatVersion: str, notes: int, events: int, seed: int) -> Dict[str, dict]:
+    """Creates the files of a difficulty.
+    V4 difficulties also create a lightshow file with the events.
+
+    :param formatVersion: Format of the difficulty (V2, V3, or V4).
+    :param notes: Amount of notes to create.
+    :param events: Amount of light events to create.
+    :param seed: Seed of the random values.
+    :return: Data of the difficulty files, keyed by "Beatmap" and "Lightshow".
+    """
+
+    # Create the objects.
+    # Notes are spread over the song with some notes at the same time, and obstacles are added every 20 notes.
+    randomGenerator = random.Random(seed)
+    noteTimes = []
+    currentTime = 4.0
+    for _ in range(notes):
+        currentTime += randomGenerator.choice([0, 0.25, 0.5, 0.5, 1])
+        noteTimes.append(currentTime)
+    noteData = [(noteTime, randomGenerator.randint(0, 3), randomGenerator.randint(0, 2), randomGenerator.randint(0, 1), randomGenerator.randint(0, 8)) for noteTime in noteTimes]
+    eventData = [(4.0 + i * 0.5, randomGenerator.randint(0, 4), randomGenerator.choice([0, 1, 3, 5, 7])) for i in range(events)]
+    obstacleData = [(noteTimes[i], randomGenerator.choice([0, 3]), randomGenerator.choice([0.5, 1, 2]), 1) for i in range(0, notes, 20)]
+
+    # Create the files for the format.
+    if formatVersion == "V2":
+        return {
+            "Beatmap": {
+                "_version": "2.2.0",
+                "_notes": [{"_time": time, "_lineIndex": lineIndex, "_lineLayer": lineLayer, "_type": noteType, "_cutDirection": cutDirection} for time, lineIndex, lineLayer, noteType, cutDirection in noteData],
+                "_obstacles": [{"_time": time, "_lineIndex": lineIndex, "_type": 0, "_duration": duration, "_width": width} for time, lineIndex, duration, width in obstacleData],
+                "_events": [{"_time": time, "_type": eventType, "_value": value} for time, eventType, value in eventData],
+                "_waypoints": [],
+                "_customData": {"_time": 0, "_bookmarks": []},
+            },
+        }
+    elif formatVersion == "V3":
+        return {
+            "Beatmap": {
+                "version": "3.3.0",
+                "bpmEvents": [],
+                "rotationEvents": [],
+                "colorNotes": [{"b": time, "x": lineIndex, "y": lineLayer, "a": 0, "c": noteType, "d": cutDirection} for time, lineIndex, lineLayer, noteType, cutDirection in noteData],
+                "bombNotes": [],
+                "obstacles": [{"b": time, "x": lineIndex, "y": 0, "d": duration, "w": width, "h": 5} for time, lineIndex, duration, width in obstacleData],
+                "sliders": [],
+                "burstSliders": [],
+                "waypoints": [],
+                "basicBeatmapEvents": [{"b": time, "et": eventType, "i": value, "f": 1} for time, eventType, value in eventData],
+                "colorBoostBeatmapEvents": [],
+                "lightColorEventBoxGroups": [],
+                "lightRotationEventBoxGroups": [],
+                "lightTranslationEventBoxGroups": [],
+                "basicEventTypesWithKeywords": {},
+                "useNormalEventsAsCompatibleEvents": True,
+            },
+        }
+    elif formatVersion == "V4":
+        # V4 objects store the values in separate lists that are referenced by index.
+        noteValues = sorted(set((lineIndex, lineLayer, noteType, cutDirection) for _, lineIndex, lineLayer, noteType, cutDirection in noteData))
+        noteIndices = {value: i for i, value in enumerate(noteValues)}
+        obstacleValues = sorted(set((lineIndex, duration, width) for _, lineIndex, duration, width in obstacleData))
+        obstacleIndices = {value: i for i, value in enumerate(obstacleValues)}
+        eventValues = sorted(set((eventType, value) for _, eventType, value in eventData))
+        eventIndices = {value: i for i, value in enumerate(eventValues)}
+        return {
+            "Beatmap": {
+                "version": "4.0.0",
+                "colorNotes": [{"b": time, "r": 0, "i": noteIndices[(lineIndex, lineLayer, noteType, cutDirection)]} for time, lineIndex, lineLayer, noteType, cutDirection in noteData],
+                "colorNotesData": [{"x": lineIndex, "y": lineLayer, "c": noteType, "d": cutDirection, "a": 0} for lineIndex, lineLayer, noteType, cutDirection in noteValues],
+                "bombNotes": [],
+                "bombNotesData": [],
+                "obstacles": [{"b": time, "r": 0, "i": obstacleIndices[(lineIndex, duration, width)]} for time, lineIndex, duration, width in obstacleData],
+                "obstaclesData": [{"d": duration, "x": lineIndex, "y": 0, "w": width, "h": 5} for lineIndex, duration, width in obstacleValues],
+                "arcs": [],
+                "arcsData": [],
+                "chains": [],
+                "chainsData": [],
+                "spawnRotations": [],
+                "spawnRotationsData": [],
+            },
+            "Lightshow": {
+                "version": "4.0.0",
+                "waypoints": [],
+                "waypointsData": [],
+                "basicEvents": [{"b": time, "i": eventIndices[(eventType, value)]} for time, eventType, value in eventData],
+                "basicEventsData": [{"t": eventType, "i": value, "f": 1} for eventType, value in eventValues],
+                "colorBoostEvents": [],
+                "colorBoostEventsData": [],
+                "eventBoxGroups": [],
+                "indexFilters": [],
+                "lightColorEventBoxes": [],
+                "lightColorEvents": [],
+                "lightRotationEventBoxes": [],
+                "lightRotationEvents": [],
+                "lightTranslationEventBoxes": [],
+                "lightTranslationEvents": [],
+                "fxEventBoxes": [],
+                "floatFxEvents": [],
+                "basicEventTypesWithKeywords": {},
+                "useNormalEventsAsCompatibleEvents": True,
+            },
+        }
+    raise ValueError("Unsupported map format " + formatVersion + ".")
+
+
+def createMapFiles(formatVersion: str, songName: str, notes: int, events: int, difficulties: int, seed: int) -> Dict[str, bytes]:
+    """Creates the files of a map.
+
+    :param formatVersion: Format of the map (V2, V3, or V4).
+    :param songName: Name of the song of the map.
+    :param notes: Amount of notes in each difficulty.
+    :param events: Amount of light events in each difficulty.
+    :param difficulties: Amount of difficulties to create, from 1 to 5.
+    :param seed: Seed of the random values.
+    :return: Contents of the files of the map, keyed by the file name.
+    """
+
+    if difficulties < 1 or difficulties > len(DIFFICULTIES):
+        raise ValueError("Amount of difficulties must be between 1 and " + str(len(DIFFICULTIES)) + ".")
+
+    # Create the difficulty files.
+    mapFiles = {}
+    difficultyBeatmaps = []
+    for i, (difficultyName, difficultyRank, noteJumpMovementSpeed) in enumerate(DIFFICULTIES[-difficulties:]):
+        difficultyFiles = createDifficulty(formatVersion, notes, events, seed * len(DIFFICULTIES) + i)
+        mapFiles[difficultyName + "Standard.dat"] = difficultyFiles["Beatmap"]
+        if "Lightshow" in difficultyFiles.keys():
+            mapFiles[difficultyName + "Lightshow.dat"] = difficultyFiles["Lightshow"]
+        difficultyBeatmaps.append((difficultyName, difficultyRank, noteJumpMovementSpeed))
+
+    # Create the info file.
+    if formatVersion == "V4":
+        mapFiles["BPMInfo.dat"] = {
+            "version": "4.0.0",
+            "songChecksum": "",
+            "songSampleCount": 0,
+            "songFrequency": 44100,
+            "bpmData": [],
+            "lufsData": [],
+        }
+        mapFiles["Info.dat"] = {
+            "version": "4.0.0",
+            "song": {"title": songName, "subTitle": "", "author": "Synthetic Artist"},
+            "audio": {"songFilename": "song.ogg", "songDuration": 180, "audioDataFilename": "BPMInfo.dat", "bpm": BEATS_PER_MINUTE, "lufs": 0, "previewStartTime": 12, "previewDuration": 10},
+            "songPreviewFilename": "song.ogg",
+            "coverImageFilename": "cover.jpg",
+            "environmentNames": ["DefaultEnvironment"],
+            "colorSchemes": [],
+            "difficultyBeatmaps": [{
+                "characteristic": "Standard",
+                "difficulty": difficultyName,
+                "beatmapAuthors": {"mappers": ["Synthetic Mapper"], "lighters": []},
+                "environmentNameIdx": 0,
+                "beatmapColorSchemeIdx": 0,
+                "noteJumpMovementSpeed": noteJumpMovementSpeed,
+                "noteJumpStartBeatOffset": 0,
+                "lightshowDataFilename": difficultyName + "Lightshow.dat",
+                "beatmapDataFilename": difficultyName + "Standard.dat",
+            } for difficultyName, difficultyRank, noteJumpMovementSpeed in difficultyBeatmaps],
+            "customData": {},
+        }
+    else:
+        mapFiles["Info.dat"] = {
+            "_version": "2.1.0",
+            "_songName": songName,
+            "_songSubName": "",
+            "_songAuthorName": "Synthetic Artist",
+            "_levelAuthorName": "Synthetic Mapper",
+            "_beatsPerMinute": BEATS_PER_MINUTE,
+            "_songTimeOffset": 0,
+            "_shuffle": 0,
+            "_shufflePeriod": 0.5,
+            "_previewStartTime": 12,
+            "_previewDuration": 10,
+            "_songFilename": "song.ogg",
+            "_coverImageFilename": "cover.jpg",
+            "_environmentName": "DefaultEnvironment",
+            "_allDirectionsEnvironmentName": "GlassDesertEnvironment",
+            "_difficultyBeatmapSets": [{
+                "_beatmapCharacteristicName": "Standard",
+                "_difficultyBeatmaps": [{
+                    "_difficulty": difficultyName,
+                    "_difficultyRank": difficultyRank,
+                    "_beatmapFilename": difficultyName + "Standard.dat",
+                    "_noteJumpMovementSpeed": noteJumpMovementSpeed,
+                    "_noteJumpStartBeatOffset": 0,
+                    "_customData": {"_difficultyLabel": ""},
+                } for difficultyName, difficultyRank, noteJumpMovementSpeed in difficultyBeatmaps],
+            }],
+        }
+
+    # Serialize the files and add the cover and song.
+    randomGenerator = random.Random(seed)
+    serializedFiles = {}
+    for fileName, fileData in mapFiles.items():
+        serializedFiles[fileName] = json.dumps(fileData, indent=(4 if fileName == "Info.dat" else None)).encode("utf8")
+    serializedFiles["cover.jpg"] = randomGenerator.randbytes(COVER_FILE_SIZE)
+    serializedFiles["song.ogg"] = randomGenerator.randbytes(SONG_FILE_SIZE)
+    return serializedFiles
+
+
+def writeMap(mapFiles: Dict[str, bytes], path: str, asZip: bool) -> None:
+    """Writes the files of a map.
+
+    :param mapFiles: Contents of the files of the map, keyed by the file name.
+    :param path: Path of the ZIP file or directory to write.
+    :param asZip: Whether to write the map as a ZIP file instead of a directory.
+    """
+
+    if asZip:
+        with ZipFile(path, "w") as file:
+            for fileName, fileData in mapFiles.items():
+                file.writestr(ZipInfo(fileName, ZIP_FILE_TIME), fileData, ZIP_DEFLATED)
+    else:
+        os.makedirs(path, exist_ok=True)
+        for fileName, fileData in mapFiles.items():
+            with open(os.path.join(path, fileName), "wb") as file:
+                file.write(fileData)
+
+
+def createSong(directory: str, formatVersion: str, notes: int, events: int, difficulties: int, asZip: bool, seed: int = 0) -> Song:
+    """Creates a synthetic map and the song entry for it.
+    The map is downloaded from BeatSaver for ZIP files and Beat Sage for directories.
+
+    :param directory: Directory to write the map to.
+    :param formatVersion: Format of the map (V2, V3, or V4).
+    :param notes: Amount of notes in each difficulty.
+    :param events: Amount of light events in each difficulty.
+    :param difficulties: Amount of difficulties to create, from 1 to 5.
+    :param asZip: Whether to write the map as a ZIP file instead of a directory.
+    :param seed: Seed of the random values.
+    :return: The song entry of the map.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    song = Song()
+    song.mapSource = "BeatSaver" if asZip else "BeatSage"
+    song.artist = "Synthetic Artist"
+    song.songName = "Synthetic " + formatVersion + " " + str(notes) + " Notes"
+    song.songSubName = str(seed)
+    song.validated = True
+    song.subjectiveQualityRating = "A"
+    if asZip:
+        song.beatSaverKey = format(seed, "x")
+        song.mapDownloadPath = os.path.join(directory, song.getSongName(True) + " [BeatSaver " + song.beatSaverKey + "].zip")
+    else:
+        song.mapDownloadPath = os.path.join(directory, song.getSongName(True))
+    writeMap(createMapFiles(formatVersion, song.songName, notes, events, difficulties, seed), song.mapDownloadPath, asZip)
+    return song
+
+
+def createSongs(directory: str, count: int, formatVersions: List[str] = FORMAT_VERSIONS, notes: int = 1000, events: int = 0, difficulties: int = 3, asZip: bool = True) -> List[Song]:
+    """Creates multiple synthetic maps, cycling through the map formats.
+
+    :param directory: Directory to write the maps to.
+    :param count: Amount of maps to create.
+    :param formatVersions: Formats of the maps to cycle through.
+    :param notes: Amount of notes in each difficulty.
+    :param events: Amount of light events in each difficulty.
+    :param difficulties: Amount of difficulties to create for each map, from 1 to 5.
+    :param asZip: Whether to write the maps as ZIP files instead of directories.
+    :return: The song entries of the maps.
+    """
+
+    return [createSong(directory, formatVersions[i % len(formatVersions)], notes, events, difficulties, asZip, i + 1) for i in range(count)]
@@ -7,7 +7,8 @@ Loads the configuration from the file system.
 import json
 import os
 
-CONFIGURATION_LOCATION = os.path.realpath(os.path.join(__file__, "..", "..", "configuration.json"))
+# The location can be changed with the LIBRARY_MANAGER_CONFIGURATION environment variable, such as for the tests.
+CONFIGURATION_LOCATION = os.environ.get("LIBRARY_MANAGER_CONFIGURATION", os.path.realpath(os.path.join(__file__, "..", "..", "configuration.json")))
 DEFAULT_CONFIGURATION = {
     "ClampedMapSpeeds": {
         "5": {
@@ -40,7 +41,23 @@ DEFAULT_CONFIGURATION = {
     "EnabledSources": [
         "BeatSaver",
         "BeatSage"
-    ]
+    ],
+    # Amount of worker processes to process the maps with. 1 processes the maps in the main process.
+    "ProcessingJobs": 1,
+    # Maximum amount of maps to download from BeatSaver at once.
+    "BeatSaverDownloadWorkers": 4,
+    # Maximum amount of Beat Sage jobs to have submitted at once.
+    "BeatSageConcurrentJobs": 4,
+    # Mode to determine the BPM of Beat Sage songs with (Full or Fast, which only analyzes part of the song).
+    "BeatSageBpmAnalysis": "Full",
+    # Amount of failed attempts in a row before a map is quarantined and skipped.
+    "MaxMapAttempts": 3,
+    # Whether to measure the peak memory of each processing step, which slows down processing.
+    "MeasureProcessingMemory": False,
+    # Whether to check that the processing steps report every difficulty file they change, which slows down processing.
+    "VerifyDifficultyFiles": False,
+    # Name of a map (the output directory name) to always process and profile into maps/Profiles, or None.
+    "ProfileMap": None,
 }
 
 
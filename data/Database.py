@@ -7,14 +7,39 @@ Manages the database.
 import os
 import sqlite3
 from data import Configuration
+from typing import Iterator, List
 
 DEFAULT_LOCATION = os.path.realpath(__file__ + "/../../database.sqlite")
 DATABASE_TABLES = {
     "BeatSaverMaps": "Artist TEXT, SongName TEXT, SongSubName TEXT, Include INTEGER, Validated INTEGER, BeatSaverKey TEXT, SubjectiveQualityRating TEXT, OtherNotes Text",
     "BeatSageMaps": "Artist TEXT, SongName TEXT, SongSubName TEXT, Include INTEGER, Validated INTEGER, SongURL TEXT, SubjectiveQualityRating TEXT, CoverURL TEXT, OtherNotes Text",
+    "BeatSaverMapVersions": "BeatSaverKey TEXT PRIMARY KEY, DownloadURL TEXT, VersionHash TEXT",
+    "BeatSageBpmCache": "AudioHash TEXT, AnalysisParameters TEXT, Bpm REAL, PRIMARY KEY (AudioHash, AnalysisParameters)",
+    "MapStates": "MapKey TEXT PRIMARY KEY, Stage TEXT, LastError TEXT, Attempts INTEGER, Quarantined INTEGER, CreatedTime REAL, UpdatedTime REAL",
+    "LibraryMaps": "MapKey TEXT PRIMARY KEY, Fingerprint TEXT, UpdatedTime REAL",
+    "LibraryDifficulties": "MapKey TEXT, MapSource TEXT, Artist TEXT, SongName TEXT, Characteristic TEXT, Difficulty TEXT, DifficultyRank INTEGER, DifficultyLabel TEXT, NoteJumpSpeed REAL, NoteJumpOffset REAL, ReactionTime REAL, BeatsPerMinute REAL, Notes INTEGER, Bombs INTEGER, Events INTEGER, Obstacles INTEGER, Requirements TEXT, OutputPath TEXT, PRIMARY KEY (MapKey, Characteristic, Difficulty)",
+}
+DATABASE_INDEXES = {
+    "BeatSaverMaps": {
+        "BeatSaverMapsInclude": "Include",
+        "BeatSaverMapsBeatSaverKey": "BeatSaverKey",
+        "BeatSaverMapsSong": "Artist, SongName, SongSubName",
+    },
+    "BeatSageMaps": {
+        "BeatSageMapsInclude": "Include",
+        "BeatSageMapsSong": "Artist, SongName, SongSubName",
+    },
+    "MapStates": {
+        "MapStatesQuarantined": "Quarantined",
+    },
+    "LibraryDifficulties": {
+        "LibraryDifficultiesRank": "DifficultyRank, NoteJumpSpeed",
+        "LibraryDifficultiesReactionTime": "ReactionTime",
+    },
 }
 DATABASE_TABLES_TO_SOURCE = {
     "BeatSaverMaps": "BeatSaver",
+    "BeatSaverMapVersions": "BeatSaver",
     "BeatSageMaps": "BeatSage",
 }
 
@@ -26,9 +51,17 @@ class Database:
 
         self.fileLocation = fileLocation
         self.connection = sqlite3.connect(fileLocation)
+
+        # Use write-ahead logging so reads are not blocked by writes and commits are faster.
+        self.connection.execute("PRAGMA journal_mode=WAL;")
+        self.connection.execute("PRAGMA synchronous=NORMAL;")
+
+        # Initialize the tables.
         for tableName in DATABASE_TABLES.keys():
             if tableName not in DATABASE_TABLES_TO_SOURCE.keys() or Configuration.sourceEnabled(DATABASE_TABLES_TO_SOURCE[tableName]):
                 self.initializeTable(tableName, DATABASE_TABLES[tableName])
+                if tableName in DATABASE_INDEXES.keys():
+                    self.initializeIndexes(tableName, DATABASE_INDEXES[tableName])
 
     def initializeTable(self, tableName: str, tableSchema: str) -> None:
         """Initializes a table if it doesn't exist.
@@ -38,12 +71,7 @@ class Database:
         """
 
         # Get if the table exists.
-        tableExists = False
-        try:
-            self.execute("SELECT * FROM " + tableName + ";")
-            tableExists = True
-        except:
-            pass
+        tableExists = len(self.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?;", [tableName])) != 0
 
         # Initialize the table.
         if not tableExists:
@@ -53,6 +81,17 @@ class Database:
         else:
             print("Already initialized " + tableName)
 
+    def initializeIndexes(self, tableName: str, indexes: dict) -> None:
+        """Initializes the indexes of a table if they don't exist.
+
+        :param tableName: Name of the table.
+        :param indexes: Columns of the indexes, keyed by the name of the index.
+        """
+
+        for indexName in indexes.keys():
+            self.execute("CREATE INDEX IF NOT EXISTS " + indexName + " ON " + tableName + "(" + indexes[indexName] + ");")
+        self.commit()
+
     def execute(self, query: str, parameters: list = []) -> any:
         """Executes an SQL query and returns the result.
 
@@ -63,6 +102,26 @@ class Database:
 
         return self.connection.execute(query, parameters).fetchall()
 
+    def executeMany(self, query: str, parameters: List[list]) -> None:
+        """Executes an SQL query for each set of parameters.
+
+        :param query: Query to run on the database.
+        :param parameters: Sets of parameters to use with the query.
+        """
+
+        self.connection.executemany(query, parameters)
+
+    def iterate(self, query: str, parameters: list = []) -> Iterator[tuple]:
+        """Executes an SQL query and returns the rows of the result as they are read.
+        Used for large queries instead of execute to not load all of the rows at once.
+
+        :param query: Query to run on the database.
+        :param parameters: Parameters to use with the query.
+        :return: Iterator of the rows of the result.
+        """
+
+        return iter(self.connection.execute(query, parameters))
+
     def commit(self) -> None:
         """Commits changes to the database.
         """
@@ -0,0 +1,159 @@
+"""
+TheNexusAvenger
+
+Columnar views of the notes, events, and obstacles of difficulty files.
+"""
+
+import numpy
+from typing import Dict, List, Optional
+
+# Fields of the objects in the difficulty files for the columns.
+V2_NOTE_FIELDS = {
+    "time": "_time",
+    "type": "_type",
+    "lineIndex": "_lineIndex",
+    "lineLayer": "_lineLayer",
+    "cutDirection": "_cutDirection",
+}
+V3_NOTE_FIELDS = {
+    "time": "b",
+    "type": "c",
+    "lineIndex": "x",
+    "lineLayer": "y",
+    "cutDirection": "d",
+}
+V2_EVENT_FIELDS = {
+    "time": "_time",
+    "type": "_type",
+    "value": "_value",
+}
+V3_EVENT_FIELDS = {
+    "time": "b",
+    "type": "et",
+    "value": "i",
+}
+V2_OBSTACLE_FIELDS = {
+    "time": "_time",
+    "type": "_type",
+    "lineIndex": "_lineIndex",
+    "duration": "_duration",
+    "width": "_width",
+}
+V3_OBSTACLE_FIELDS = {
+    "time": "b",
+    "lineIndex": "x",
+    "lineLayer": "y",
+    "duration": "d",
+    "width": "w",
+    "height": "h",
+}
+# Value of fields that are left out of V3 objects.
+V3_DEFAULT_VALUE = 0
+
+
+class ColumnarObjects:
+    def __init__(self, objects: List[dict], fields: Dict[str, str], defaultValue: Optional[int] = None):
+        """Creates the columnar view of a list of objects.
+        The columns are created when they are first used.
+
+        :param objects: Objects of the difficulty file.
+        :param fields: Fields of the objects, keyed by the column name.
+        :param defaultValue: Value of fields that are left out of objects. If None, all the objects must have the fields.
+        """
+
+        self.objects = objects
+        self.fields = fields
+        self.defaultValue = defaultValue
+        self.columns = {}
+        self.changedColumns = set()
+
+    def __len__(self) -> int:
+        """Returns the amount of objects.
+
+        :return: The amount of objects.
+        """
+
+        return len(self.objects)
+
+    def getValues(self, name: str) -> list:
+        """Returns the values of a field as they are stored in the objects.
+
+        :param name: Name of the column.
+        :return: The values of the field.
+        """
+
+        field = self.fields[name]
+        if self.defaultValue is None:
+            return [entry[field] for entry in self.objects]
+        return [entry.get(field, self.defaultValue) for entry in self.objects]
+
+    def getColumn(self, name: str) -> numpy.ndarray:
+        """Returns the values of a field as an array.
+
+        :param name: Name of the column.
+        :return: The values of the field.
+        """
+
+        if name not in self.columns.keys():
+            self.columns[name] = numpy.array(self.getValues(name))
+        return self.columns[name]
+
+    def setColumn(self, name: str, values: numpy.ndarray) -> None:
+        """Sets the values of a field.
+        The values are stored in the objects by applyChanges.
+
+        :param name: Name of the column.
+        :param values: New values of the field.
+        """
+
+        if len(values) != len(self.objects):
+            raise ValueError("Column " + name + " has " + str(len(values)) + " values for " + str(len(self.objects)) + " objects.")
+        self.columns[name] = numpy.asarray(values)
+        self.changedColumns.add(name)
+
+    def applyChanges(self) -> None:
+        """Stores the changed columns in the objects.
+        """
+
+        for name in self.changedColumns:
+            field = self.fields[name]
+            for entry, value in zip(self.objects, self.columns[name].tolist()):
+                if self.defaultValue is not None and field not in entry.keys() and value == self.defaultValue:
+                    continue
+                entry[field] = value
+        self.changedColumns = set()
+
+
+class DifficultyColumns:
+    def __init__(self, difficultyData: dict):
+        """Creates the columnar view of a difficulty file.
+
+        :param difficultyData: Data of the difficulty file.
+        """
+
+        self.difficultyData = difficultyData
+        self.isVersion3 = ("colorNotes" in difficultyData.keys())
+        if self.isVersion3:
+            self.notes = ColumnarObjects(difficultyData["colorNotes"], V3_NOTE_FIELDS, V3_DEFAULT_VALUE)
+            self.events = ColumnarObjects(difficultyData.get("basicBeatmapEvents", []), V3_EVENT_FIELDS, V3_DEFAULT_VALUE)
+            self.obstacles = ColumnarObjects(difficultyData.get("obstacles", []), V3_OBSTACLE_FIELDS, V3_DEFAULT_VALUE)
+        else:
+            self.notes = ColumnarObjects(difficultyData.get("_notes", []), V2_NOTE_FIELDS)
+            self.events = ColumnarObjects(difficultyData.get("_events", []), V2_EVENT_FIELDS)
+            self.obstacles = ColumnarObjects(difficultyData.get("_obstacles", []), V2_OBSTACLE_FIELDS)
+
+    def hasChanges(self) -> bool:
+        """Returns if any columns were changed since the changes were last stored.
+
+        :return: Whether there are changes to store.
+        """
+
+        return len(self.notes.changedColumns) > 0 or len(self.events.changedColumns) > 0 or len(self.obstacles.changedColumns) > 0
+
+    def applyChanges(self) -> None:
+        """Stores the changed columns in the difficulty file.
+        """
+
+        self.notes.applyChanges()
+        self.events.applyChanges()
+        self.obstacles.applyChanges()
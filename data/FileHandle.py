@@ -0,0 +1,166 @@
+"""
+TheNexusAvenger
+
+Handles to the contents of map files that are only read when needed.
+"""
+
+import os
+import shutil
+import zlib
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+from zipfile import ZipFile
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def calculateCrc32(file: BinaryIO) -> int:
+    """Calculates the CRC-32 of a file in chunks.
+
+    :param file: File to calculate the CRC-32 of.
+    :return: The CRC-32 of the file.
+    """
+
+    crc32 = 0
+    for chunk in iter(lambda: file.read(COPY_CHUNK_SIZE), b""):
+        crc32 = zlib.crc32(chunk, crc32)
+    return crc32
+
+
+class FileHandle(ABC):
+    @abstractmethod
+    def read(self) -> bytes:
+        """Reads the contents of the file into memory.
+
+        :return: The contents of the file.
+        """
+
+    @abstractmethod
+    def copyTo(self, file: BinaryIO) -> None:
+        """Copies the contents of the file to another file in chunks.
+
+        :param file: File to copy the contents to.
+        """
+
+    @abstractmethod
+    def getSize(self) -> int:
+        """Returns the size of the file.
+
+        :return: The size of the file in bytes.
+        """
+
+    @abstractmethod
+    def getCrc32(self) -> int:
+        """Returns the CRC-32 of the contents of the file.
+
+        :return: The CRC-32 of the file.
+        """
+
+    def matchesFile(self, filePath: str) -> bool:
+        """Returns if the contents of the file are the same as the contents of an existing file.
+        The existing file is read in chunks and only if the sizes are the same.
+
+        :param filePath: Path of the existing file.
+        :return: Whether the contents are the same.
+        """
+
+        if os.path.getsize(filePath) != self.getSize():
+            return False
+        with open(filePath, "rb") as file:
+            return calculateCrc32(file) == self.getCrc32()
+
+
+class PathFileHandle(FileHandle):
+    def __init__(self, path: str):
+        """Creates the file handle.
+
+        :param path: Path of the file.
+        """
+
+        self.path = path
+
+    def read(self) -> bytes:
+        """Reads the contents of the file into memory.
+
+        :return: The contents of the file.
+        """
+
+        with open(self.path, "rb") as file:
+            return file.read()
+
+    def copyTo(self, file: BinaryIO) -> None:
+        """Copies the contents of the file to another file in chunks.
+
+        :param file: File to copy the contents to.
+        """
+
+        with open(self.path, "rb") as sourceFile:
+            shutil.copyfileobj(sourceFile, file, COPY_CHUNK_SIZE)
+
+    def getSize(self) -> int:
+        """Returns the size of the file.
+
+        :return: The size of the file in bytes.
+        """
+
+        return os.path.getsize(self.path)
+
+    def getCrc32(self) -> int:
+        """Returns the CRC-32 of the contents of the file.
+
+        :return: The CRC-32 of the file.
+        """
+
+        with open(self.path, "rb") as file:
+            return calculateCrc32(file)
+
+
+class ZipFileHandle(FileHandle):
+    def __init__(self, zipFile: ZipFile, memberName: str, size: int, crc32: int):
+        """Creates the file handle.
+        The size and CRC-32 are stored in the ZIP file, so they are known without reading the file.
+        The ZIP file is shared by the handles of its files, so it is only opened once.
+
+        :param zipFile: Open ZIP file that contains the file. It must stay open while the handle is used.
+        :param memberName: Name of the file in the ZIP file.
+        :param size: Uncompressed size of the file.
+        :param crc32: CRC-32 of the file.
+        """
+
+        self.zipFile = zipFile
+        self.memberName = memberName
+        self.size = size
+        self.crc32 = crc32
+
+    def read(self) -> bytes:
+        """Reads the contents of the file into memory.
+
+        :return: The contents of the file.
+        """
+
+        return self.zipFile.read(self.memberName)
+
+    def copyTo(self, file: BinaryIO) -> None:
+        """Copies the contents of the file to another file in chunks.
+
+        :param file: File to copy the contents to.
+        """
+
+        with self.zipFile.open(self.memberName) as sourceFile:
+            shutil.copyfileobj(sourceFile, file, COPY_CHUNK_SIZE)
+
+    def getSize(self) -> int:
+        """Returns the size of the file.
+
+        :return: The size of the file in bytes.
+        """
+
+        return self.size
+
+    def getCrc32(self) -> int:
+        """Returns the CRC-32 of the contents of the file.
+
+        :return: The CRC-32 of the file.
+        """
+
+        return self.crc32
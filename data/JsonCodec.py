@@ -0,0 +1,223 @@
+"""
+TheNexusAvenger
+
+Parses and serializes map JSON files.
+orjson is used when it is installed, with the output kept identical to the json module.
+"""
+
+import json
+import re
+from json.encoder import encode_basestring, encode_basestring_ascii
+from typing import BinaryIO, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Amount of list entries that are serialized together when streaming.
+STREAM_LIST_LENGTH = 1000
+# Translation that replaces all the digits with 0 so runs of digits can be found with bytes.find.
+DIGIT_MASK = bytes.maketrans(b"123456789", b"000000000")
+# Integers with 19 or more digits may be parsed by orjson as floats instead of integers.
+LARGE_INTEGER_DIGITS = b"0" * 19
+# Numbers below 1e-4 are written by orjson without an exponent.
+SMALL_NUMBER_PATTERN = re.compile(rb"\.0000(?<=0\.0000)(?<![0-9]0\.0000)")
+
+
+def removeNullValues(dictionary: Union[dict, list]) -> None:
+    """Removes null values from a given dictionary.
+    This is done recursively.
+
+    :param dictionary: Dictionary to remove null values from.
+    """
+
+    if type(dictionary) is dict:
+        for key in list(dictionary.keys()):
+            if dictionary[key] is None:
+                del dictionary[key]
+            elif type(dictionary[key]) is dict or type(dictionary[key]) is list:
+                removeNullValues(dictionary[key])
+    elif type(dictionary) is list:
+        for entry in list(dictionary):
+            removeNullValues(entry)
+
+
+def hasLargeInteger(data: bytes) -> bool:
+    """Returns if JSON data may contain an integer that orjson parses as a float.
+    Runs of digits that are part of a float are ignored.
+
+    :param data: JSON data to check.
+    :return: Whether the data may contain a large integer.
+    """
+
+    maskedData = data.translate(DIGIT_MASK)
+    index = maskedData.find(LARGE_INTEGER_DIGITS)
+    while index != -1:
+        # Find the end of the digits.
+        endIndex = index + len(LARGE_INTEGER_DIGITS)
+        while endIndex < len(maskedData) and maskedData[endIndex] == ord("0"):
+            endIndex += 1
+
+        # Return if the digits are not part of a float.
+        if (index == 0 or maskedData[index - 1] != ord(".")) and (endIndex == len(maskedData) or maskedData[endIndex] not in b".eE"):
+            return True
+        index = maskedData.find(LARGE_INTEGER_DIGITS, endIndex)
+    return False
+
+
+def hasMismatchedOutput(encodedData: bytes) -> bool:
+    """Returns if data serialized by orjson may be different from the json module.
+    orjson writes exponents without a sign or padding, writes numbers below 1e-4 without an exponent,
+    and writes NaN and infinity as null. Text in strings can match, which only causes the json module to be used.
+
+    :param encodedData: Data serialized by orjson.
+    :return: Whether the data may be different.
+    """
+
+    if b"null" in encodedData or SMALL_NUMBER_PATTERN.search(encodedData) is not None:
+        return True
+    maskedData = encodedData.translate(DIGIT_MASK)
+    return b"0e" in maskedData or b"0E" in maskedData
+
+
+def loads(data: Union[bytes, str]) -> any:
+    """Parses JSON data.
+
+    :param data: JSON data to parse.
+    :return: The parsed data.
+    """
+
+    if orjson is not None:
+        encodedData = data.encode("utf8", "surrogatepass") if isinstance(data, str) else data
+        if not hasLargeInteger(encodedData):
+            try:
+                return orjson.loads(encodedData)
+            except orjson.JSONDecodeError:
+                # Parse the data with the json module, which supports NaN, infinity, and byte order marks.
+                pass
+    return json.loads(data)
+
+
+def dumps(data: Union[dict, list], indent: Optional[int] = None, separators: Optional[tuple] = None, ensureAscii: bool = False) -> bytes:
+    """Serializes data to UTF-8 encoded JSON.
+    The output is the same as json.dumps.
+
+    :param data: Data to serialize.
+    :param indent: Indenting to use with the JSON.
+    :param separators: Separators to use when serializing JSON.
+    :param ensureAscii: Whether to escape non-ASCII characters.
+    :return: The serialized data.
+    """
+
+    # Serialize the data with orjson if it is compact.
+    if orjson is not None and indent is None and separators == (",", ":"):
+        try:
+            encodedData = orjson.dumps(data)
+            if not hasMismatchedOutput(encodedData) and (not ensureAscii or encodedData.isascii()):
+                return encodedData
+        except orjson.JSONEncodeError:
+            # Serialize the data with the json module, which supports large integers and non-string keys.
+            pass
+
+    # Serialize the data with the json module.
+    return json.dumps(data, indent=indent, separators=separators, ensure_ascii=ensureAscii).encode("utf8")
+
+
+def dump(data: any, file: BinaryIO, indent: Optional[int] = None, separators: Optional[tuple] = None, ensureAscii: bool = False, skipNullValues: bool = False) -> None:
+    """Serializes data to UTF-8 encoded JSON and writes it to a file in chunks.
+    The output is the same as json.dumps, with null values in dictionaries removed the same as
+    removeNullValues if skipNullValues is set. Dictionaries are written entry by entry and lists
+    are serialized in slices of STREAM_LIST_LENGTH entries, so the full output is never in memory.
+
+    :param data: Data to serialize.
+    :param file: File (or any object with a write function) to write the serialized data to.
+    :param indent: Indenting to use with the JSON.
+    :param separators: Separators to use when serializing JSON.
+    :param ensureAscii: Whether to escape non-ASCII characters.
+    :param skipNullValues: Whether to skip null values in dictionaries.
+    """
+
+    # Determine the formatting the same way as the json module.
+    if separators is None:
+        separators = (", ", ": ") if indent is None else (",", ": ")
+    if isinstance(indent, int):
+        indent = " " * indent
+    encodeString = encode_basestring_ascii if ensureAscii else encode_basestring
+
+    def dumpValue(value: any, level: int) -> None:
+        """Writes a value.
+
+        :param value: Value to write.
+        :param level: Nesting level of the value.
+        """
+
+        if type(value) is dict:
+            # Write the entries of the dictionary.
+            entries = [(key, entryValue) for key, entryValue in value.items() if not skipNullValues or entryValue is not None]
+            if len(entries) == 0:
+                file.write(b"{}")
+                return
+            newlineIndent = ("\n" + indent * (level + 1)) if indent is not None else ""
+            file.write(("{" + newlineIndent).encode("utf8"))
+            for i, (key, entryValue) in enumerate(entries):
+                if i != 0:
+                    file.write((separators[0] + newlineIndent).encode("utf8"))
+                file.write((encodeString(getKeyString(key)) + separators[1]).encode("utf8"))
+                dumpValue(entryValue, level + 1)
+            file.write((("\n" + indent * level) if indent is not None else "").encode("utf8") + b"}")
+        elif type(value) is list:
+            # Write the entries of the list.
+            if len(value) == 0:
+                file.write(b"[]")
+                return
+            newlineIndent = ("\n" + indent * (level + 1)) if indent is not None else ""
+            file.write(("[" + newlineIndent).encode("utf8"))
+            if indent is None:
+                # Serialize the entries in slices.
+                for startIndex in range(0, len(value), STREAM_LIST_LENGTH):
+                    if startIndex != 0:
+                        file.write(separators[0].encode("utf8"))
+                    file.write(dumpEntries(value[startIndex:startIndex + STREAM_LIST_LENGTH])[1:-1])
+            else:
+                # Serialize the entries individually to indent them.
+                for i, entry in enumerate(value):
+                    if i != 0:
+                        file.write((separators[0] + newlineIndent).encode("utf8"))
+                    dumpValue(entry, level + 1)
+            file.write((("\n" + indent * level) if indent is not None else "").encode("utf8") + b"]")
+        else:
+            # Serialize the value.
+            encodedValue = dumpEntries(value)
+            if indent is not None:
+                encodedValue = encodedValue.replace(b"\n", ("\n" + indent * level).encode("utf8"))
+            file.write(encodedValue)
+
+    def dumpEntries(value: any) -> bytes:
+        """Serializes a value that is not streamed.
+
+        :param value: Value to serialize.
+        :return: The serialized value.
+        """
+
+        encodedValue = dumps(value, indent=indent, separators=separators, ensureAscii=ensureAscii)
+        if skipNullValues and b"null" in encodedValue:
+            removeNullValues(value)
+            encodedValue = dumps(value, indent=indent, separators=separators, ensureAscii=ensureAscii)
+        return encodedValue
+
+    dumpValue(data, 0)
+
+
+def getKeyString(key: any) -> str:
+    """Converts a dictionary key to a string the same way as the json module.
+
+    :param key: Key to convert.
+    :return: The key as a string.
+    """
+
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (int, float)):
+        return json.dumps(key)
+    raise TypeError("keys must be str, int, float, bool or None, not " + type(key).__name__)
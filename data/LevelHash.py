@@ -0,0 +1,81 @@
+"""
+TheNexusAvenger
+
+Calculates the hashes used for the level ids of custom maps.
+"""
+
+import hashlib
+import json
+import os
+from data import JsonCodec
+from data.FileHandle import FileHandle
+from typing import Dict, List, Union
+
+
+def getLevelHashFileNames(mapInfo: dict) -> List[str]:
+    """Returns the file names of the files that are hashed after the info file, in the order they are hashed.
+
+    :param mapInfo: Data of the info file of the map.
+    :return: Lowercase file names of the hashed files.
+    """
+
+    fileNames = []
+    if "_difficultyBeatmapSets" in mapInfo.keys():
+        # Handle V3 and older maps.
+        for difficultyBeatmapSets in mapInfo["_difficultyBeatmapSets"]:
+            for difficultyBeatmap in difficultyBeatmapSets["_difficultyBeatmaps"]:
+                fileNames.append(difficultyBeatmap["_beatmapFilename"].lower())
+    else:
+        # Handle V4 and newer maps.
+        if "audioDataFilename" in mapInfo["audio"].keys():
+            fileNames.append(mapInfo["audio"]["audioDataFilename"].lower())
+        for difficultyBeatmap in mapInfo["difficultyBeatmaps"]:
+            if "beatmapDataFilename" in difficultyBeatmap.keys():
+                fileNames.append(difficultyBeatmap["beatmapDataFilename"].lower())
+            if "lightshowDataFilename" in difficultyBeatmap.keys():
+                fileNames.append(difficultyBeatmap["lightshowDataFilename"].lower())
+    return fileNames
+
+
+def calculateLevelHash(mapFiles: Dict[str, Union[bytes, FileHandle]]) -> str:
+    """Calculates the level hash of a map from the contents of the .dat files.
+
+    :param mapFiles: Contents of the .dat files of the map, keyed by the lowercase file name.
+    :return: Hash of the map.
+    """
+
+    # Read the info file.
+    infoData = mapFiles["info.dat"]
+    if isinstance(infoData, FileHandle):
+        infoData = infoData.read()
+    mapInfo = JsonCodec.loads(infoData.decode("utf8"))
+
+    # Hash the info file and the map files.
+    sha1 = hashlib.sha1()
+    sha1.update(infoData)
+    for fileName in getLevelHashFileNames(mapInfo):
+        fileData = mapFiles[fileName]
+        if isinstance(fileData, FileHandle):
+            fileData = fileData.read()
+        sha1.update(fileData)
+    return sha1.hexdigest()
+
+
+def saveHashMapping(hashMapping: Dict[str, str], hashesPath: str) -> bool:
+    """Saves a mapping between custom map hashes and BeatSaver map hashes if it changed.
+
+    :param hashMapping: Hashes of the BeatSaver downloads, keyed by the hashes of the processed maps.
+    :param hashesPath: Path of the file to store the mapping in.
+    :return: Whether the file was written.
+    """
+
+    hashesData = json.dumps(hashMapping, indent=4, sort_keys=True)
+    if os.path.exists(hashesPath):
+        with open(hashesPath) as file:
+            if file.read() == hashesData:
+                return False
+    if not os.path.exists(os.path.dirname(hashesPath)):
+        os.makedirs(os.path.dirname(hashesPath))
+    with open(hashesPath, "w") as file:
+        file.write(hashesData)
+    return True
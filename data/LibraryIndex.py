@@ -0,0 +1,136 @@
+"""
+TheNexusAvenger
+
+Stores the difficulties of the processed maps so the library can be queried without reading the maps.
+"""
+
+import json
+import time
+from data.Database import Database
+from typing import Dict, List, Optional, Set
+
+# Columns of the difficulties, in the order of the table.
+DIFFICULTY_COLUMNS = [
+    "MapKey",
+    "MapSource",
+    "Artist",
+    "SongName",
+    "Characteristic",
+    "Difficulty",
+    "DifficultyRank",
+    "DifficultyLabel",
+    "NoteJumpSpeed",
+    "NoteJumpOffset",
+    "ReactionTime",
+    "BeatsPerMinute",
+    "Notes",
+    "Bombs",
+    "Events",
+    "Obstacles",
+    "Requirements",
+    "OutputPath",
+]
+
+
+class LibraryIndex:
+    def __init__(self, database: Database):
+        """Creates the library index.
+
+        :param database: Database to store the difficulties in.
+        """
+
+        self.database = database
+
+    def getMapFingerprints(self) -> Dict[str, str]:
+        """Returns the fingerprints of the maps when their difficulties were stored.
+
+        :return: The fingerprints of the maps, keyed by the key of the map.
+        """
+
+        mapFingerprints = {}
+        for mapKey, fingerprint in self.database.iterate("SELECT MapKey,Fingerprint FROM LibraryMaps;"):
+            mapFingerprints[mapKey] = fingerprint
+        return mapFingerprints
+
+    def setMapDifficulties(self, mapKey: str, fingerprint: str, difficulties: List[dict]) -> None:
+        """Replaces the stored difficulties of a map.
+        The changes are stored when commit is called.
+
+        :param mapKey: Key of the map, which is the output directory relative to the maps directory.
+        :param fingerprint: Fingerprint of the map that the difficulties were read from.
+        :param difficulties: Difficulties of the map, keyed by the columns of the table. The requirements are a list.
+        """
+
+        self.database.execute("INSERT OR REPLACE INTO LibraryMaps VALUES (?,?,?);", [mapKey, fingerprint, time.time()])
+        self.database.execute("DELETE FROM LibraryDifficulties WHERE MapKey = ?;", [mapKey])
+        rows = []
+        for difficulty in difficulties:
+            row = [mapKey]
+            for column in DIFFICULTY_COLUMNS[1:]:
+                value = difficulty.get(column)
+                if column == "Requirements":
+                    value = json.dumps(value or [])
+                row.append(value)
+            rows.append(row)
+        self.database.executeMany("INSERT OR REPLACE INTO LibraryDifficulties VALUES (" + ",".join(["?"] * len(DIFFICULTY_COLUMNS)) + ");", rows)
+
+    def removeMaps(self, mapKeys: Set[str]) -> None:
+        """Removes the stored difficulties of maps.
+        The changes are stored when commit is called.
+
+        :param mapKeys: Keys of the maps to remove.
+        """
+
+        self.database.executeMany("DELETE FROM LibraryMaps WHERE MapKey = ?;", [[mapKey] for mapKey in mapKeys])
+        self.database.executeMany("DELETE FROM LibraryDifficulties WHERE MapKey = ?;", [[mapKey] for mapKey in mapKeys])
+
+    def commit(self) -> None:
+        """Stores the changes to the difficulties.
+        """
+
+        self.database.commit()
+
+    def queryDifficulties(self, conditions: Optional[List[str]] = None, parameters: Optional[list] = None, orderBy: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, any]]:
+        """Returns the stored difficulties that match conditions.
+
+        :param conditions: SQL conditions that the difficulties must all match, with ? for the parameters.
+        :param parameters: Parameters of the conditions.
+        :param orderBy: Column to sort the difficulties by. The difficulties are sorted by map if none is provided.
+        :param limit: Maximum amount of difficulties to return.
+        :return: The difficulties, keyed by the columns of the table. The requirements are a list.
+        """
+
+        # Build the query.
+        if orderBy is not None and orderBy not in DIFFICULTY_COLUMNS:
+            raise ValueError("Unknown column: " + orderBy)
+        query = "SELECT " + ",".join(DIFFICULTY_COLUMNS) + " FROM LibraryDifficulties"
+        if conditions is not None and len(conditions) > 0:
+            query += " WHERE " + " AND ".join("(" + condition + ")" for condition in conditions)
+        query += " ORDER BY " + (orderBy + "," if orderBy is not None else "") + "MapKey,Characteristic,DifficultyRank"
+        if limit is not None:
+            query += " LIMIT " + str(int(limit))
+
+        # Read the difficulties.
+        difficulties = []
+        for row in self.database.iterate(query + ";", parameters or []):
+            difficulty = dict(zip(DIFFICULTY_COLUMNS, row))
+            difficulty["Requirements"] = json.loads(difficulty["Requirements"]) if difficulty["Requirements"] is not None else []
+            difficulties.append(difficulty)
+        return difficulties
+
+    def countDifficulties(self, conditions: Optional[List[str]] = None, parameters: Optional[list] = None) -> Dict[str, int]:
+        """Returns the amount of stored difficulties and maps that match conditions.
+
+        :param conditions: SQL conditions that the difficulties must all match, with ? for the parameters.
+        :param parameters: Parameters of the conditions.
+        :return: The amount of Difficulties and Maps.
+        """
+
+        query = "SELECT COUNT(*),COUNT(DISTINCT MapKey) FROM LibraryDifficulties"
+        if conditions is not None and len(conditions) > 0:
+            query += " WHERE " + " AND ".join("(" + condition + ")" for condition in conditions)
+        counts = self.database.execute(query + ";", parameters or [])[0]
+        return {
+            "Difficulties": counts[0],
+            "Maps": counts[1],
+        }
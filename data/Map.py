@@ -2,8 +2,13 @@
 TheNexusAvenger
 
 Data for maps for Beat Saber.
+The format of the data is determined when the map is loaded, and the accessors for the
+format are used instead of checking the keys of the data every time a value is read.
 """
 
+from abc import ABC, abstractmethod
+from typing import List
+
 DEFAULT_LABELS = {
     1: "Easy",
     3: "Normal",
@@ -20,7 +25,21 @@ DIFFICULTY_RANK_LOOKUP = {
 }
 
 
+def hasUnderscoreKeys(data: dict) -> bool:
+    """Returns if the keys of data have underscores (version <=3).
+
+    :param data: Data to check.
+    :return: Whether the keys have underscores (version <=3).
+    """
+
+    for key in data.keys():
+        return key.startswith("_")
+    return False
+
+
 class CustomDataContainer:
+    __slots__ = ("data", "customDataPrefix", "customDataKey")
+
     def __init__(self, data: dict):
         """Initializes the custom data container.
 
@@ -28,6 +47,8 @@ class CustomDataContainer:
         """
 
         self.data = data
+        self.customDataPrefix = "_" if hasUnderscoreKeys(data) else ""
+        self.customDataKey = self.customDataPrefix + "customData"
 
     def isUnderscoreFormat(self) -> bool:
         """Returns if the keys have underscores (version <=3).
@@ -35,9 +56,7 @@ class CustomDataContainer:
         :return: Whether the keys have underscores (version <=3).
         """
 
-        for key in self.data.keys():
-            return key.startswith("_")
-        return False
+        return self.customDataPrefix == "_"
 
     def getCustomData(self, key: any) -> any:
         """Returns the value for a custom data entry.
@@ -46,14 +65,9 @@ class CustomDataContainer:
         :return: Value of the custom data.
         """
 
-        prefix = "_" if self.isUnderscoreFormat() else ""
-        if prefix + "customData" not in self.data.keys():
-            return None
-
-        key = prefix + key
-        customData = self.data[prefix + "customData"]
-        if customData and key in customData.keys():
-            return customData[key]
+        customData = self.data.get(self.customDataKey)
+        if customData:
+            return customData.get(self.customDataPrefix + key)
         return None
 
     def setCustomData(self, key: any, value: any) -> None:
@@ -63,33 +77,28 @@ class CustomDataContainer:
         :param value: Value to set.
         """
 
-        prefix = "_" if self.isUnderscoreFormat() else ""
-        if prefix + "customData" not in self.data.keys():
-            self.data[prefix + "customData"] = {}
-        self.data[prefix + "customData"][prefix + key] = value
+        if self.customDataKey not in self.data.keys():
+            self.data[self.customDataKey] = {}
+        self.data[self.customDataKey][self.customDataPrefix + key] = value
 
 
-class BeatMap(CustomDataContainer):
+class BeatMap(CustomDataContainer, ABC):
+    __slots__ = ()
+
+    @abstractmethod
     def getBeatMapFileName(self) -> str:
         """Returns the file name of the beat map.
 
         :return: The file name of the beat map.
         """
 
-        if "beatmapDataFilename" in self.data.keys():
-            return self.data["beatmapDataFilename"] # >=V4 format
-        return self.data["_beatmapFilename"] # <=V3 format
-
+    @abstractmethod
     def getDifficulty(self) -> str:
         """Returns the difficulty of the beat map.
 
         :return: The difficulty of the beat map.
         """
 
-        if "difficulty" in self.data.keys():
-            return self.data["difficulty"] # >=V4 format
-        return self.data["_difficulty"] # <=V3 format
-
     def getDifficultyLabel(self) -> str:
         """Returns the difficulty label for the beat map.
 
@@ -111,15 +120,130 @@ class BeatMap(CustomDataContainer):
         if "▲" not in label and "▼" not in label:
             self.setCustomData("difficultyLabel", label + modifier)
 
+    @abstractmethod
+    def getDifficultyRank(self) -> int:
+        """Returns the difficulty rank of the beat map.
+
+        :return: The difficulty rank of the beat map.
+        """
+
+    @abstractmethod
+    def getNoteJumpMovementSpeed(self) -> float:
+        """Returns the note jump movement speed of the beat map.
+
+        :return: The note jump movement speed of the beat map.
+        """
+
+    @abstractmethod
+    def setNoteJumpMovementSpeed(self, noteJumpMovementSpeed: float) -> None:
+        """Sets the note jump movement speed of the beat map.
+
+        :param noteJumpMovementSpeed: The note jump movement speed of the beat map.
+        """
+
+    @abstractmethod
+    def getNoteJumpStartBeatOffset(self) -> float:
+        """Returns the note jump start beat of the beat map.
+
+        :return: The note jump start beat of the beat map.
+        """
+
+    @abstractmethod
+    def setNoteJumpStartBeatOffset(self, noteJumpStartBeatOffset: float) -> None:
+        """Sets the note jump start beat of the beat map.
+
+        :param noteJumpStartBeatOffset: The note jump start beat of the beat map.
+        """
+
+
+# Beat map in the <=V3 format.
+class BeatMapV2(BeatMap):
+    __slots__ = ()
+
+    def getBeatMapFileName(self) -> str:
+        """Returns the file name of the beat map.
+
+        :return: The file name of the beat map.
+        """
+
+        return self.data["_beatmapFilename"]
+
+    def getDifficulty(self) -> str:
+        """Returns the difficulty of the beat map.
+
+        :return: The difficulty of the beat map.
+        """
+
+        return self.data["_difficulty"]
+
+    def getDifficultyRank(self) -> int:
+        """Returns the difficulty rank of the beat map.
+
+        :return: The difficulty rank of the beat map.
+        """
+
+        return self.data["_difficultyRank"]
+
+    def getNoteJumpMovementSpeed(self) -> float:
+        """Returns the note jump movement speed of the beat map.
+
+        :return: The note jump movement speed of the beat map.
+        """
+
+        return self.data["_noteJumpMovementSpeed"]
+
+    def setNoteJumpMovementSpeed(self, noteJumpMovementSpeed: float) -> None:
+        """Sets the note jump movement speed of the beat map.
+
+        :param noteJumpMovementSpeed: The note jump movement speed of the beat map.
+        """
+
+        self.data["_noteJumpMovementSpeed"] = noteJumpMovementSpeed
+
+    def getNoteJumpStartBeatOffset(self) -> float:
+        """Returns the note jump start beat of the beat map.
+
+        :return: The note jump start beat of the beat map.
+        """
+
+        return self.data["_noteJumpStartBeatOffset"]
+
+    def setNoteJumpStartBeatOffset(self, noteJumpStartBeatOffset: float) -> None:
+        """Sets the note jump start beat of the beat map.
+
+        :param noteJumpStartBeatOffset: The note jump start beat of the beat map.
+        """
+
+        self.data["_noteJumpStartBeatOffset"] = noteJumpStartBeatOffset
+
+
+# Beat map in the >=V4 format.
+class BeatMapV4(BeatMap):
+    __slots__ = ()
+
+    def getBeatMapFileName(self) -> str:
+        """Returns the file name of the beat map.
+
+        :return: The file name of the beat map.
+        """
+
+        return self.data["beatmapDataFilename"]
+
+    def getDifficulty(self) -> str:
+        """Returns the difficulty of the beat map.
+
+        :return: The difficulty of the beat map.
+        """
+
+        return self.data["difficulty"]
+
     def getDifficultyRank(self) -> int:
         """Returns the difficulty rank of the beat map.
 
         :return: The difficulty rank of the beat map.
         """
 
-        if "difficulty" in self.data.keys():
-            return DIFFICULTY_RANK_LOOKUP[self.data["difficulty"]] # >=V4 format
-        return self.data["_difficultyRank"] # <=V3 format
+        return DIFFICULTY_RANK_LOOKUP[self.data["difficulty"]]
 
     def getNoteJumpMovementSpeed(self) -> float:
         """Returns the note jump movement speed of the beat map.
@@ -127,9 +251,7 @@ class BeatMap(CustomDataContainer):
         :return: The note jump movement speed of the beat map.
         """
 
-        if "noteJumpMovementSpeed" in self.data.keys():
-            return self.data["noteJumpMovementSpeed"] # >=V4 format
-        return self.data["_noteJumpMovementSpeed"] # <=V3 format
+        return self.data["noteJumpMovementSpeed"]
 
     def setNoteJumpMovementSpeed(self, noteJumpMovementSpeed: float) -> None:
         """Sets the note jump movement speed of the beat map.
@@ -137,10 +259,7 @@ class BeatMap(CustomDataContainer):
         :param noteJumpMovementSpeed: The note jump movement speed of the beat map.
         """
 
-        if "noteJumpMovementSpeed" in self.data.keys():
-            self.data["noteJumpMovementSpeed"] = noteJumpMovementSpeed # >=V4 format
-        else:
-            self.data["_noteJumpMovementSpeed"] = noteJumpMovementSpeed # <=V3 format
+        self.data["noteJumpMovementSpeed"] = noteJumpMovementSpeed
 
     def getNoteJumpStartBeatOffset(self) -> float:
         """Returns the note jump start beat of the beat map.
@@ -148,9 +267,7 @@ class BeatMap(CustomDataContainer):
         :return: The note jump start beat of the beat map.
         """
 
-        if "noteJumpStartBeatOffset" in self.data.keys():
-            return self.data["noteJumpStartBeatOffset"] # >=V4 format
-        return self.data["_noteJumpStartBeatOffset"] # <=V3 format
+        return self.data["noteJumpStartBeatOffset"]
 
     def setNoteJumpStartBeatOffset(self, noteJumpStartBeatOffset: float) -> None:
         """Sets the note jump start beat of the beat map.
@@ -158,12 +275,41 @@ class BeatMap(CustomDataContainer):
         :param noteJumpStartBeatOffset: The note jump start beat of the beat map.
         """
 
-        if "noteJumpStartBeatOffset" in self.data.keys():
-            self.data["noteJumpStartBeatOffset"] = noteJumpStartBeatOffset # >=V4 format
-        else:
-            self.data["_noteJumpStartBeatOffset"] = noteJumpStartBeatOffset # <=V3 format
+        self.data["noteJumpStartBeatOffset"] = noteJumpStartBeatOffset
+
+
+class BeatMapSet(CustomDataContainer, ABC):
+    __slots__ = ("difficultyBeatmaps",)
+    difficultyBeatmaps: List[BeatMap]
+
+    def __init__(self, data: dict):
+        """Initializes the beat map set.
+
+        :param data: Data for the beat map set.
+        """
+
+        super().__init__(data)
+        self.difficultyBeatmaps = []
+
+    @abstractmethod
+    def getBeatmapCharacteristicName(self) -> str:
+        """Returns the characteristic name of the map set.
+
+        :return: The characteristic name of the map set.
+        """
+
+    @abstractmethod
+    def removeMap(self, beatmap: BeatMap) -> None:
+        """Removes a map from the map set.
+
+        :param beatmap: Map to remove.
+        """
+
+
+# Beat map set in the <=V3 format, which stores the beat maps of the set.
+class BeatMapSetV2(BeatMapSet):
+    __slots__ = ()
 
-class BeatMapSet(CustomDataContainer):
     def __init__(self, data: dict):
         """Initializes the beat map set.
 
@@ -173,32 +319,140 @@ class BeatMapSet(CustomDataContainer):
         super().__init__(data)
 
         # Load the difficulty maps.
-        self.difficultyBeatmaps = []
         if "_difficultyBeatmaps" in self.data.keys():
             for beatmap in self.data["_difficultyBeatmaps"]:
-                self.difficultyBeatmaps.append(BeatMap(beatmap))
+                self.difficultyBeatmaps.append(BeatMapV2(beatmap))
 
-    def getBeatmapCharacteristicName(self) -> None:
+    def getBeatmapCharacteristicName(self) -> str:
         """Returns the characteristic name of the map set.
 
         :return: The characteristic name of the map set.
         """
 
-        if "characteristic" in self.data.keys():
-            return self.data["characteristic"] # >=V4 format
-        return self.data["_beatmapCharacteristicName"] # <=V3 format
+        return self.data["_beatmapCharacteristicName"]
 
     def removeMap(self, beatmap: BeatMap) -> None:
         """Removes a map from the map set.
 
-        :param map: Map to remove.
+        :param beatmap: Map to remove.
         """
 
         self.difficultyBeatmaps.remove(beatmap)
         self.data["_difficultyBeatmaps"].remove(beatmap.data)
 
 
-class Map(CustomDataContainer):
+# Beat map set in the >=V4 format.
+# The format has no sets, so the set is the beat maps of the info file with the same characteristic,
+# and the data of the set is the first of those beat maps.
+class BeatMapSetV4(BeatMapSet):
+    __slots__ = ("infoBeatmaps",)
+    infoBeatmaps: List[dict]
+
+    def __init__(self, data: dict, infoBeatmaps: List[dict]):
+        """Initializes the beat map set.
+
+        :param data: Data of the first beat map of the set.
+        :param infoBeatmaps: Beat maps of the info file that the beat maps of the set are stored in.
+        """
+
+        super().__init__(data)
+        self.infoBeatmaps = infoBeatmaps
+
+    def getBeatmapCharacteristicName(self) -> str:
+        """Returns the characteristic name of the map set.
+
+        :return: The characteristic name of the map set.
+        """
+
+        return self.data["characteristic"]
+
+    def removeMap(self, beatmap: BeatMap) -> None:
+        """Removes a map from the map set.
+
+        :param beatmap: Map to remove.
+        """
+
+        self.difficultyBeatmaps.remove(beatmap)
+        self.infoBeatmaps.remove(beatmap.data)
+
+
+class Map(CustomDataContainer, ABC):
+    __slots__ = ("difficultyBeatmapSets",)
+    difficultyBeatmapSets: List[BeatMapSet]
+
+    def __new__(cls, data: dict):
+        """Creates the map with the accessors for the format of the data.
+
+        :param data: Data for the map.
+        """
+
+        if cls is Map:
+            cls = MapV2 if "_difficultyBeatmapSets" in data.keys() else MapV4
+        return super().__new__(cls)
+
+    def __init__(self, data: dict):
+        """Initializes the map.
+
+        :param data: Data for the map.
+        """
+
+        super().__init__(data)
+        self.difficultyBeatmapSets = []
+
+    @abstractmethod
+    def getBeatsPerMinute(self) -> float:
+        """Returns the beats per minute of the map.
+
+        :return: The beats per minute of the map.
+        """
+
+    @abstractmethod
+    def getCoverImageFilename(self) -> str:
+        """Returns the cover image filename.
+
+        :return: The cover image filename.
+        """
+
+    @abstractmethod
+    def setCoverImageFilename(self, coverImageFilename: str) -> None:
+        """Sets the cover image filename.
+
+        :param coverImageFilename: Name of the cover image filename.
+        """
+
+    @abstractmethod
+    def prefixLevelAuthorName(self, levelAuthorNamePrefix: str) -> None:
+        """Prefixes the level author name.
+
+        :param levelAuthorNamePrefix: Prefix of the leve author name to add.
+        """
+
+    @abstractmethod
+    def setSongAuthorName(self, songAuthorName: str) -> None:
+        """Sets the name of the song author.
+
+        :param songAuthorName: Name of the song author.
+        """
+
+    @abstractmethod
+    def setSongName(self, songName: str) -> None:
+        """Sets the name of the song name.
+
+        :param songName: Name of the song.
+        """
+
+    @abstractmethod
+    def setSongSubName(self, songSubName: str) -> None:
+        """Sets the name of the song sub name.
+
+        :param songSubName: Sub name of the song.
+        """
+
+
+# Map in the <=V3 format.
+class MapV2(Map):
+    __slots__ = ()
+
     def __init__(self, data: dict):
         """Initializes the map.
 
@@ -208,20 +462,87 @@ class Map(CustomDataContainer):
         super().__init__(data)
 
         # Load the difficulty sets.
-        self.difficultyBeatmapSets = []
-        if "_difficultyBeatmapSets" in self.data.keys():
-            # <=V3 format
-            for mapSet in self.data["_difficultyBeatmapSets"]:
-                self.difficultyBeatmapSets.append(BeatMapSet(mapSet))
-        else:
-            # >=V4 format
-            mapSets = {}
-            for beatmap in self.data["difficultyBeatmaps"]:
-                characteristic = beatmap["characteristic"]
-                if characteristic not in mapSets.keys():
-                    mapSets[characteristic] = BeatMapSet(beatmap)
-                    self.difficultyBeatmapSets.append(mapSets[characteristic])
-                mapSets[characteristic].difficultyBeatmaps.append(BeatMap(beatmap))
+        for mapSet in self.data["_difficultyBeatmapSets"]:
+            self.difficultyBeatmapSets.append(BeatMapSetV2(mapSet))
+
+    def getBeatsPerMinute(self) -> float:
+        """Returns the beats per minute of the map.
+
+        :return: The beats per minute of the map.
+        """
+
+        return self.data["_beatsPerMinute"]
+
+    def getCoverImageFilename(self) -> str:
+        """Returns the cover image filename.
+
+        :return: The cover image filename.
+        """
+
+        return self.data["_coverImageFilename"]
+
+    def setCoverImageFilename(self, coverImageFilename: str) -> None:
+        """Sets the cover image filename.
+
+        :param coverImageFilename: Name of the cover image filename.
+        """
+
+        self.data["_coverImageFilename"] = coverImageFilename
+
+    def prefixLevelAuthorName(self, levelAuthorNamePrefix: str) -> None:
+        """Prefixes the level author name.
+
+        :param levelAuthorNamePrefix: Prefix of the leve author name to add.
+        """
+
+        self.data["_levelAuthorName"] = levelAuthorNamePrefix + self.data["_levelAuthorName"]
+
+    def setSongAuthorName(self, songAuthorName: str) -> None:
+        """Sets the name of the song author.
+
+        :param songAuthorName: Name of the song author.
+        """
+
+        self.data["_songAuthorName"] = songAuthorName
+
+    def setSongName(self, songName: str) -> None:
+        """Sets the name of the song name.
+
+        :param songName: Name of the song.
+        """
+
+        self.data["_songName"] = songName
+
+    def setSongSubName(self, songSubName: str) -> None:
+        """Sets the name of the song sub name.
+
+        :param songSubName: Sub name of the song.
+        """
+
+        self.data["_songSubName"] = songSubName
+
+
+# Map in the >=V4 format.
+class MapV4(Map):
+    __slots__ = ()
+
+    def __init__(self, data: dict):
+        """Initializes the map.
+
+        :param data: Data for the map.
+        """
+
+        super().__init__(data)
+
+        # Group the difficulties into sets by characteristic.
+        mapSets = {}
+        infoBeatmaps = self.data["difficultyBeatmaps"]
+        for beatmap in infoBeatmaps:
+            characteristic = beatmap["characteristic"]
+            if characteristic not in mapSets.keys():
+                mapSets[characteristic] = BeatMapSetV4(beatmap, infoBeatmaps)
+                self.difficultyBeatmapSets.append(mapSets[characteristic])
+            mapSets[characteristic].difficultyBeatmaps.append(BeatMapV4(beatmap))
 
     def getBeatsPerMinute(self) -> float:
         """Returns the beats per minute of the map.
@@ -229,9 +550,7 @@ class Map(CustomDataContainer):
         :return: The beats per minute of the map.
         """
 
-        if "audio" in self.data.keys():
-            return self.data["audio"]["bpm"] # >=V4 format
-        return self.data["_beatsPerMinute"] # <=V3 format
+        return self.data["audio"]["bpm"]
 
     def getCoverImageFilename(self) -> str:
         """Returns the cover image filename.
@@ -239,9 +558,7 @@ class Map(CustomDataContainer):
         :return: The cover image filename.
         """
 
-        if "coverImageFilename" in self.data.keys():
-            return self.data["coverImageFilename"] # >=V4 format
-        return self.data["_coverImageFilename"] # <=V3 format
+        return self.data["coverImageFilename"]
 
     def setCoverImageFilename(self, coverImageFilename: str) -> None:
         """Sets the cover image filename.
@@ -249,10 +566,7 @@ class Map(CustomDataContainer):
         :param coverImageFilename: Name of the cover image filename.
         """
 
-        if "coverImageFilename" in self.data.keys():
-            self.data["coverImageFilename"] = coverImageFilename # >=V4 format
-        else:
-            self.data["_coverImageFilename"] = coverImageFilename # <=V3 format
+        self.data["coverImageFilename"] = coverImageFilename
 
     def prefixLevelAuthorName(self, levelAuthorNamePrefix: str) -> None:
         """Prefixes the level author name.
@@ -260,12 +574,8 @@ class Map(CustomDataContainer):
         :param levelAuthorNamePrefix: Prefix of the leve author name to add.
         """
 
-        if "difficultyBeatmaps" in self.data.keys():
-            # >=V4 format
-            for difficultyBeatmap in self.data["difficultyBeatmaps"]:
-                difficultyBeatmap["beatmapAuthors"]["mappers"][0] = levelAuthorNamePrefix + difficultyBeatmap["beatmapAuthors"]["mappers"][0]
-        else:
-            self.data["_levelAuthorName"] = levelAuthorNamePrefix + self.data["_levelAuthorName"] # <=V3 format
+        for difficultyBeatmap in self.data["difficultyBeatmaps"]:
+            difficultyBeatmap["beatmapAuthors"]["mappers"][0] = levelAuthorNamePrefix + difficultyBeatmap["beatmapAuthors"]["mappers"][0]
 
     def setSongAuthorName(self, songAuthorName: str) -> None:
         """Sets the name of the song author.
@@ -273,10 +583,7 @@ class Map(CustomDataContainer):
         :param songAuthorName: Name of the song author.
         """
 
-        if "song" in self.data.keys():
-            self.data["song"]["author"] = songAuthorName # >=V4 format
-        else:
-            self.data["_songAuthorName"] = songAuthorName # <=V3 format
+        self.data["song"]["author"] = songAuthorName
 
     def setSongName(self, songName: str) -> None:
         """Sets the name of the song name.
@@ -284,10 +591,7 @@ class Map(CustomDataContainer):
         :param songName: Name of the song.
         """
 
-        if "song" in self.data.keys():
-            self.data["song"]["title"] = songName # >=V4 format
-        else:
-            self.data["_songName"] = songName # <=V3 format
+        self.data["song"]["title"] = songName
 
     def setSongSubName(self, songSubName: str) -> None:
         """Sets the name of the song sub name.
@@ -295,7 +599,4 @@ class Map(CustomDataContainer):
         :param songSubName: Sub name of the song.
         """
 
-        if "song" in self.data.keys():
-            self.data["song"]["subTitle"] = songSubName # >=V4 format
-        else:
-            self.data["_songSubName"] = songSubName # <=V3 format
+        self.data["song"]["subTitle"] = songSubName
@@ -4,30 +4,98 @@ TheNexusAvenger
 Set of files that make up a map.
 """
 
-import json
+import hashlib
 import os
+import shutil
+import zlib
+from data import JsonCodec
+from data.DifficultyColumns import DifficultyColumns
+from data.FileHandle import COPY_CHUNK_SIZE, FileHandle, PathFileHandle, ZipFileHandle
+from data.LevelHash import calculateLevelHash, getLevelHashFileNames
 from data.Map import Map
 from data.Song import Song
-from typing import Dict, Optional, Union
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 from zipfile import ZipFile
 
+# Version of loading and writing map files, which is part of the fingerprint of a map.
+# Unmodified difficulty files are only used without serializing them if they were written with the same version.
+MAP_FILE_SET_VERSION = 2
+TEMPORARY_FILE_EXTENSION = ".tmp"
+STAGING_DIRECTORY_EXTENSION = ".staging"
+# Spaces are removed from difficulty files due to difficulties with loading maps in unmodded versions.
+DIFFICULTY_FILE_SEPARATORS = (",", ":")
 
-def removeNullValues(dictionary: Union[dict, list]) -> None:
-    """Removes null values from a given dictionary.
-    This is done recursively.
 
-    :param dictionary: Dictionary to remove null values from.
+def syncDirectory(directory: str) -> None:
+    """Flushes the entries of a directory to the disk so that renamed files persist.
+    Directories can't be opened on Windows, where renames are flushed with the files.
+
+    :param directory: Directory to flush.
+    """
+
+    if os.name == "nt":
+        return
+    directoryDescriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(directoryDescriptor)
+    finally:
+        os.close(directoryDescriptor)
+
+
+def isLevelHashFile(fileName: str) -> bool:
+    """Returns if a file of a map can be part of the level hash.
+    Only the .dat files in the top directory of the map are part of the level hash.
+
+    :param fileName: File name of the file in the map.
+    :return: Whether the file can be part of the level hash.
     """
 
-    if type(dictionary) is dict:
-        for key in list(dictionary.keys()):
-            if dictionary[key] is None:
-                del dictionary[key]
-            elif type(dictionary[key]) is dict or type(dictionary[key]) is list:
-                removeNullValues(dictionary[key])
-    elif type(dictionary) is list:
-        for entry in list(dictionary):
-            removeNullValues(entry)
+    return fileName.endswith(".dat") and "/" not in fileName and "\\" not in fileName
+
+
+class ContentsTracker:
+    def __init__(self, outputFile: Optional[BinaryIO] = None, existingFile: Optional[BinaryIO] = None, levelHash: Optional[any] = None, convertNewlines: bool = False):
+        """Creates the contents tracker.
+        The tracker is written to in chunks and tracks the size and CRC-32 of the contents.
+
+        :param outputFile: File to pass the contents to.
+        :param existingFile: Existing file to compare the contents with.
+        :param levelHash: Hash object to pass the contents to.
+        :param convertNewlines: Whether to convert newlines the same way as writing the file in text mode.
+        """
+
+        self.outputFile = outputFile
+        self.existingFile = existingFile
+        self.levelHash = levelHash
+        self.convertNewlines = convertNewlines and os.linesep != "\n"
+        self.size = 0
+        self.crc32 = 0
+        self.matchesExistingContents = (existingFile is not None)
+
+    def write(self, chunk: bytes) -> None:
+        """Writes a chunk of the contents.
+
+        :param chunk: Chunk of the contents.
+        """
+
+        if self.convertNewlines:
+            chunk = chunk.replace(b"\n", os.linesep.encode("utf8"))
+        self.size += len(chunk)
+        self.crc32 = zlib.crc32(chunk, self.crc32)
+        if self.levelHash is not None:
+            self.levelHash.update(chunk)
+        if self.matchesExistingContents:
+            self.matchesExistingContents = (self.existingFile.read(len(chunk)) == chunk)
+        if self.outputFile is not None:
+            self.outputFile.write(chunk)
+
+    def matchesExistingFile(self) -> bool:
+        """Returns if the contents written are the same as the existing file.
+
+        :return: Whether the contents match the existing file.
+        """
+
+        return self.matchesExistingContents and self.existingFile.read(1) == b""
 
 
 class MapFileSet:
@@ -35,7 +103,20 @@ class MapFileSet:
     map: Map
     song: Song
     difficultyFiles: Dict[str, dict]
-    otherFiles: Dict[str, bytes]
+    difficultyColumns: Dict[str, DifficultyColumns]
+    sourceDifficultyFiles: Dict[str, dict]
+    sourceCrc32s: Dict[str, int]
+    modifiedDifficultyFiles: set
+    unmodifiedFileNames: set
+    otherFiles: Dict[str, FileHandle]
+    fileRecords: Dict[str, dict]
+    writtenFileRecords: Dict[str, dict]
+    stagingDirectory: Optional[str]
+    pendingFiles: List[Tuple[str, str, int]]
+    sourceDataFiles: Dict[str, Union[bytes, FileHandle]]
+    levelHash: Optional[any]
+    missingLevelHashFile: Optional[str]
+    sourceArchive: Optional[ZipFile]
 
     def __init__(self):
         """Creates the map file set.
@@ -43,7 +124,29 @@ class MapFileSet:
 
         self.targetParentDirectory = None
         self.difficultyFiles = {}
+        self.difficultyColumns = {}
+        self.sourceDifficultyFiles = {}
+        self.sourceCrc32s = {}
+        self.modifiedDifficultyFiles = set()
+        self.unmodifiedFileNames = set()
         self.otherFiles = {}
+        self.fileRecords = {}
+        self.writtenFileRecords = {}
+        self.stagingDirectory = None
+        self.pendingFiles = []
+        self.sourceDataFiles = {}
+        self.levelHash = None
+        self.missingLevelHashFile = None
+        self.sourceArchive = None
+
+    def close(self) -> None:
+        """Closes the source ZIP file of the map.
+        The files of the source ZIP file can't be read after the map is closed.
+        """
+
+        if self.sourceArchive is not None:
+            self.sourceArchive.close()
+            self.sourceArchive = None
 
     def getMapName(self) -> str:
         """Returns the map name for the map.
@@ -75,8 +178,15 @@ class MapFileSet:
         if infoFileName is None:
             raise AssertionError("Info.dat file not found.")
 
+        # Store the source .dat files for calculating the source level hash.
+        for fileName in self.otherFiles.keys():
+            if fileName.endswith(".dat"):
+                self.sourceDataFiles[fileName.lower()] = self.otherFiles[fileName]
+
         # Read the info file.
-        self.map = Map(json.loads(self.otherFiles[infoFileName].decode("utf8")))
+        infoData = self.otherFiles[infoFileName].read()
+        self.sourceDataFiles[infoFileName.lower()] = infoData
+        self.map = Map(JsonCodec.loads(infoData.decode("utf8")))
         del self.otherFiles[infoFileName]
 
         # Read the difficulty maps.
@@ -84,76 +194,352 @@ class MapFileSet:
             for difficultyMap in mapSet.difficultyBeatmaps:
                 difficultyFileName = difficultyMap.getBeatMapFileName()
                 if difficultyFileName in self.otherFiles.keys():
-                    self.difficultyFiles[difficultyFileName] = json.loads(self.otherFiles[difficultyFileName])
+                    difficultyData = self.otherFiles[difficultyFileName].read()
+                    if difficultyFileName.endswith(".dat"):
+                        self.sourceDataFiles[difficultyFileName.lower()] = difficultyData
+                    self.difficultyFiles[difficultyFileName] = JsonCodec.loads(difficultyData)
+                    self.sourceDifficultyFiles[difficultyFileName] = self.difficultyFiles[difficultyFileName]
+                    self.sourceCrc32s[difficultyFileName] = zlib.crc32(difficultyData)
                     del self.otherFiles[difficultyFileName]
 
-    def write(self) -> None:
+    def getDifficultyColumns(self, fileName: str) -> DifficultyColumns:
+        """Returns the columnar view of a difficulty file.
+        Changed columns are stored in the difficulty file when the map is written.
+
+        :param fileName: File name of the difficulty file.
+        :return: The columnar view of the difficulty file.
+        """
+
+        difficultyData = self.difficultyFiles[fileName]
+        if fileName not in self.difficultyColumns.keys() or self.difficultyColumns[fileName].difficultyData is not difficultyData:
+            self.difficultyColumns[fileName] = DifficultyColumns(difficultyData)
+        return self.difficultyColumns[fileName]
+
+    def setDifficultyFileModified(self, fileName: str) -> None:
+        """Marks a difficulty file as modified by a step so that it is serialized when the map is written.
+
+        :param fileName: File name of the difficulty file.
+        """
+
+        self.modifiedDifficultyFiles.add(fileName)
+
+    def isDifficultyFileModified(self, fileName: str) -> bool:
+        """Returns if a difficulty file may be different from the source file.
+        Difficulty files that were replaced instead of changed are also modified.
+
+        :param fileName: File name of the difficulty file.
+        :return: Whether the difficulty file is modified.
+        """
+
+        return fileName in self.modifiedDifficultyFiles or self.sourceDifficultyFiles.get(fileName) is not self.difficultyFiles[fileName]
+
+    def getSourceLevelHash(self) -> str:
+        """Returns the level hash of the map before it was processed.
+
+        :return: The level hash of the source map.
+        """
+
+        return calculateLevelHash(self.sourceDataFiles)
+
+    def getLevelHash(self) -> str:
+        """Returns the level hash of the written map.
+        The hash is calculated while the files are serialized, so the written files are not read again.
+
+        :return: The level hash of the written map.
+        """
+
+        if self.missingLevelHashFile is not None:
+            raise KeyError(self.missingLevelHashFile)
+        if self.levelHash is None:
+            raise AssertionError("Map was not written with calculateHash.")
+        return self.levelHash.hexdigest()
+
+    def write(self, calculateHash: bool = False) -> None:
         """Writes the map to the file system.
+        Changed files are written to temporary files that are moved into place once all the files are written,
+        so an interrupted write never leaves partially written files. New maps are written to a staging
+        directory that is moved into place as a whole.
+        The records of the written files are stored in writtenFileRecords.
+
+        :param calculateHash: Whether to calculate the level hash of the written map for getLevelHash.
         """
 
+        # Prepare the directory to write to.
+        self.writtenFileRecords = {}
+        self.pendingFiles = []
+        self.levelHash = hashlib.sha1() if calculateHash else None
+        self.missingLevelHashFile = None
+        self.stagingDirectory = None
+        self.unmodifiedFileNames = set()
+        if os.path.exists(self.targetParentDirectory):
+            self.removeTemporaryFiles()
+        else:
+            self.stagingDirectory = self.targetParentDirectory + STAGING_DIRECTORY_EXTENSION
+            if os.path.exists(self.stagingDirectory):
+                shutil.rmtree(self.stagingDirectory)
+            os.makedirs(self.stagingDirectory)
+
+        # Store the changes of the columnar views.
+        for fileName, difficultyColumns in self.difficultyColumns.items():
+            if self.difficultyFiles.get(fileName) is difficultyColumns.difficultyData and difficultyColumns.hasChanges():
+                difficultyColumns.applyChanges()
+                self.setDifficultyFileModified(fileName)
+
         # Write the info file.
-        self.writeJsonFile("Info.dat", self.map.data, indent=4)
+        self.writeJsonFile("Info.dat", self.map.data, indent=4, levelHash=self.levelHash)
+
+        # Write the files in the level hash in the order they are hashed.
+        writtenFileNames = set()
+        if calculateHash:
+            writtenFileNames = self.writeLevelHashFiles()
 
         # Write the difficulty files.
-        # Spaces are removed due to difficulties with loading maps in unmodded versions.
         for fileName in self.difficultyFiles.keys():
-            self.writeJsonFile(fileName, self.difficultyFiles[fileName], separators=(",", ":"))
+            if fileName not in writtenFileNames:
+                self.writeDifficultyFile(fileName)
 
         # Write the other files.
         for fileName in self.otherFiles.keys():
             self.writeFile(fileName, self.otherFiles[fileName])
 
-    def writeJsonFile(self, fileName: str, data: Union[dict, list], indent=None, separators: Optional[tuple] = None) -> None:
+        # Move the written files into place.
+        self.commitFiles()
+
+    def writeLevelHashFiles(self) -> set:
+        """Writes the difficulty files that are part of the level hash in the order they are hashed.
+        Other files that are part of the level hash are read into the hash without being written.
+
+        :return: File names of the difficulty files that were written.
+        """
+
+        # Determine the files that can be part of the level hash.
+        difficultyFileNames = {fileName.lower(): fileName for fileName in self.difficultyFiles.keys() if isLevelHashFile(fileName)}
+        otherFileNames = {fileName.lower(): fileName for fileName in self.otherFiles.keys() if isLevelHashFile(fileName)}
+
+        # Write the files.
+        writtenFileNames = set()
+        for hashedFileName in getLevelHashFileNames(self.map.data):
+            if hashedFileName in difficultyFileNames.keys():
+                fileName = difficultyFileNames[hashedFileName]
+                if fileName not in writtenFileNames:
+                    self.writeDifficultyFile(fileName, self.levelHash)
+                    writtenFileNames.add(fileName)
+                elif fileName in self.unmodifiedFileNames:
+                    # Read files that are used by multiple difficulties again for the hash.
+                    self.hashExistingFile(fileName, self.levelHash)
+                else:
+                    # Serialize files that are used by multiple difficulties again for the hash.
+                    JsonCodec.dump(self.difficultyFiles[fileName], ContentsTracker(levelHash=self.levelHash, convertNewlines=True), separators=DIFFICULTY_FILE_SEPARATORS, skipNullValues=True)
+            elif hashedFileName in otherFileNames.keys():
+                self.otherFiles[otherFileNames[hashedFileName]].copyTo(ContentsTracker(levelHash=self.levelHash))
+            else:
+                # Stop calculating the level hash if a file is missing.
+                self.missingLevelHashFile = hashedFileName
+                self.levelHash = None
+                break
+        return writtenFileNames
+
+    def writeDifficultyFile(self, fileName: str, levelHash: Optional[any] = None) -> None:
+        """Writes a difficulty file for the map.
+        Difficulty files that no step modified are the same as the last time they were written if the source file
+        and the version are the same, so they are not serialized again if the existing file matches the record of the last write.
+
+        :param fileName: File name to write.
+        :param levelHash: Hash object to pass the serialized contents to.
+        """
+
+        # Use the existing file if the difficulty file and the source file are unchanged.
+        if not self.isDifficultyFileModified(fileName):
+            filePath = os.path.join(self.targetParentDirectory, fileName)
+            fileRecord = self.fileRecords.get(fileName)
+            if self.stagingDirectory is None and fileRecord is not None and fileRecord.get("SourceCrc32") == self.sourceCrc32s[fileName] and fileRecord.get("Version") == MAP_FILE_SET_VERSION and os.path.exists(filePath):
+                fileStat = os.stat(filePath)
+                if fileRecord["Size"] == fileStat.st_size and fileRecord["ModifiedTime"] == fileStat.st_mtime_ns:
+                    if levelHash is not None:
+                        self.hashExistingFile(fileName, levelHash)
+                    self.unmodifiedFileNames.add(fileName)
+                    self.recordFile(fileName, filePath, fileRecord["Crc32"])
+                    return
+
+        # Serialize the file.
+        self.writeJsonFile(fileName, self.difficultyFiles[fileName], separators=DIFFICULTY_FILE_SEPARATORS, levelHash=levelHash)
+
+    def hashExistingFile(self, fileName: str, levelHash: any) -> None:
+        """Passes the contents of a file that is already written to a hash object.
+
+        :param fileName: File name of the file in the map.
+        :param levelHash: Hash object to pass the contents to.
+        """
+
+        with open(os.path.join(self.targetParentDirectory, fileName), "rb") as file:
+            for chunk in iter(lambda: file.read(COPY_CHUNK_SIZE), b""):
+                levelHash.update(chunk)
+
+    def removeTemporaryFiles(self) -> None:
+        """Removes the temporary files left in the target directory by an interrupted write.
+        """
+
+        for directory, _, fileNames in os.walk(self.targetParentDirectory):
+            for fileName in fileNames:
+                if fileName.endswith(TEMPORARY_FILE_EXTENSION):
+                    os.remove(os.path.join(directory, fileName))
+
+    def writePendingFile(self, fileName: str, writeContents: Callable[[BinaryIO], int]) -> None:
+        """Writes a file to the staging directory or a temporary file to be moved into place by commitFiles.
+
+        :param fileName: File name to write.
+        :param writeContents: Function that writes the contents to the opened file and returns the CRC-32 of the contents.
+        """
+
+        if self.stagingDirectory is not None:
+            writePath = os.path.join(self.stagingDirectory, fileName)
+        else:
+            writePath = os.path.join(self.targetParentDirectory, fileName) + TEMPORARY_FILE_EXTENSION
+        if not os.path.exists(os.path.dirname(writePath)):
+            os.makedirs(os.path.dirname(writePath))
+        with open(writePath, "wb") as file:
+            crc32 = writeContents(file)
+        self.pendingFiles.append((fileName, writePath, crc32))
+
+    def commitFiles(self) -> None:
+        """Moves the files written by writePendingFile into place.
+        The files are flushed to the disk together before any of them are moved.
+        """
+
+        # Flush the files to the disk.
+        for _, writePath, _ in self.pendingFiles:
+            with open(writePath, "rb+") as file:
+                os.fsync(file.fileno())
+
+        # Move the files into place.
+        if self.stagingDirectory is not None:
+            os.replace(self.stagingDirectory, self.targetParentDirectory)
+            syncDirectory(os.path.dirname(self.targetParentDirectory))
+            self.stagingDirectory = None
+        elif len(self.pendingFiles) > 0:
+            for fileName, writePath, _ in self.pendingFiles:
+                os.replace(writePath, os.path.join(self.targetParentDirectory, fileName))
+            syncDirectory(self.targetParentDirectory)
+
+        # Record the files.
+        for fileName, _, crc32 in self.pendingFiles:
+            self.recordFile(fileName, os.path.join(self.targetParentDirectory, fileName), crc32)
+        self.pendingFiles = []
+
+    def isFileUnchanged(self, fileName: str, filePath: str, size: int, crc32: int, compareContents: Callable[[], bool]) -> bool:
+        """Returns if an existing file has the same contents as the contents to write.
+        If the size and modified time of the file match the record from the last write,
+        the CRC-32 of the record is compared instead of reading the file.
+
+        :param fileName: File name of the file in the map.
+        :param filePath: Path of the existing file.
+        :param size: Size of the contents to write.
+        :param crc32: CRC-32 of the contents to write.
+        :param compareContents: Function that compares the contents of the existing file with the contents to write.
+        :return: Whether the file is unchanged.
+        """
+
+        if not os.path.exists(filePath):
+            return False
+        fileStat = os.stat(filePath)
+        if fileStat.st_size != size:
+            return False
+        if fileName in self.fileRecords.keys():
+            fileRecord = self.fileRecords[fileName]
+            if fileRecord["Size"] == fileStat.st_size and fileRecord["ModifiedTime"] == fileStat.st_mtime_ns:
+                return fileRecord["Crc32"] == crc32
+        return compareContents()
+
+    def recordFile(self, fileName: str, filePath: str, crc32: int) -> None:
+        """Records the size, modified time, and CRC-32 of a file that was written or verified.
+
+        :param fileName: File name of the file in the map.
+        :param filePath: Path of the file.
+        :param crc32: CRC-32 of the contents of the file.
+        """
+
+        fileStat = os.stat(filePath)
+        self.writtenFileRecords[fileName] = {
+            "Size": fileStat.st_size,
+            "ModifiedTime": fileStat.st_mtime_ns,
+            "Crc32": crc32,
+        }
+
+        # Store the CRC-32 of the source of unmodified difficulty files and the version they were written with.
+        # If both are the same next time, the existing file can be used without serializing the file.
+        if fileName in self.difficultyFiles.keys() and fileName in self.sourceCrc32s.keys() and not self.isDifficultyFileModified(fileName):
+            self.writtenFileRecords[fileName]["SourceCrc32"] = self.sourceCrc32s[fileName]
+            self.writtenFileRecords[fileName]["Version"] = MAP_FILE_SET_VERSION
+
+    def writeJsonFile(self, fileName: str, data: Union[dict, list], indent=None, separators: Optional[tuple] = None, levelHash: Optional[any] = None) -> None:
         """Writes a JSON file for the map.
-        JSON files require a special case since the serialization order is random.
+        The data is serialized in chunks with null values removed. Existing files are only written if the
+        serialized contents changed, which serializes the data a second time.
 
         :param fileName: File name to write.
         :param data: Data to write to the file.
         :param separators: Separators to use when serializing JSON.
         :param indent: Indenting to use with the JSON.
+        :param levelHash: Hash object to pass the serialized contents to.
         """
 
-        # Create the parent directory.
-        if not os.path.exists(self.targetParentDirectory):
-            os.makedirs(self.targetParentDirectory)
+        def writeContents(file: BinaryIO, levelHash: Optional[any] = None) -> int:
+            contentsTracker = ContentsTracker(file, levelHash=levelHash, convertNewlines=True)
+            JsonCodec.dump(data, contentsTracker, indent=indent, separators=separators, skipNullValues=True)
+            return contentsTracker.crc32
+
+        # Write new files directly.
+        filePath = os.path.join(self.targetParentDirectory, fileName)
+        if self.stagingDirectory is not None or not os.path.exists(filePath):
+            self.writePendingFile(fileName, lambda file: writeContents(file, levelHash))
+            return
 
         # Return if the file contents are the same.
         # For syncing files between systems, this prevents constantly overwriting files that don't change.
-        removeNullValues(data)
-        filePath = os.path.join(self.targetParentDirectory, fileName)
-        if os.path.exists(filePath):
-            with open(filePath, "rb") as file:
-                if json.loads(file.read()) == data:
-                    return
+        contentsTracker = ContentsTracker(levelHash=levelHash, convertNewlines=True)
+        JsonCodec.dump(data, contentsTracker, indent=indent, separators=separators, skipNullValues=True)
+        def compareContents() -> bool:
+            with open(filePath, "rb") as existingFile:
+                existingContentsTracker = ContentsTracker(existingFile=existingFile, convertNewlines=True)
+                JsonCodec.dump(data, existingContentsTracker, indent=indent, separators=separators, skipNullValues=True)
+                return existingContentsTracker.matchesExistingFile()
+        if self.isFileUnchanged(fileName, filePath, contentsTracker.size, contentsTracker.crc32, compareContents):
+            self.recordFile(fileName, filePath, contentsTracker.crc32)
+            return
 
         # Write the file.
-        with open(filePath, "w", encoding="utf8") as file:
-            file.write(json.dumps(data, indent=indent, separators=separators, ensure_ascii=False))
+        self.writePendingFile(fileName, writeContents)
 
-    def writeFile(self, fileName: str, data: bytes) -> None:
+    def writeFile(self, fileName: str, fileHandle: FileHandle) -> None:
         """Writes a file for the map.
+        The contents are copied in chunks instead of being read into memory.
 
         :param fileName: File name to write.
-        :param data: Data to write to the file.
+        :param fileHandle: Handle to the contents to write to the file.
         """
 
-        # Create the parent directory.
+        # Ignore directories.
+        # Directories in ZIP files are created by the files in them.
         filePath = os.path.join(self.targetParentDirectory, fileName)
-        if not os.path.exists(os.path.dirname(filePath)):
-            os.makedirs(os.path.dirname(filePath))
-        if os.path.isdir(filePath):
+        if fileName.endswith("/") or os.path.isdir(filePath):
             return
 
         # Return if the file contents are the same.
         # For syncing files between systems, this prevents constantly overwriting files that don't change.
-        if os.path.exists(filePath):
-            with open(filePath, "rb") as file:
-                if file.read() == data:
-                    return
+        # The CRC-32 is only determined before writing if there is an existing file with the same size to compare with.
+        if self.stagingDirectory is None and os.path.exists(filePath) and os.path.getsize(filePath) == fileHandle.getSize():
+            crc32 = fileHandle.getCrc32()
+            if self.isFileUnchanged(fileName, filePath, fileHandle.getSize(), crc32, lambda: fileHandle.matchesFile(filePath)):
+                self.recordFile(fileName, filePath, crc32)
+                return
 
         # Write the file.
-        with open(filePath, "wb") as file:
-            file.write(data)
+        # The CRC-32 is calculated while the contents are copied.
+        def writeContents(file: BinaryIO) -> int:
+            contentsTracker = ContentsTracker(file)
+            fileHandle.copyTo(contentsTracker)
+            return contentsTracker.crc32
+        self.writePendingFile(fileName, writeContents)
 
 
 def loadMapFromDirectory(song: Song, targetParentDirectory: str) -> MapFileSet:
@@ -166,8 +552,7 @@ def loadMapFromDirectory(song: Song, targetParentDirectory: str) -> MapFileSet:
     fileSet = MapFileSet()
     fileSet.song = song
     for fileName in os.listdir(song.mapDownloadPath):
-        with open(os.path.join(song.mapDownloadPath, fileName), "rb") as file:
-            fileSet.otherFiles[fileName] = file.read()
+        fileSet.otherFiles[fileName] = PathFileHandle(os.path.join(song.mapDownloadPath, fileName))
     fileSet.loadFiles()
     fileSet.targetParentDirectory = os.path.join(targetParentDirectory, os.path.basename(song.mapDownloadPath).replace(".zip", ""))
     return fileSet
@@ -175,23 +560,29 @@ def loadMapFromDirectory(song: Song, targetParentDirectory: str) -> MapFileSet:
 
 def loadMapFromZip(song: Song, targetParentDirectory: str) -> MapFileSet:
     """Loads a map file from a ZIP file.
+    The ZIP file is kept open to read the files of the map until the map is closed.
 
     :param song: Song entry to process.
     :param targetParentDirectory: Parent directory to save the map to.
     """
 
-    with ZipFile(song.mapDownloadPath) as file:
-        fileSet = MapFileSet()
-        fileSet.song = song
-        for fileName in file.namelist():
-            fileSet.otherFiles[fileName] = file.read(fileName)
+    fileSet = MapFileSet()
+    fileSet.song = song
+    fileSet.sourceArchive = ZipFile(song.mapDownloadPath)
+    try:
+        for fileInfo in fileSet.sourceArchive.infolist():
+            fileSet.otherFiles[fileInfo.filename] = ZipFileHandle(fileSet.sourceArchive, fileInfo.filename, fileInfo.file_size, fileInfo.CRC)
         fileSet.loadFiles()
-        fileSet.targetParentDirectory = os.path.join(targetParentDirectory, os.path.basename(song.mapDownloadPath).replace(".zip", ""))
-        return fileSet
+    except Exception:
+        fileSet.close()
+        raise
+    fileSet.targetParentDirectory = os.path.join(targetParentDirectory, os.path.basename(song.mapDownloadPath).replace(".zip", ""))
+    return fileSet
 
 
 def loadMap(song: Song, targetParentDirectory: str) -> MapFileSet:
     """Loads a map file or directory.
+    The map must be closed once its files are no longer read.
 
     :param song: Song entry to process.
     :param targetParentDirectory: Parent directory to save the map to.
@@ -0,0 +1,76 @@
+"""
+TheNexusAvenger
+
+Stores the hashes of maps with the fingerprints of the files they were calculated from.
+"""
+
+import json
+import os
+from typing import Optional
+
+DEFAULT_LOCATION = os.path.realpath(os.path.join(__file__, "..", "..", "maps", "MapHashCache.json"))
+
+
+class MapHashCache:
+    def __init__(self, fileLocation: str = DEFAULT_LOCATION):
+        """Creates the map hash cache.
+
+        :param fileLocation: Location of the cache file.
+        """
+
+        self.fileLocation = fileLocation
+        self.entries = {}
+        self.changed = False
+        if os.path.exists(fileLocation):
+            with open(fileLocation, encoding="utf8") as file:
+                self.entries = json.loads(file.read())
+
+    def getHash(self, mapPath: str, fingerprint: any) -> Optional[str]:
+        """Returns the stored hash of a map if the files of the map have not changed.
+
+        :param mapPath: Key of the map.
+        :param fingerprint: Current fingerprint of the files of the map.
+        :return: The stored hash, or None if the map was not hashed or the files changed.
+        """
+
+        if mapPath not in self.entries.keys() or self.entries[mapPath]["Fingerprint"] != fingerprint:
+            return None
+        return self.entries[mapPath]["Hash"]
+
+    def setHash(self, mapPath: str, fingerprint: any, mapHash: str) -> None:
+        """Sets the hash of a map.
+
+        :param mapPath: Key of the map.
+        :param fingerprint: Fingerprint of the files the hash was calculated from.
+        :param mapHash: Hash of the map.
+        """
+
+        self.entries[mapPath] = {
+            "Fingerprint": fingerprint,
+            "Hash": mapHash,
+        }
+        self.changed = True
+
+    def removeMissingEntries(self, mapPaths: set) -> None:
+        """Removes the entries of maps that are no longer hashed.
+
+        :param mapPaths: Keys of the maps to keep.
+        """
+
+        for mapPath in list(self.entries.keys()):
+            if mapPath not in mapPaths:
+                del self.entries[mapPath]
+                self.changed = True
+
+    def save(self) -> None:
+        """Saves the cache to the file system if it changed.
+        """
+
+        if not self.changed:
+            return
+        parentDirectory = os.path.dirname(self.fileLocation)
+        if not os.path.exists(parentDirectory):
+            os.makedirs(parentDirectory)
+        with open(self.fileLocation, "w", encoding="utf8") as file:
+            file.write(json.dumps(self.entries, indent=4))
+        self.changed = False
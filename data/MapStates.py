@@ -0,0 +1,117 @@
+"""
+TheNexusAvenger
+
+Stores the progress of the maps through downloading and processing.
+"""
+
+import os
+import time
+from data.Database import Database
+from data.Song import Song
+from typing import Dict, List, Optional
+
+# Amount of failed attempts in a row before a map is quarantined.
+DEFAULT_MAX_ATTEMPTS = 3
+# Stages of the maps.
+STAGE_DOWNLOADED = "Downloaded"
+STAGE_GENERATED = "Generated"
+STAGE_PROCESSED = "Processed"
+
+
+def getMapKey(song: Song) -> str:
+    """Returns the key of the state of a song's map.
+
+    :param song: Song to get the key of.
+    :return: The key of the map.
+    """
+
+    return song.mapSource + "/" + os.path.basename(song.mapDownloadPath).replace(".zip", "")
+
+
+class MapStates:
+    def __init__(self, database: Database, maxAttempts: int = DEFAULT_MAX_ATTEMPTS):
+        """Creates the map states.
+
+        :param database: Database to store the states in.
+        :param maxAttempts: Amount of failed attempts in a row before a map is quarantined.
+        """
+
+        self.database = database
+        self.maxAttempts = maxAttempts
+
+    def getState(self, song: Song) -> Optional[dict]:
+        """Returns the stored state of a song's map.
+
+        :param song: Song to get the state of.
+        :return: The state of the map, or None if the map has no state.
+        """
+
+        states = self.database.execute("SELECT Stage,LastError,Attempts,Quarantined,CreatedTime,UpdatedTime FROM MapStates WHERE MapKey = ?;", [getMapKey(song)])
+        if len(states) == 0:
+            return None
+        return {
+            "Stage": states[0][0],
+            "LastError": states[0][1],
+            "Attempts": states[0][2],
+            "Quarantined": (states[0][3] == 1),
+            "CreatedTime": states[0][4],
+            "UpdatedTime": states[0][5],
+        }
+
+    def getQuarantinedMapKeys(self) -> Dict[str, str]:
+        """Returns the maps that are quarantined.
+
+        :return: The last errors of the quarantined maps, keyed by the key of the map.
+        """
+
+        quarantinedMapKeys = {}
+        for mapKey, lastError in self.database.iterate("SELECT MapKey,LastError FROM MapStates WHERE Quarantined = 1;"):
+            quarantinedMapKeys[mapKey] = lastError
+        return quarantinedMapKeys
+
+    def setStages(self, songs: List[Song], stage: str) -> None:
+        """Stores that songs' maps completed a stage.
+        The failed attempts of the maps are reset. Maps that were already at the stage are not changed.
+
+        :param songs: Songs that completed the stage.
+        :param stage: Stage that was completed.
+        """
+
+        currentTime = time.time()
+        self.database.executeMany("INSERT INTO MapStates VALUES (?,?,NULL,0,0,?,?) ON CONFLICT(MapKey) DO UPDATE SET Stage = excluded.Stage, LastError = NULL, Attempts = 0, Quarantined = 0, UpdatedTime = excluded.UpdatedTime WHERE Stage IS NOT excluded.Stage OR Attempts != 0 OR Quarantined != 0;", [[getMapKey(song), stage, currentTime, currentTime] for song in songs])
+        self.database.commit()
+
+    def recordFailure(self, song: Song, stage: str, error: Exception) -> bool:
+        """Stores that a song's map failed a stage.
+        The map is quarantined if it failed the maximum amount of attempts in a row.
+
+        :param song: Song that failed the stage.
+        :param stage: Stage that failed.
+        :param error: Error of the failure.
+        :return: Whether the map is quarantined.
+        """
+
+        # Store the failure.
+        mapKey = getMapKey(song)
+        currentTime = time.time()
+        lastError = stage + ": " + type(error).__name__ + ": " + str(error)
+        self.database.execute("INSERT INTO MapStates VALUES (?,NULL,?,1,0,?,?) ON CONFLICT(MapKey) DO UPDATE SET LastError = excluded.LastError, Attempts = Attempts + 1, UpdatedTime = excluded.UpdatedTime;", [mapKey, lastError, currentTime, currentTime])
+
+        # Quarantine the map if it failed too many times.
+        self.database.execute("UPDATE MapStates SET Quarantined = 1 WHERE MapKey = ? AND Attempts >= ?;", [mapKey, self.maxAttempts])
+        self.database.commit()
+        return len(self.database.execute("SELECT MapKey FROM MapStates WHERE MapKey = ? AND Quarantined = 1;", [mapKey])) != 0
+
+    def clearQuarantine(self, mapKeys: Optional[List[str]] = None) -> int:
+        """Clears the quarantine and failed attempts of maps so they are attempted again.
+
+        :param mapKeys: Keys of the maps to clear. All the quarantined maps are cleared if none are provided.
+        :return: The amount of maps that were cleared.
+        """
+
+        if mapKeys is None:
+            mapKeys = list(self.getQuarantinedMapKeys().keys())
+        for mapKey in mapKeys:
+            self.database.execute("UPDATE MapStates SET Quarantined = 0, Attempts = 0 WHERE MapKey = ?;", [mapKey])
+        self.database.commit()
+        return len(mapKeys)
@@ -0,0 +1,123 @@
+"""
+TheNexusAvenger
+
+Stores the fingerprints of the inputs of processed maps.
+"""
+
+import json
+import os
+from data.MapFileSet import TEMPORARY_FILE_EXTENSION, syncDirectory
+from typing import Dict, Optional
+
+DEFAULT_FILE_NAME = "ProcessingManifest.json"
+DEFAULT_LOCATION = os.path.realpath(os.path.join(__file__, "..", "..", "maps", DEFAULT_FILE_NAME))
+
+
+class ProcessingManifest:
+    def __init__(self, fileLocation: str = DEFAULT_LOCATION):
+        """Creates the processing manifest.
+
+        :param fileLocation: Location of the manifest file.
+        """
+
+        self.fileLocation = fileLocation
+        self.entries = {}
+        if os.path.exists(fileLocation):
+            with open(fileLocation, encoding="utf8") as file:
+                self.entries = json.loads(file.read())
+
+    def getFingerprint(self, outputDirectory: str) -> Optional[str]:
+        """Returns the fingerprint of the inputs that were last processed to an output directory.
+
+        :param outputDirectory: Key of the output directory.
+        :return: The stored fingerprint, or None if the output directory was not processed.
+        """
+
+        if outputDirectory not in self.entries.keys():
+            return None
+        return self.entries[outputDirectory]["Fingerprint"]
+
+    def setFingerprint(self, outputDirectory: str, fingerprint: str) -> None:
+        """Sets the fingerprint of the inputs that were processed to an output directory.
+
+        :param outputDirectory: Key of the output directory.
+        :param fingerprint: Fingerprint of the inputs.
+        """
+
+        if outputDirectory not in self.entries.keys():
+            self.entries[outputDirectory] = {}
+        self.entries[outputDirectory]["Fingerprint"] = fingerprint
+
+    def getFileRecords(self, outputDirectory: str) -> Dict[str, dict]:
+        """Returns the records of the files that were last written to an output directory.
+
+        :param outputDirectory: Key of the output directory.
+        :return: The records of the files, keyed by the file name.
+        """
+
+        if outputDirectory not in self.entries.keys() or "Files" not in self.entries[outputDirectory].keys():
+            return {}
+        return self.entries[outputDirectory]["Files"]
+
+    def setFileRecords(self, outputDirectory: str, fileRecords: Dict[str, dict]) -> None:
+        """Sets the records of the files that were written to an output directory.
+
+        :param outputDirectory: Key of the output directory.
+        :param fileRecords: Records of the files, keyed by the file name.
+        """
+
+        if outputDirectory not in self.entries.keys():
+            self.entries[outputDirectory] = {}
+        self.entries[outputDirectory]["Files"] = fileRecords
+
+    def getLevelHashes(self, outputDirectory: str) -> Optional[Dict[str, str]]:
+        """Returns the level hashes of the map that was last written to an output directory.
+
+        :param outputDirectory: Key of the output directory.
+        :return: The level hashes of the processed map and the source map, or None if they were not calculated.
+        """
+
+        if outputDirectory not in self.entries.keys() or "LevelHashes" not in self.entries[outputDirectory].keys():
+            return None
+        return self.entries[outputDirectory]["LevelHashes"]
+
+    def setLevelHashes(self, outputDirectory: str, levelHashes: Optional[Dict[str, str]]) -> None:
+        """Sets the level hashes of the map that was written to an output directory.
+
+        :param outputDirectory: Key of the output directory.
+        :param levelHashes: Level hashes of the processed map and the source map, or None if they were not calculated.
+        """
+
+        if outputDirectory not in self.entries.keys():
+            self.entries[outputDirectory] = {}
+        if levelHashes is None:
+            if "LevelHashes" in self.entries[outputDirectory].keys():
+                del self.entries[outputDirectory]["LevelHashes"]
+            return
+        self.entries[outputDirectory]["LevelHashes"] = levelHashes
+
+    def removeEntry(self, outputDirectory: str) -> None:
+        """Removes the entry for an output directory.
+
+        :param outputDirectory: Key of the output directory.
+        """
+
+        if outputDirectory in self.entries.keys():
+            del self.entries[outputDirectory]
+
+    def save(self) -> None:
+        """Saves the manifest to the file system.
+        The manifest is written to a temporary file that replaces the manifest once it is complete,
+        so an interrupted save keeps the last saved manifest.
+        """
+
+        parentDirectory = os.path.dirname(self.fileLocation)
+        if not os.path.exists(parentDirectory):
+            os.makedirs(parentDirectory)
+        temporaryFileLocation = self.fileLocation + TEMPORARY_FILE_EXTENSION
+        with open(temporaryFileLocation, "w", encoding="utf8") as file:
+            file.write(json.dumps(self.entries, indent=4))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporaryFileLocation, self.fileLocation)
+        syncDirectory(parentDirectory)
@@ -0,0 +1,154 @@
+"""
+TheNexusAvenger
+
+Collects the time and memory of each step of processing maps into a report.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+# Amount of the slowest maps to include in the report.
+SLOWEST_MAPS = 10
+PERCENTILES = [50, 90, 99]
+
+
+def getPercentile(sortedValues: List[float], percentile: float) -> float:
+    """Returns a percentile of sorted values using the nearest rank.
+
+    :param sortedValues: Values to get the percentile of, sorted in ascending order.
+    :param percentile: Percentile to get, from 0 to 100.
+    :return: The value at the percentile.
+    """
+
+    rank = max(1, -(-len(sortedValues) * percentile // 100))
+    return sortedValues[int(rank) - 1]
+
+
+def formatTime(seconds: float) -> str:
+    """Formats a time for the text summary.
+
+    :param seconds: Time in seconds.
+    :return: The formatted time.
+    """
+
+    if seconds >= 1:
+        return str(round(seconds, 2)) + " s"
+    return str(round(seconds * 1000, 1)) + " ms"
+
+
+class ProcessingReport:
+    def __init__(self):
+        """Creates the processing report.
+        """
+
+        self.mapMeasurements = {}
+
+    def addMap(self, mapName: str, measurements: Dict[str, dict]) -> None:
+        """Adds the measurements of processing a map.
+
+        :param mapName: Name of the map.
+        :param measurements: Measurements of each step, keyed by the name of the step. Each has the Time in seconds
+                             and the PeakMemory in bytes, which is None if the memory was not measured.
+        """
+
+        self.mapMeasurements[mapName] = measurements
+
+    def getSummary(self) -> dict:
+        """Returns the summary of the measurements.
+
+        :return: The totals and percentiles of each step and the slowest maps.
+        """
+
+        # Group the measurements by step.
+        stepTimes = {}
+        stepPeakMemory = {}
+        mapTimes = {}
+        for mapName, measurements in self.mapMeasurements.items():
+            mapTimes[mapName] = 0
+            for stepName, measurement in measurements.items():
+                if stepName not in stepTimes.keys():
+                    stepTimes[stepName] = []
+                    stepPeakMemory[stepName] = []
+                stepTimes[stepName].append(measurement["Time"])
+                if measurement["PeakMemory"] is not None:
+                    stepPeakMemory[stepName].append(measurement["PeakMemory"])
+                mapTimes[mapName] += measurement["Time"]
+
+        # Summarize the steps.
+        steps = {}
+        for stepName, times in stepTimes.items():
+            sortedTimes = sorted(times)
+            steps[stepName] = {
+                "TotalTime": sum(sortedTimes),
+                "MaximumTime": sortedTimes[-1],
+            }
+            for percentile in PERCENTILES:
+                steps[stepName]["P" + str(percentile) + "Time"] = getPercentile(sortedTimes, percentile)
+            steps[stepName]["MaximumPeakMemory"] = max(stepPeakMemory[stepName]) if len(stepPeakMemory[stepName]) > 0 else None
+
+        # Determine the slowest maps.
+        slowestMaps = []
+        for mapName in sorted(mapTimes.keys(), key=lambda name: mapTimes[name], reverse=True)[:SLOWEST_MAPS]:
+            measurements = self.mapMeasurements[mapName]
+            slowestStep = max(measurements.keys(), key=lambda stepName: measurements[stepName]["Time"]) if len(measurements) > 0 else None
+            slowestMaps.append({
+                "Map": mapName,
+                "Time": mapTimes[mapName],
+                "SlowestStep": slowestStep,
+                "SlowestStepTime": measurements[slowestStep]["Time"] if slowestStep is not None else None,
+            })
+        return {
+            "Maps": len(self.mapMeasurements),
+            "TotalTime": sum(mapTimes.values()),
+            "Steps": steps,
+            "SlowestMaps": slowestMaps,
+        }
+
+    def getTextSummary(self, summary: Optional[dict] = None) -> str:
+        """Returns the summary of the measurements as plain text.
+
+        :param summary: Summary to format. It is created if none is provided.
+        :return: The plain text summary.
+        """
+
+        if summary is None:
+            summary = self.getSummary()
+        lines = ["Processed " + str(summary["Maps"]) + " maps in " + formatTime(summary["TotalTime"]) + "."]
+        lines.append("Steps:")
+        for stepName, step in summary["Steps"].items():
+            line = "\t" + stepName + ": total " + formatTime(step["TotalTime"])
+            for percentile in PERCENTILES:
+                line += ", p" + str(percentile) + " " + formatTime(step["P" + str(percentile) + "Time"])
+            line += ", max " + formatTime(step["MaximumTime"])
+            if step["MaximumPeakMemory"] is not None:
+                line += ", peak memory " + str(round(step["MaximumPeakMemory"] / (1024 * 1024), 2)) + " MiB"
+            lines.append(line)
+        lines.append("Slowest maps:")
+        for slowestMap in summary["SlowestMaps"]:
+            line = "\t" + slowestMap["Map"] + ": " + formatTime(slowestMap["Time"])
+            if slowestMap["SlowestStep"] is not None:
+                line += " (" + slowestMap["SlowestStep"] + " " + formatTime(slowestMap["SlowestStepTime"]) + ")"
+            lines.append(line)
+        return "\n".join(lines) + "\n"
+
+    def save(self, fileLocationWithoutExtension: str) -> str:
+        """Saves the report as a JSON file with the measurements of every map and a plain text summary.
+
+        :param fileLocationWithoutExtension: Location to save the report to without the extension.
+        :return: The plain text summary.
+        """
+
+        parentDirectory = os.path.dirname(fileLocationWithoutExtension)
+        if not os.path.exists(parentDirectory):
+            os.makedirs(parentDirectory)
+        summary = self.getSummary()
+        textSummary = self.getTextSummary(summary)
+        with open(fileLocationWithoutExtension + ".json", "w", encoding="utf8") as file:
+            file.write(json.dumps({
+                "Summary": summary,
+                "Maps": self.mapMeasurements,
+            }, indent=4))
+        with open(fileLocationWithoutExtension + ".txt", "w", encoding="utf8") as file:
+            file.write(textSummary)
+        return textSummary
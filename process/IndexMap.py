@@ -0,0 +1,99 @@
+"""
+TheNexusAvenger
+
+Reads the difficulties of a processed map for the library index.
+"""
+
+import os
+from data import JsonCodec
+from data.MapFileSet import MapFileSet
+from process.step.ClampReactionTimes import calculateJumpDistance, calculateReactionTime
+from typing import List, Optional
+
+# Note types of bombs in the V2 format.
+V2_BOMB_NOTE_TYPE = 3
+
+
+def getReactionTime(beatsPerMinute: float, noteJumpSpeed: float, noteJumpOffset: float) -> Optional[float]:
+    """Returns the reaction time of a difficulty the same way as ClampReactionTimes.
+
+    :param beatsPerMinute: Beats Per Minute of the song.
+    :param noteJumpSpeed: Note Jump Speed of the difficulty.
+    :param noteJumpOffset: Jump distance offset of the difficulty.
+    :return: The reaction time in milliseconds, or None if it can't be calculated.
+    """
+
+    if beatsPerMinute is None or noteJumpSpeed is None or noteJumpOffset is None or beatsPerMinute <= 0 or noteJumpSpeed <= 0:
+        return None
+    return calculateReactionTime(calculateJumpDistance(beatsPerMinute, noteJumpSpeed, noteJumpOffset), noteJumpSpeed)
+
+
+def getEventCount(mapFiles: MapFileSet, difficultyData: dict, lightshowFileName: Optional[str]) -> Optional[int]:
+    """Returns the amount of basic events of a difficulty.
+    V4 difficulties store the events in a separate lightshow file.
+
+    :param mapFiles: Map of the difficulty.
+    :param difficultyData: Data of the difficulty file.
+    :param lightshowFileName: File name of the lightshow file of V4 difficulties.
+    :return: The amount of events, or None if the events can't be read.
+    """
+
+    if "_events" in difficultyData.keys():
+        return len(difficultyData["_events"])
+    if "basicBeatmapEvents" in difficultyData.keys():
+        return len(difficultyData["basicBeatmapEvents"])
+    if lightshowFileName is not None and lightshowFileName in mapFiles.otherFiles.keys():
+        return len(JsonCodec.loads(mapFiles.otherFiles[lightshowFileName].read()).get("basicEvents", []))
+    return None
+
+
+def getDifficultyEntries(mapFiles: MapFileSet) -> List[dict]:
+    """Returns the difficulties of a processed map for the library index.
+
+    :param mapFiles: Processed map to read the difficulties of.
+    :return: The difficulties of the map, keyed by the columns of the library index.
+    """
+
+    # Read the song information.
+    song = mapFiles.song
+    beatsPerMinute = mapFiles.map.getBeatsPerMinute()
+
+    # Read the difficulties.
+    difficulties = []
+    for mapSet in mapFiles.map.difficultyBeatmapSets:
+        characteristic = mapSet.getBeatmapCharacteristicName()
+        for difficultyMap in mapSet.difficultyBeatmaps:
+            # Read the settings of the difficulty.
+            noteJumpSpeed = difficultyMap.getNoteJumpMovementSpeed()
+            noteJumpOffset = difficultyMap.getNoteJumpStartBeatOffset()
+            difficultyFileName = difficultyMap.getBeatMapFileName()
+            difficulty = {
+                "MapSource": song.mapSource,
+                "Artist": song.artist,
+                "SongName": song.songName,
+                "Characteristic": characteristic,
+                "Difficulty": difficultyMap.getDifficulty(),
+                "DifficultyRank": difficultyMap.getDifficultyRank(),
+                "DifficultyLabel": difficultyMap.getDifficultyLabel(),
+                "NoteJumpSpeed": noteJumpSpeed,
+                "NoteJumpOffset": noteJumpOffset,
+                "ReactionTime": getReactionTime(beatsPerMinute, noteJumpSpeed, noteJumpOffset),
+                "BeatsPerMinute": beatsPerMinute,
+                "Requirements": difficultyMap.getCustomData("requirements") or [],
+                "OutputPath": os.path.join(mapFiles.targetParentDirectory, difficultyFileName),
+            }
+
+            # Count the objects of the difficulty.
+            if difficultyFileName in mapFiles.difficultyFiles.keys():
+                difficultyData = mapFiles.difficultyFiles[difficultyFileName]
+                if "_notes" in difficultyData.keys():
+                    bombs = sum(1 for note in difficultyData["_notes"] if note.get("_type") == V2_BOMB_NOTE_TYPE)
+                    difficulty["Notes"] = len(difficultyData["_notes"]) - bombs
+                    difficulty["Bombs"] = bombs
+                else:
+                    difficulty["Notes"] = len(difficultyData.get("colorNotes", []))
+                    difficulty["Bombs"] = len(difficultyData.get("bombNotes", []))
+                difficulty["Obstacles"] = len(difficultyData.get("_obstacles", difficultyData.get("obstacles", [])))
+                difficulty["Events"] = getEventCount(mapFiles, difficultyData, difficultyMap.data.get("lightshowDataFilename"))
+            difficulties.append(difficulty)
+    return difficulties
@@ -4,93 +4,393 @@ TheNexusAvenger
 Processes maps files with additional modifiers.
 """
 
+import hashlib
+import io
+import json
 import os
 import shutil
-from data.MapFileSet import loadMap
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from data import JsonCodec
+from data.Configuration import getConfiguration
+from data.LevelHash import saveHashMapping
+from data.LibraryIndex import LibraryIndex
+from data.MapFileSet import MAP_FILE_SET_VERSION, MapFileSet, loadMap
+from data.ProcessingManifest import DEFAULT_FILE_NAME as DEFAULT_MANIFEST_FILE_NAME, ProcessingManifest
+from data.ProcessingReport import ProcessingReport
 from data.Song import Song
 from process.step.AddMissingRequirements import addMissingRequirements
 from process.step.AddSimpleLightShows import addSimpleLightShows
 from process.step.AddSubjectiveQualityRating import addSubjectiveQualityRating
 from process.step.ClampMapSpeeds import clampMapSpeeds
 from process.step.ClampReactionTimes import clampReactionTimes
-from process.step.OverrideFiles import overrideFiles
+from process.step.OverrideFiles import getOverridesDirectory, overrideFiles
 from process.step.RemoveEmptyMaps import removeEmptyMaps
-from process.step.SetSongCover import setSongCover
+from process.step.SetSongCover import getSongCover, setSongCover
 from process.step.SetSongData import setSongData
-from typing import List
-
-
-BEATSAVER_PROCESS_STEPS = [
-    overrideFiles,
-    setSongData,
-    addMissingRequirements,
-    removeEmptyMaps,
-    addSimpleLightShows,
-    setSongCover,
-    addSubjectiveQualityRating,
-    clampMapSpeeds,
-    clampReactionTimes,
+from process.IndexMap import getDifficultyEntries
+from process.ProcessStep import DIFFICULTY_FILES, INFO_FILE, OTHER_FILES, ProcessStep
+from process.StepMeasurements import StepMeasurements
+from typing import Dict, List, Optional, Tuple
+
+
+# Steps to apply to maps, in order.
+# Steps that do not write difficulty files leave them unmodified, so they are not serialized again when written.
+# A step that changes difficulty files must declare them and report the changed files. Changes made in place
+# without reporting them are only detected when the VerifyDifficultyFiles configuration is enabled (see ProcessStep).
+PROCESS_STEPS = [
+    ProcessStep(overrideFiles, 1, reads=[], writes=[INFO_FILE, DIFFICULTY_FILES, OTHER_FILES]),
+    ProcessStep(setSongData, 1, reads=[], writes=[INFO_FILE]),
+    ProcessStep(addMissingRequirements, 1, reads=[INFO_FILE, DIFFICULTY_FILES], writes=[INFO_FILE]),
+    ProcessStep(removeEmptyMaps, 1, reads=[INFO_FILE, DIFFICULTY_FILES], writes=[INFO_FILE], sources=["BeatSaver"]), # Beat Sage does not have empty maps.
+    ProcessStep(addSimpleLightShows, 1, reads=[DIFFICULTY_FILES], writes=[DIFFICULTY_FILES]),
+    ProcessStep(setSongCover, 1, reads=[INFO_FILE, OTHER_FILES], writes=[INFO_FILE, OTHER_FILES]),
+    ProcessStep(addSubjectiveQualityRating, 1, reads=[], writes=[INFO_FILE]),
+    ProcessStep(clampMapSpeeds, 1, reads=[INFO_FILE], writes=[INFO_FILE]),
+    ProcessStep(clampReactionTimes, 1, reads=[INFO_FILE], writes=[INFO_FILE]),
 ]
-BEAT_SAGE_PROCESS_STEPS = [
-    overrideFiles,
-    setSongData,
-    addMissingRequirements,
-    # removeEmptyMapsExtension, # Beat Sage does not have empty maps.
-    addSimpleLightShows,
-    setSongCover,
-    addSubjectiveQualityRating,
-    clampMapSpeeds,
-    clampReactionTimes,
+FINGERPRINT_CONFIGURATION_KEYS = [
+    "ClampedMapSpeeds",
+    "ClampedReactionTimes",
 ]
 BASE_PATH = os.path.realpath(os.path.join(__file__, "..", "..", "maps"))
-VALIDATED_MAPS_PATH = os.path.join(BASE_PATH, "Maps")
-UNVALIDATED_MAPS_PATH = os.path.join(BASE_PATH, "UnvalidatedMaps")
+VALIDATED_MAPS_DIRECTORY = "Maps"
+UNVALIDATED_MAPS_DIRECTORY = "UnvalidatedMaps"
+HASH_MAPPING_FILE = "hashes.json"
+PROCESSING_REPORT_FILE = "ProcessingReport"
+PROFILES_DIRECTORY = "Profiles"
+VALIDATED_MAPS_PATH = os.path.join(BASE_PATH, VALIDATED_MAPS_DIRECTORY)
+UNVALIDATED_MAPS_PATH = os.path.join(BASE_PATH, UNVALIDATED_MAPS_DIRECTORY)
+HASH_MAPPING_PATH = os.path.join(VALIDATED_MAPS_PATH, HASH_MAPPING_FILE)
+
+
+def getProcessSteps(mapSource: str) -> List[ProcessStep]:
+    """Returns the steps to apply to maps from a source.
+
+    :param mapSource: Source of the maps.
+    :return: The steps that apply to the source, in order.
+    """
+
+    return [processStep for processStep in PROCESS_STEPS if processStep.appliesTo(mapSource)]
+
+
+BEATSAVER_PROCESS_STEPS = getProcessSteps("BeatSaver")
+BEAT_SAGE_PROCESS_STEPS = getProcessSteps("BeatSage")
+
+
+def getPathFingerprint(path: Optional[str]) -> any:
+    """Returns the fingerprint of a file or directory from the sizes and modified times.
+
+    :param path: Path of the file or directory.
+    :return: The fingerprint of the path, or None if the path does not exist.
+    """
+
+    if path is None or not os.path.exists(path):
+        return None
+    if not os.path.isdir(path):
+        fileStat = os.stat(path)
+        return [fileStat.st_size, fileStat.st_mtime_ns]
+    fingerprint = []
+    for directory, _, fileNames in os.walk(path):
+        for fileName in fileNames:
+            filePath = os.path.join(directory, fileName)
+            fileStat = os.stat(filePath)
+            fingerprint.append([os.path.relpath(filePath, path).replace("\\", "/"), fileStat.st_size, fileStat.st_mtime_ns])
+    fingerprint.sort()
+    return fingerprint
+
+
+def getMapFingerprint(song: Song, processSteps: List[ProcessStep]) -> str:
+    """Returns the fingerprint of the inputs of processing a map.
+    If the fingerprint has not changed, processing the map again would produce the same output.
+
+    :param song: Song entry to process.
+    :param processSteps: Steps to apply to the map.
+    :return: The fingerprint of the map.
+    """
+
+    fingerprintData = {
+        "MapFileSetVersion": MAP_FILE_SET_VERSION,
+        "Source": getPathFingerprint(song.mapDownloadPath),
+        "Overrides": getPathFingerprint(getOverridesDirectory(song)),
+        "Cover": getPathFingerprint(getSongCover(song.getSongName(True))),
+        "Song": vars(song),
+        "Configuration": {key: getConfiguration(key, None) for key in FINGERPRINT_CONFIGURATION_KEYS},
+        "Steps": [[processStep.name, processStep.version] for processStep in processSteps],
+    }
+    return hashlib.sha1(json.dumps(fingerprintData, sort_keys=True).encode("utf8")).hexdigest()
+
+
+def serializeUnmodifiedDifficultyFiles(mapFiles: MapFileSet) -> Dict[str, bytes]:
+    """Serializes the difficulty files that are not modified to check that steps report the files they change.
+
+    :param mapFiles: Map to serialize the difficulty files of.
+    :return: The serialized difficulty files, keyed by the file name.
+    """
+
+    serializedDifficultyFiles = {}
+    for fileName, difficultyData in mapFiles.difficultyFiles.items():
+        if not mapFiles.isDifficultyFileModified(fileName):
+            serializedDifficultyFiles[fileName] = JsonCodec.dumps(difficultyData, separators=(",", ":"))
+    return serializedDifficultyFiles
+
+
+def verifyUnmodifiedDifficultyFiles(mapFiles: MapFileSet, processStep: ProcessStep, serializedDifficultyFiles: Dict[str, bytes]) -> None:
+    """Checks that a step did not change difficulty files in place without reporting them.
+    Otherwise, the changes would be lost when the existing files are used.
+
+    :param mapFiles: Map that the step was applied to.
+    :param processStep: Step that was applied to the map.
+    :param serializedDifficultyFiles: Difficulty files that were not modified before the step, serialized by serializeUnmodifiedDifficultyFiles.
+    """
+
+    for fileName, serializedDifficultyFile in serializedDifficultyFiles.items():
+        if fileName in mapFiles.difficultyFiles.keys() and not mapFiles.isDifficultyFileModified(fileName):
+            if JsonCodec.dumps(mapFiles.difficultyFiles[fileName], separators=(",", ":")) != serializedDifficultyFile:
+                raise AssertionError("Step " + processStep.name + " modified " + fileName + " without reporting it.")
 
 
-def processMap(song: Song, targetParentDirectory: str, processSteps: list) -> None:
+def processMap(song: Song, targetParentDirectory: str, processSteps: List[ProcessStep], fileRecords: Optional[Dict[str, dict]] = None, measureMemory: bool = False, profilePath: Optional[str] = None, verifyDifficultyFiles: bool = False) -> Tuple[Dict[str, dict], Optional[Dict[str, str]], Dict[str, dict], Optional[List[dict]]]:
     """Processes a map.
+    The level hashes are calculated for BeatSaver maps to map the processed maps to the BeatSaver maps.
 
     :param song: Song entry to process.
     :param targetParentDirectory: Target parent directory to save to.
     :param processSteps: Steps to apply to the map.
+    :param fileRecords: Records of the files from the last time the map was written.
+    :param measureMemory: Whether to measure the peak memory allocated by each step.
+    :param profilePath: Path to write a cProfile and tracemalloc profile of the map to without the extension.
+    :param verifyDifficultyFiles: Whether to check that the steps report every difficulty file they change.
+    :return: Records of the files that were written, the level hashes of the processed and source map, the measurements of the steps,
+             and the difficulties of the processed map for the library index.
     """
 
-    mapFiles = loadMap(song, targetParentDirectory)
-    print("\tProcessing " + os.path.basename(song.mapDownloadPath))
-    for processStep in processSteps:
-        processStep(mapFiles)
-    mapFiles.write()
+    stepMeasurements = StepMeasurements(measureMemory, profilePath)
+    stepMeasurements.start()
+    mapFiles = None
+    try:
+        try:
+            mapFiles = stepMeasurements.measure("loadMap", loadMap, song, targetParentDirectory)
+            if fileRecords is not None:
+                mapFiles.fileRecords = fileRecords
+            print("\tProcessing " + os.path.basename(song.mapDownloadPath))
+
+            # Apply the steps.
+            # Steps that report changed difficulty files without declaring them are always detected. Changes made in place
+            # without reporting them are only detected if enabled since the unmodified files are serialized before and after each step.
+            for processStep in processSteps:
+                modifiedDifficultyFiles = len(mapFiles.modifiedDifficultyFiles)
+                serializedDifficultyFiles = serializeUnmodifiedDifficultyFiles(mapFiles) if verifyDifficultyFiles else None
+                stepMeasurements.measure(processStep.name, processStep, mapFiles)
+                if DIFFICULTY_FILES not in processStep.writes and len(mapFiles.modifiedDifficultyFiles) != modifiedDifficultyFiles:
+                    raise AssertionError("Step " + processStep.name + " modified difficulty files without declaring it.")
+                if serializedDifficultyFiles is not None:
+                    verifyUnmodifiedDifficultyFiles(mapFiles, processStep, serializedDifficultyFiles)
+
+            # Write the map.
+            stepMeasurements.takeMemorySnapshot()
+            calculateHashes = (song.mapSource == "BeatSaver")
+            stepMeasurements.measure("write", mapFiles.write, calculateHashes)
 
+            # Read the difficulties for the library index.
+            # The map is already written, so a difficulty that can't be read does not fail the map.
+            # The map is still stored in the library index without difficulties.
+            difficultyEntries = None
+            try:
+                difficultyEntries = stepMeasurements.measure("indexDifficulties", getDifficultyEntries, mapFiles)
+            except Exception as error:
+                print("\t\tUnable to read the difficulties for the library index (" + type(error).__name__ + ": " + str(error) + ").")
+        finally:
+            stepMeasurements.stop()
 
-def processMaps(songs: List[Song]) -> None:
+        # Calculate the level hashes.
+        # The hash of the processed map is calculated from the serialized files instead of reading them again.
+        levelHashes = None
+        if calculateHashes:
+            try:
+                levelHashes = {
+                    "Processed": mapFiles.getLevelHash(),
+                    "Source": mapFiles.getSourceLevelHash(),
+                }
+            except KeyError as error:
+                print("\t\tUnable to calculate the level hashes (missing " + str(error) + ").")
+    finally:
+        # Close the source ZIP file, which is read until the level hashes are calculated.
+        if mapFiles is not None:
+            mapFiles.close()
+    return mapFiles.writtenFileRecords, levelHashes, stepMeasurements.getMeasurements(), difficultyEntries
+
+
+def processMapWithLogs(song: Song, targetParentDirectory: str, processSteps: List[ProcessStep], fileRecords: Optional[Dict[str, dict]] = None, measureMemory: bool = False, profilePath: Optional[str] = None, verifyDifficultyFiles: bool = False) -> Tuple[str, Dict[str, dict], Optional[Dict[str, str]], Dict[str, dict], Optional[List[dict]]]:
+    """Processes a map and returns the log instead of printing it.
+    Used by the worker processes so the log of a map is printed as one block.
+    If the map fails, the partial log is stored in the processingLog attribute of the error.
+
+    :param song: Song entry to process.
+    :param targetParentDirectory: Target parent directory to save to.
+    :param processSteps: Steps to apply to the map.
+    :param fileRecords: Records of the files from the last time the map was written.
+    :param measureMemory: Whether to measure the peak memory allocated by each step.
+    :param profilePath: Path to write a cProfile and tracemalloc profile of the map to without the extension.
+    :param verifyDifficultyFiles: Whether to check that the steps report every difficulty file they change.
+    :return: The log output of processing the map, the records of the files that were written, the level hashes, the measurements of the steps,
+             and the difficulties for the library index.
+    """
+
+    logs = io.StringIO()
+    try:
+        with redirect_stdout(logs):
+            writtenFileRecords, levelHashes, measurements, difficultyEntries = processMap(song, targetParentDirectory, processSteps, fileRecords, measureMemory, profilePath, verifyDifficultyFiles)
+    except Exception as error:
+        # Store the partial log so that the failing step can be determined.
+        # It is printed by the main process with the other logs instead of being printed by the worker process.
+        error.processingLog = logs.getvalue()
+        raise
+    return logs.getvalue(), writtenFileRecords, levelHashes, measurements, difficultyEntries
+
+
+def processMaps(songs: List[Song], jobs: int = 1, manifest: Optional[ProcessingManifest] = None, excludedSongs: Optional[List[Song]] = None, mapsPath: str = BASE_PATH, libraryIndex: Optional[LibraryIndex] = None) -> Dict[str, Exception]:
     """Processes a list of maps.
+    Maps with the same fingerprint as the last time they were processed are skipped.
+    A map that fails to process keeps the output from the last time it was processed.
+    The mapping between the level hashes of the processed maps and the BeatSaver maps is stored in hashes.json.
+    The time and peak memory of each step are stored in ProcessingReport.json and ProcessingReport.txt.
+    The map named by the ProfileMap configuration is always processed and profiled into the Profiles directory.
+    If a library index is provided, the difficulties of the processed maps are stored in it. Unchanged maps
+    that are not in the library index are processed again to add them.
 
     :param songs: Songs to process.
+    :param jobs: Amount of worker processes to process the maps with. 1 processes the maps in the current process.
+    :param manifest: Manifest of the processed maps. The manifest in the maps directory is used if none is provided.
+    :param excludedSongs: Songs that are not processed but keep their existing output.
+    :param mapsPath: Directory to store the validated and unvalidated maps in.
+    :param libraryIndex: Library index to store the difficulties of the processed maps in.
+    :return: The errors of the maps that failed to process, keyed by the map download path.
     """
 
+    # Load the manifest.
+    if manifest is None:
+        manifest = ProcessingManifest(os.path.join(mapsPath, DEFAULT_MANIFEST_FILE_NAME))
+
     # Create the directories.
-    if not os.path.exists(VALIDATED_MAPS_PATH):
-        os.makedirs(VALIDATED_MAPS_PATH)
-    if not os.path.exists(UNVALIDATED_MAPS_PATH):
-        os.makedirs(UNVALIDATED_MAPS_PATH)
+    validatedMapsPath = os.path.join(mapsPath, VALIDATED_MAPS_DIRECTORY)
+    unvalidatedMapsPath = os.path.join(mapsPath, UNVALIDATED_MAPS_DIRECTORY)
+    if not os.path.exists(validatedMapsPath):
+        os.makedirs(validatedMapsPath)
+    if not os.path.exists(unvalidatedMapsPath):
+        os.makedirs(unvalidatedMapsPath)
 
-    # Process the maps.
+    # Determine the maps to process.
     validatedMapFiles = []
     unvalidatedMapFiles = []
-    for song in songs:
+    mapsToProcess = []
+    beatSaverManifestKeys = []
+    unchangedMaps = 0
+    profileMapName = getConfiguration("ProfileMap", None)
+    indexedMapFingerprints = libraryIndex.getMapFingerprints() if libraryIndex is not None else None
+    libraryMapKeys = set()
+    excludedSongs = excludedSongs or []
+    excludedSongSet = set(excludedSongs)
+    for song in songs + excludedSongs:
+        mapName = os.path.basename(song.mapDownloadPath).replace(".zip", "")
         if song.validated is not True:
-            targetParentDirectory = UNVALIDATED_MAPS_PATH
-            unvalidatedMapFiles.append(os.path.basename(song.mapDownloadPath).replace(".zip", ""))
+            targetParentDirectory = unvalidatedMapsPath
+            unvalidatedMapFiles.append(mapName)
         else:
-            targetParentDirectory = VALIDATED_MAPS_PATH
-            validatedMapFiles.append(os.path.basename(song.mapDownloadPath).replace(".zip", ""))
+            targetParentDirectory = validatedMapsPath
+            validatedMapFiles.append(mapName)
         if song.mapSource == "BeatSaver":
-            processMap(song, targetParentDirectory, BEATSAVER_PROCESS_STEPS)
+            processSteps = BEATSAVER_PROCESS_STEPS
         elif song.mapSource == "BeatSage":
-            processMap(song, targetParentDirectory, BEAT_SAGE_PROCESS_STEPS)
+            processSteps = BEAT_SAGE_PROCESS_STEPS
+        else:
+            continue
+
+        # Skip the map if the inputs have not changed since the output was written.
+        manifestKey = os.path.basename(targetParentDirectory) + "/" + mapName
+        if song.mapSource == "BeatSaver":
+            beatSaverManifestKeys.append(manifestKey)
+        libraryMapKeys.add(manifestKey)
+        if song in excludedSongSet:
+            continue
+        fingerprint = getMapFingerprint(song, processSteps)
+        profilePath = os.path.join(mapsPath, PROFILES_DIRECTORY, mapName) if mapName == profileMapName else None
+        isIndexed = (indexedMapFingerprints is None or indexedMapFingerprints.get(manifestKey) == fingerprint)
+        if profilePath is None and isIndexed and manifest.getFingerprint(manifestKey) == fingerprint and os.path.isdir(os.path.join(targetParentDirectory, mapName)):
+            unchangedMaps += 1
+            continue
+        mapsToProcess.append((song, targetParentDirectory, processSteps, manifestKey, fingerprint, profilePath))
+    if unchangedMaps > 0:
+        print("\tSkipping " + str(unchangedMaps) + " unchanged maps.")
+
+    # Process the maps.
+    # Each map is independent, so they can be processed in separate processes.
+    # A map that fails is not stored in the manifest so that it is processed again.
+    # The manifest is saved even if processing stops so that the completed maps are not processed again.
+    # Measuring the memory of the steps and verifying the difficulty files slow down processing, so they are only done when enabled.
+    failedMaps = {}
+    processingReport = ProcessingReport()
+    measureMemory = (getConfiguration("MeasureProcessingMemory", False) is True)
+    verifyDifficultyFiles = (getConfiguration("VerifyDifficultyFiles", False) is True)
+
+    def storeResult(song: Song, manifestKey: str, fingerprint: str, result: Tuple[Dict[str, dict], Optional[Dict[str, str]], Dict[str, dict], Optional[List[dict]]]) -> None:
+        """Stores the result of processing a map.
+        Used by both the current process and the worker processes so the results are stored the same way.
+
+        :param song: Song entry that was processed.
+        :param manifestKey: Key of the map in the manifest and library index.
+        :param fingerprint: Fingerprint of the map.
+        :param result: Records of the written files, level hashes, measurements of the steps, and difficulties returned by processMap.
+        """
+
+        writtenFileRecords, levelHashes, measurements, difficultyEntries = result
+        processingReport.addMap(os.path.basename(song.mapDownloadPath).replace(".zip", ""), measurements)
+        manifest.setFileRecords(manifestKey, writtenFileRecords)
+        manifest.setLevelHashes(manifestKey, levelHashes)
+        manifest.setFingerprint(manifestKey, fingerprint)
+        if libraryIndex is not None:
+            # Maps with difficulties that can't be read are stored without difficulties so that they are not processed again.
+            libraryIndex.setMapDifficulties(manifestKey, fingerprint, difficultyEntries or [])
+
+    try:
+        if jobs <= 1:
+            for song, targetParentDirectory, processSteps, manifestKey, fingerprint, profilePath in mapsToProcess:
+                try:
+                    result = processMap(song, targetParentDirectory, processSteps, manifest.getFileRecords(manifestKey), measureMemory, profilePath, verifyDifficultyFiles)
+                except Exception as error:
+                    print("\t\tFailed to process " + song.getSongName() + " (" + type(error).__name__ + ": " + str(error) + ").")
+                    failedMaps[song.mapDownloadPath] = error
+                    continue
+                storeResult(song, manifestKey, fingerprint, result)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = {}
+                for song, targetParentDirectory, processSteps, manifestKey, fingerprint, profilePath in mapsToProcess:
+                    futures[executor.submit(processMapWithLogs, song, targetParentDirectory, processSteps, manifest.getFileRecords(manifestKey), measureMemory, profilePath, verifyDifficultyFiles)] = (song, manifestKey, fingerprint)
+                for future in as_completed(futures.keys()):
+                    song, manifestKey, fingerprint = futures[future]
+                    try:
+                        logs, *result = future.result()
+                    except Exception as error:
+                        print(getattr(error, "processingLog", ""), end="")
+                        print("\t\tFailed to process " + song.getSongName() + " (" + type(error).__name__ + ": " + str(error) + ").")
+                        failedMaps[song.mapDownloadPath] = error
+                        continue
+                    print(logs, end="")
+                    storeResult(song, manifestKey, fingerprint, result)
+    finally:
+        manifest.save()
+        if libraryIndex is not None:
+            libraryIndex.commit()
+
+    # Store the measurements of the processed maps.
+    if len(processingReport.mapMeasurements) > 0:
+        print("\tStep measurements:")
+        for line in processingReport.save(os.path.join(mapsPath, PROCESSING_REPORT_FILE)).splitlines():
+            print("\t\t" + line)
 
     # Clear the files that no longer exist.
-    for mapDirectorySet in [{"path": VALIDATED_MAPS_PATH, "maps": validatedMapFiles}, {"path": UNVALIDATED_MAPS_PATH, "maps": unvalidatedMapFiles}]:
+    for mapDirectorySet in [{"path": validatedMapsPath, "maps": validatedMapFiles}, {"path": unvalidatedMapsPath, "maps": unvalidatedMapFiles}]:
         mapDirectoryPath = mapDirectorySet["path"]
         mapFiles = mapDirectorySet["maps"]
         for fileName in os.listdir(mapDirectoryPath):
@@ -98,3 +398,19 @@ def processMaps(songs: List[Song]) -> None:
                 filePath = os.path.join(mapDirectoryPath, fileName)
                 if os.path.isdir(filePath):
                     shutil.rmtree(filePath)
+                    manifest.removeEntry(os.path.basename(mapDirectoryPath) + "/" + fileName)
+    manifest.save()
+
+    # Remove the maps that no longer exist from the library index.
+    if libraryIndex is not None:
+        libraryIndex.removeMaps(set(indexedMapFingerprints.keys()) - libraryMapKeys)
+        libraryIndex.commit()
+
+    # Store the mapping between the level hashes of the processed maps and the BeatSaver maps.
+    hashMapping = {}
+    for manifestKey in beatSaverManifestKeys:
+        levelHashes = manifest.getLevelHashes(manifestKey)
+        if levelHashes is not None:
+            hashMapping[levelHashes["Processed"]] = levelHashes["Source"]
+    saveHashMapping(hashMapping, os.path.join(validatedMapsPath, HASH_MAPPING_FILE))
+    return failedMaps
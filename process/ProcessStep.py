@@ -0,0 +1,55 @@
+"""
+TheNexusAvenger
+
+Step of processing a map with the files it reads and writes and the sources it applies to.
+"""
+
+from data.MapFileSet import MapFileSet
+from typing import Callable, List
+
+# Files of a map that steps can read and write.
+INFO_FILE = "Info"
+DIFFICULTY_FILES = "Difficulties"
+OTHER_FILES = "Other"
+MAP_SOURCES = ["BeatSaver", "BeatSage"]
+
+
+class ProcessStep:
+    def __init__(self, function: Callable[[MapFileSet], None], version: int, reads: List[str], writes: List[str], sources: List[str] = MAP_SOURCES):
+        """Creates the process step.
+
+        :param function: Function that applies the step to a map.
+        :param version: Version of the step, which is part of the fingerprint of a map.
+                        The version must be increased when the output of the step changes.
+        :param reads: Files of the map that the step reads.
+        :param writes: Files of the map that the step changes. Steps that change difficulty files must
+                       report the changed files with MapFileSet.setDifficultyFileModified.
+                       Reporting changes without declaring them is an error. Difficulty files changed in place
+                       without being reported would use the existing file and lose the changes, which is only
+                       detected when the VerifyDifficultyFiles configuration is enabled, such as for the tests.
+        :param sources: Map sources that the step applies to.
+        """
+
+        self.function = function
+        self.name = function.__name__
+        self.version = version
+        self.reads = reads
+        self.writes = writes
+        self.sources = sources
+
+    def __call__(self, mapFiles: MapFileSet) -> None:
+        """Applies the step to a map.
+
+        :param mapFiles: Map to process.
+        """
+
+        self.function(mapFiles)
+
+    def appliesTo(self, mapSource: str) -> bool:
+        """Returns if the step applies to maps from a source.
+
+        :param mapSource: Source of the map.
+        :return: Whether the step applies to the source.
+        """
+
+        return mapSource in self.sources
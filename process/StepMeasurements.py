@@ -0,0 +1,127 @@
+"""
+TheNexusAvenger
+
+Measures the time and memory of the steps of processing a map.
+A single map can be profiled with cProfile and tracemalloc to investigate outliers.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+# Amount of functions and allocation sites to include in the profile summary.
+PROFILE_FUNCTIONS = 50
+PROFILE_ALLOCATIONS = 25
+PROFILE_FRAMES = 10
+
+
+class StepMeasurements:
+    def __init__(self, measureMemory: bool = False, profilePath: Optional[str] = None):
+        """Creates the step measurements.
+
+        :param measureMemory: Whether to measure the peak memory allocated by each step with tracemalloc.
+                              This slows down processing, so it is only done when requested.
+        :param profilePath: Path to write the profile to without the extension. If None, the steps are not profiled.
+        """
+
+        self.measureMemory = measureMemory or profilePath is not None
+        self.profilePath = profilePath
+        self.measurements = {}
+        self.profiler = None
+        self.startedTracing = False
+        self.memorySnapshot = None
+
+    def start(self) -> None:
+        """Starts tracing the memory and profiling if they are enabled.
+        """
+
+        if self.measureMemory and not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_FRAMES if self.profilePath is not None else 1)
+            self.startedTracing = True
+        if self.profilePath is not None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self) -> None:
+        """Stops tracing the memory and profiling, and writes the profile if the steps were profiled.
+        """
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.writeProfile()
+            self.profiler = None
+        if self.startedTracing:
+            tracemalloc.stop()
+            self.startedTracing = False
+
+    def measure(self, name: str, function: Callable, *args) -> any:
+        """Calls a step and measures it.
+
+        :param name: Name of the step.
+        :param function: Function of the step.
+        :param args: Arguments to call the function with.
+        :return: The return value of the function.
+        """
+
+        # Prepare measuring the memory.
+        baseMemory = None
+        if self.measureMemory:
+            baseMemory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        # Call the step.
+        startTime = time.perf_counter()
+        result = function(*args)
+        self.measurements[name] = {
+            "Time": time.perf_counter() - startTime,
+            "PeakMemory": (tracemalloc.get_traced_memory()[1] - baseMemory) if baseMemory is not None else None,
+        }
+        return result
+
+    def takeMemorySnapshot(self) -> None:
+        """Stores the allocations that are currently held for the profile.
+        """
+
+        if self.profilePath is not None:
+            self.memorySnapshot = tracemalloc.take_snapshot()
+
+    def writeProfile(self) -> None:
+        """Writes the profile to a .prof file for tools like snakeviz and a .txt summary.
+        """
+
+        # Write the profile.
+        parentDirectory = os.path.dirname(self.profilePath)
+        if not os.path.exists(parentDirectory):
+            os.makedirs(parentDirectory)
+        self.profiler.dump_stats(self.profilePath + ".prof")
+
+        # Write the summary.
+        profileSummary = io.StringIO()
+        profileSummary.write("Steps:\n")
+        for name, measurement in self.measurements.items():
+            profileSummary.write("\t" + name + ": " + str(round(measurement["Time"] * 1000, 2)) + " ms")
+            if measurement["PeakMemory"] is not None:
+                profileSummary.write(", peak memory " + str(round(measurement["PeakMemory"] / 1024, 1)) + " KiB")
+            profileSummary.write("\n")
+        profileSummary.write("\nFunctions by cumulative time:\n")
+        pstats.Stats(self.profiler, stream=profileSummary).sort_stats("cumulative").print_stats(PROFILE_FUNCTIONS)
+        if self.memorySnapshot is not None:
+            profileSummary.write("Allocations held before writing the map:\n")
+            for statistic in self.memorySnapshot.statistics("traceback")[:PROFILE_ALLOCATIONS]:
+                profileSummary.write(str(round(statistic.size / 1024, 1)) + " KiB in " + str(statistic.count) + " allocations:\n")
+                for line in statistic.traceback.format(most_recent_first=True):
+                    profileSummary.write("\t" + line + "\n")
+        with open(self.profilePath + ".txt", "w", encoding="utf8") as file:
+            file.write(profileSummary.getvalue())
+
+    def getMeasurements(self) -> Dict[str, dict]:
+        """Returns the measurements of the steps.
+
+        :return: The Time in seconds and the PeakMemory in bytes of each step, keyed by the name of the step.
+        """
+
+        return self.measurements
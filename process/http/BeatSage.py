@@ -4,6 +4,7 @@ TheNexusAvenger
 Handles HTTP requests to Beat Sage.
 """
 
+import hashlib
 import librosa
 import json
 import os
@@ -11,26 +12,353 @@ import random
 import string
 import shutil
 import requests
+import subprocess
+import tempfile
+import time
+import wave
+from data import JsonCodec
+from data.Database import Database
+from data.DifficultyColumns import DifficultyColumns
 from data.Song import Song
-from pydub import AudioSegment
+from process.http import Generic
 from requests_toolbelt import MultipartEncoder
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 from zipfile import ZipFile
 
+BEAT_SAGE_URL = "https://beatsage.com"
 DIFFICULTIES = "Expert,ExpertPlus"
 MODES = "Standard"
 SYSTEM_VERSION = "v2-flow"
+DEFAULT_CONCURRENT_JOBS = 4
+DEFAULT_JOB_TIMEOUT = 15 * 60
+DEFAULT_MAX_JOB_ATTEMPTS = 3
+POLL_INITIAL_DELAY = 1
+POLL_MAXIMUM_DELAY = 30
 
+# Modes for analyzing the BPM of songs.
+# The full mode matches the default settings of librosa.
+# The fast mode uses a lower sample rate and only a window of the track.
+BPM_ANALYSIS_MODES = {
+    "Full": {
+        "SampleRate": 22050,
+        "Offset": 0,
+        "Duration": None,
+    },
+    "Fast": {
+        "SampleRate": 11025,
+        "Offset": 30,
+        "Duration": 60,
+    },
+}
+MINIMUM_BPM_ANALYSIS_SECONDS = 10
+AUDIO_CHUNK_FRAMES = 64 * 1024
+PCM_SAMPLE_FORMATS = {
+    1: "u8",
+    2: "s16le",
+    3: "s24le",
+    4: "s32le",
+}
 
-def getBpm(fileLocation: str) -> float:
-    """Gets the BPM for a file name.
+session = requests.Session()
+
+
+def getFileHash(fileLocation: str) -> str:
+    """Returns the hash of the contents of a file.
 
     :param fileLocation: Location of the file.
+    :return: The SHA-256 hash of the file.
+    """
+
+    sha256 = hashlib.sha256()
+    with open(fileLocation, "rb") as file:
+        for chunk in iter(lambda: file.read(Generic.DOWNLOAD_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def getFfmpegPath() -> str:
+    """Returns the location of ffmpeg, which decodes and encodes the songs.
+
+    :return: The location of ffmpeg.
+    """
+
+    ffmpegPath = shutil.which("ffmpeg")
+    if ffmpegPath is None:
+        raise FileNotFoundError("ffmpeg was not found. It must be installed and in the PATH to process Beat Sage maps.")
+    return ffmpegPath
+
+
+def decodeAudio(audioFileLocation: str, decodedAudioLocation: str) -> None:
+    """Decodes an audio file to a WAV file.
+
+    :param audioFileLocation: Location of the audio file to decode.
+    :param decodedAudioLocation: Location to save the WAV file.
+    """
+
+    subprocess.run([getFfmpegPath(), "-y", "-v", "error", "-i", audioFileLocation, "-f", "wav", decodedAudioLocation], check=True)
+
+
+def writePaddedAudio(decodedAudioLocation: str, outputLocation: str, silenceMilliseconds: int) -> None:
+    """Writes an OGG file with silence before the audio.
+    The silence and audio are streamed to the encoder in chunks instead of being loaded into memory.
+
+    :param decodedAudioLocation: Location of the decoded WAV file.
+    :param outputLocation: Location to save the OGG file.
+    :param silenceMilliseconds: Length of the silence in milliseconds.
+    """
+
+    with wave.open(decodedAudioLocation, "rb") as audio:
+        # Start the encoder.
+        channels = audio.getnchannels()
+        sampleWidth = audio.getsampwidth()
+        frameRate = audio.getframerate()
+        encoder = subprocess.Popen([getFfmpegPath(), "-y", "-v", "error", "-f", PCM_SAMPLE_FORMATS[sampleWidth], "-ar", str(frameRate), "-ac", str(channels), "-i", "-", "-f", "ogg", outputLocation], stdin=subprocess.PIPE)
+
+        try:
+            # Write the silence.
+            # 8-bit WAV files are unsigned, so the silence is the middle value instead of 0.
+            silenceFrame = (b"\x80" if sampleWidth == 1 else b"\x00" * sampleWidth) * channels
+            remainingSilenceFrames = round(silenceMilliseconds * frameRate / 1000)
+            while remainingSilenceFrames > 0:
+                chunkFrames = min(remainingSilenceFrames, AUDIO_CHUNK_FRAMES)
+                encoder.stdin.write(silenceFrame * chunkFrames)
+                remainingSilenceFrames -= chunkFrames
+
+            # Write the audio.
+            while True:
+                chunk = audio.readframes(AUDIO_CHUNK_FRAMES)
+                if len(chunk) == 0:
+                    break
+                encoder.stdin.write(chunk)
+        finally:
+            encoder.stdin.close()
+            encoder.wait()
+    if encoder.returncode != 0:
+        raise IOError("Failed to encode " + outputLocation + " (exit code " + str(encoder.returncode) + ").")
+
+
+def analyzeBpm(fileLocation: str, mode: str = "Full") -> float:
+    """Analyzes the BPM of a file.
+
+    :param fileLocation: Location of the file.
+    :param mode: Name of the analysis mode in BPM_ANALYSIS_MODES.
     :return: The BPM of the file.
     """
 
-    y, sr = librosa.load(fileLocation)
+    # Load the audio.
+    # Tracks that are too short for the window are analyzed from the start.
+    parameters = BPM_ANALYSIS_MODES[mode]
+    y, sr = librosa.load(fileLocation, sr=parameters["SampleRate"], offset=parameters["Offset"], duration=parameters["Duration"])
+    if parameters["Offset"] > 0 and len(y) < parameters["SampleRate"] * MINIMUM_BPM_ANALYSIS_SECONDS:
+        y, sr = librosa.load(fileLocation, sr=parameters["SampleRate"], duration=parameters["Duration"])
+
+    # Determine the BPM.
     onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-    return float(librosa.beat.tempo(onset_envelope=onset_env, sr=sr))
+    return float(librosa.beat.tempo(onset_envelope=onset_env, sr=sr)[0])
+
+
+def getBpm(fileLocation: str, mode: str = "Full", database: Optional[Database] = None) -> float:
+    """Gets the BPM for a file name.
+    If a database is provided, the BPM is cached by the contents of the file and the analysis mode.
+
+    :param fileLocation: Location of the file.
+    :param mode: Name of the analysis mode in BPM_ANALYSIS_MODES.
+    :param database: Database to cache the BPM in.
+    :return: The BPM of the file.
+    """
+
+    # Return the cached BPM.
+    if database is None:
+        return analyzeBpm(fileLocation, mode)
+    audioHash = getFileHash(fileLocation)
+    analysisParameters = json.dumps(BPM_ANALYSIS_MODES[mode], sort_keys=True)
+    cachedBpm = database.execute("SELECT Bpm FROM BeatSageBpmCache WHERE AudioHash = ? AND AnalysisParameters = ?;", [audioHash, analysisParameters])
+    if len(cachedBpm) > 0:
+        return cachedBpm[0][0]
+
+    # Analyze and cache the BPM.
+    bpm = analyzeBpm(fileLocation, mode)
+    database.execute("INSERT OR REPLACE INTO BeatSageBpmCache VALUES (?,?,?);", [audioHash, analysisParameters, bpm])
+    database.commit()
+    return bpm
+
+
+def compareBpmAnalysis(fileLocation: str, mode: str = "Fast", database: Optional[Database] = None) -> Tuple[float, float]:
+    """Compares the BPM of an analysis mode with the full analysis.
+
+    :param fileLocation: Location of the file.
+    :param mode: Name of the analysis mode in BPM_ANALYSIS_MODES to compare.
+    :param database: Database to cache the BPMs in.
+    :return: The BPM of the full analysis and the BPM of the compared analysis mode.
+    """
+
+    return getBpm(fileLocation, "Full", database), getBpm(fileLocation, mode, database)
+
+
+class BeatSageJob:
+    def __init__(self, audioFileLocation: str, coverFileLocation: str, downloadFileLocation: str):
+        """Creates a Beat Sage job.
+
+        :param audioFileLocation: Location of the audio file.
+        :param coverFileLocation: Location of the cover file.
+        :param downloadFileLocation: Location to save the archive file.
+        """
+
+        self.audioFileLocation = audioFileLocation
+        self.coverFileLocation = coverFileLocation
+        self.downloadFileLocation = downloadFileLocation
+        self.downloadMapId = None
+        self.attempts = 0
+        self.submitTime = 0
+        self.pollDelay = POLL_INITIAL_DELAY
+        self.nextPollTime = 0
+
+    def submit(self) -> None:
+        """Submits the job to Beat Sage.
+        """
+
+        # Send the download request.
+        self.attempts += 1
+        with open(self.audioFileLocation, "rb") as audioFile, open(self.coverFileLocation, "rb") as coverFile:
+            fields = {
+                "audio_file": ("audio", audioFile, "audio/mpeg"),
+                "cover_art": ("cover", coverFile, "image/" + os.path.splitext(os.path.basename(self.coverFileLocation))[1][1:]),
+                "audio_metadata_title": "ArtistName",
+                "audio_metadata_artist": "SongName",
+                "difficulties": DIFFICULTIES,
+                "modes": MODES,
+                "events": "",
+                "environment": "DefaultEnvironment",
+                "system_tag": SYSTEM_VERSION,
+            }
+            boundary = "----WebKitFormBoundary" + "".join(random.sample(string.ascii_letters + string.digits, 16))
+            message = MultipartEncoder(fields=fields, boundary=boundary)
+            headers = {
+                "Host": urlparse(BEAT_SAGE_URL).netloc,
+                "Connection": "keep-alive",
+                "Content-Type": message.content_type
+            }
+            createMapResponse = session.post(BEAT_SAGE_URL + "/beatsaber_custom_level_create", headers=headers, data=message)
+        try:
+            self.downloadMapId = createMapResponse.json()["id"]
+        except:
+            print("Unexpected response from Beat Sage: " + str(createMapResponse.text))
+            raise
+
+        # Schedule the first poll.
+        self.submitTime = time.monotonic()
+        self.pollDelay = POLL_INITIAL_DELAY
+        self.scheduleNextPoll()
+
+    def scheduleNextPoll(self) -> None:
+        """Schedules the next poll of the job with exponential backoff.
+        The delay is randomized so that jobs submitted together do not poll at the same time.
+        """
+
+        self.nextPollTime = time.monotonic() + (self.pollDelay * random.uniform(0.5, 1.5))
+        self.pollDelay = min(self.pollDelay * 2, POLL_MAXIMUM_DELAY)
+
+    def poll(self) -> bool:
+        """Checks if the job is complete and downloads the map if it is.
+
+        :return: Whether the map was downloaded.
+        """
+
+        mapUrl = BEAT_SAGE_URL + "/beatsaber_custom_level_download/" + self.downloadMapId
+        with session.get(mapUrl, stream=True) as mapResponse:
+            if mapResponse.headers["content-type"] != "application/octet-stream":
+                self.scheduleNextPoll()
+                return False
+
+            # Download the map.
+            partialFileLocation = self.downloadFileLocation + Generic.PARTIAL_DOWNLOAD_EXTENSION
+            with open(partialFileLocation, "wb") as file:
+                for chunk in mapResponse.iter_content(Generic.DOWNLOAD_CHUNK_SIZE):
+                    file.write(chunk)
+        os.replace(partialFileLocation, self.downloadFileLocation)
+        return True
+
+    def timedOut(self, timeout: float) -> bool:
+        """Returns if the job has taken longer than the timeout.
+
+        :param timeout: Timeout of the job in seconds.
+        :return: Whether the job timed out.
+        """
+
+        return time.monotonic() - self.submitTime > timeout
+
+
+def getBeatSageMaps(jobs: List[BeatSageJob], concurrentJobs: int = DEFAULT_CONCURRENT_JOBS, timeout: float = DEFAULT_JOB_TIMEOUT, maxAttempts: int = DEFAULT_MAX_JOB_ATTEMPTS) -> Dict[str, Exception]:
+    """Requests multiple maps from Beat Sage at once.
+    Jobs that time out or fail are submitted again until they reach the maximum attempts.
+
+    :param jobs: Jobs to request.
+    :param concurrentJobs: Maximum amount of jobs to have submitted at once.
+    :param timeout: Time in seconds to wait for a job before submitting it again.
+    :param maxAttempts: Maximum amount of times to submit a job.
+    :return: The errors of the jobs that failed, keyed by the download file location.
+    """
+
+    pendingJobs = list(jobs)
+    activeJobs = []
+    failedJobs = {}
+    while len(pendingJobs) > 0 or len(activeJobs) > 0:
+        # Submit jobs until the limit is reached.
+        # Jobs that failed to submit wait for their next poll time before being submitted again.
+        for job in list(pendingJobs):
+            if len(activeJobs) >= concurrentJobs:
+                break
+            if job.nextPollTime > time.monotonic():
+                continue
+            pendingJobs.remove(job)
+            try:
+                job.submit()
+                activeJobs.append(job)
+            except Exception as error:
+                if job.attempts < maxAttempts:
+                    job.scheduleNextPoll()
+                    pendingJobs.append(job)
+                else:
+                    print("\t\tFailed to submit Beat Sage job for " + os.path.basename(job.downloadFileLocation) + " (" + str(error) + ").")
+                    failedJobs[job.downloadFileLocation] = error
+
+        # Wait for the next job to poll or submit.
+        waitingJobs = list(activeJobs)
+        if len(activeJobs) < concurrentJobs:
+            waitingJobs.extend(pendingJobs)
+        if len(waitingJobs) == 0:
+            continue
+        delay = min(job.nextPollTime for job in waitingJobs) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        # Poll the jobs that are due.
+        # Errors when polling are treated as the job not being complete.
+        for job in list(activeJobs):
+            if job.nextPollTime > time.monotonic():
+                continue
+            try:
+                if job.poll():
+                    print("\t\tDownloaded Beat Sage map " + os.path.basename(job.downloadFileLocation) + ".")
+                    activeJobs.remove(job)
+                    continue
+            except Exception as error:
+                print("\t\tFailed to poll Beat Sage job for " + os.path.basename(job.downloadFileLocation) + " (" + str(error) + ").")
+                job.scheduleNextPoll()
+            if not job.timedOut(timeout):
+                continue
+
+            # Submit the job again or fail the job if it timed out.
+            activeJobs.remove(job)
+            if job.attempts < maxAttempts:
+                print("\t\tBeat Sage job for " + os.path.basename(job.downloadFileLocation) + " timed out. Submitting it again.")
+                pendingJobs.append(job)
+            else:
+                print("\t\tBeat Sage job for " + os.path.basename(job.downloadFileLocation) + " timed out.")
+                failedJobs[job.downloadFileLocation] = TimeoutError("Beat Sage job timed out after " + str(timeout) + " seconds.")
+    return failedJobs
+
 
 def getBeatSageMap(audioFileLocation: str, coverFileLocation: str, downloadFileLocation: str) -> None:
     """Requests downloading a map from Beat Sage.
@@ -40,45 +368,12 @@ def getBeatSageMap(audioFileLocation: str, coverFileLocation: str, downloadFileL
     :param downloadFileLocation: Location to save the archive file.
     """
 
-    # Send the download request.
-    fields = {
-        "audio_file": ("audio", open(audioFileLocation, "rb"), "audio/mpeg"),
-        "cover_art": ("cover", open(coverFileLocation, "rb"), "image/" + os.path.splitext(os.path.basename(coverFileLocation))[1][1:]),
-        "audio_metadata_title": "ArtistName",
-        "audio_metadata_artist": "SongName",
-        "difficulties": DIFFICULTIES,
-        "modes": MODES,
-        "events": "",
-        "environment": "DefaultEnvironment",
-        "system_tag": SYSTEM_VERSION,
-    }
-    boundary = "----WebKitFormBoundary" + "".join(random.sample(string.ascii_letters + string.digits, 16))
-    message = MultipartEncoder(fields=fields, boundary=boundary)
-    headers = {
-        "Host": "beatsage.com",
-        "Connection": "keep-alive",
-        "Content-Type": message.content_type
-    }
-    createMapResponse = requests.post("https://beatsage.com/beatsaber_custom_level_create", headers=headers, data=message)
-    try:
-        downloadMapId = createMapResponse.json()["id"]
-    except:
-        print("Unexpected response from Beat Sage: " + str(createMapResponse.text))
-        raise
-
-    # Download the map.
-    mapUrl = "https://beatsage.com/beatsaber_custom_level_download/" + downloadMapId
-    import time
-    while True:
-        mapResponse = requests.get(mapUrl)
-        if mapResponse.headers["content-type"] == "application/octet-stream":
-            with open(downloadFileLocation, "wb") as file:
-                file.write(mapResponse.content)
-                break
-        time.sleep(0.25)
+    failedJobs = getBeatSageMaps([BeatSageJob(audioFileLocation, coverFileLocation, downloadFileLocation)], 1)
+    if downloadFileLocation in failedJobs.keys():
+        raise failedJobs[downloadFileLocation]
 
 
-def processBeatSageMap(song: Song, audioFileLocation: str, coverFileLocation: str, downloadLocation: str, mapLocation: str) -> None:
+def processBeatSageMap(song: Song, audioFileLocation: str, coverFileLocation: str, downloadLocation: str, mapLocation: str, database: Optional[Database] = None, bpmAnalysisMode: str = "Full") -> None:
     """Processes a Beat Sage map.
 
     :param song: Song of the map.
@@ -86,6 +381,8 @@ def processBeatSageMap(song: Song, audioFileLocation: str, coverFileLocation: st
     :param coverFileLocation: Location of the cover file.
     :param downloadLocation: Download location of the Beat Sage map.
     :param mapLocation: Location to process the map to.
+    :param database: Database to cache the BPM of the song in.
+    :param bpmAnalysisMode: Name of the analysis mode in BPM_ANALYSIS_MODES to determine the BPM with.
     """
 
     with ZipFile(downloadLocation) as mapArchive:
@@ -94,21 +391,29 @@ def processBeatSageMap(song: Song, audioFileLocation: str, coverFileLocation: st
             os.makedirs(mapLocation)
 
         # Determine the initial delay.
-        bpm = getBpm(audioFileLocation)
+        # The BPM is always determined from the original audio file so that maps that are resumed after the
+        # new audio file was created use the same BPM and delay as the padding of the audio file.
+        bpm = getBpm(audioFileLocation, bpmAnalysisMode, database)
         startDelay = 2
         secondsPerBeat = 60 * (1 / bpm)
         initialDelayBeats = round(startDelay / secondsPerBeat)
         initialDelaySeconds = initialDelayBeats * secondsPerBeat
 
         # Create the new audio file.
-        if not os.path.exists(mapLocation + "/song.ogg"):
-            silenceSegment = AudioSegment.silent(round(initialDelaySeconds * 1000))
-            musicSegment = AudioSegment.from_mp3(audioFileLocation)
-            newSection = silenceSegment + musicSegment
-            newSection.export(mapLocation + "/song.ogg", "ogg")
+        songFileLocation = os.path.join(mapLocation, "song.ogg")
+        if not os.path.exists(songFileLocation):
+            decodedAudioDirectory = tempfile.mkdtemp(dir=os.path.dirname(os.path.realpath(mapLocation)))
+            try:
+                decodedAudioLocation = os.path.join(decodedAudioDirectory, "song.wav")
+                paddedAudioLocation = os.path.join(decodedAudioDirectory, "song.ogg")
+                decodeAudio(audioFileLocation, decodedAudioLocation)
+                writePaddedAudio(decodedAudioLocation, paddedAudioLocation, round(initialDelaySeconds * 1000))
+                os.replace(paddedAudioLocation, songFileLocation)
+            finally:
+                shutil.rmtree(decodedAudioDirectory)
 
         # Get the map info.
-        mapInfo = json.loads(mapArchive.read("Info.dat"))
+        mapInfo = JsonCodec.loads(mapArchive.read("Info.dat"))
         originalBpm = mapInfo["_beatsPerMinute"]
 
         # Change the map info.
@@ -131,15 +436,16 @@ def processBeatSageMap(song: Song, audioFileLocation: str, coverFileLocation: st
         # Process the difficulty maps.
         for fileName in mapFiles:
             if not os.path.exists(mapLocation + "/" + fileName):
-                mapData = json.loads(mapArchive.read(fileName))
-                for note in mapData["_notes"]:
-                    noteTime = (note["_time"] * (60 / originalBpm)) - 1
-                    note["_time"] = (noteTime / secondsPerBeat) + initialDelayBeats
+                mapData = JsonCodec.loads(mapArchive.read(fileName))
+                notes = DifficultyColumns(mapData).notes
+                noteTimes = (notes.getColumn("time") * (60 / originalBpm)) - 1
+                notes.setColumn("time", (noteTimes / secondsPerBeat) + initialDelayBeats)
+                notes.applyChanges()
                 with open(mapLocation + "/" + fileName, "w") as file:
-                    file.write(json.dumps(mapData).replace(" ", ""))
+                    file.write(JsonCodec.dumps(mapData, separators=(",", ":"), ensureAscii=True).decode("utf8").replace(" ", ""))
 
         # Write the map info file.
         # This is done last since the previous checks use the Info.dat file.
         if not os.path.exists(mapLocation + "/Info.dat"):
             with open(mapLocation + "/Info.dat", "w") as file:
-                file.write(json.dumps(mapInfo, indent=4))
+                file.write(JsonCodec.dumps(mapInfo, indent=4, ensureAscii=True).decode("utf8"))
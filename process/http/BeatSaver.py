@@ -7,9 +7,64 @@ Handles HTTP requests to BeatSaver.
 import json
 import os
 import requests
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from data.Configuration import getConfiguration
+from data.Database import Database
 from data.Song import Song
-from typing import List
+from process.http import Generic
+from process.http.RateLimiter import RateLimiter
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
+
+BEATSAVER_API_URL = "https://api.beatsaver.com"
+DEFAULT_DOWNLOAD_WORKERS = 4
+MAX_MAP_IDS_PER_REQUEST = 50
+
+# The session and rate limiter are shared by all the threads so the connections are reused
+# and a rate limit response pauses all the requests instead of only the request that got it.
+# The session keeps a pooled connection for each download worker.
+session = requests.Session()
+sessionAdapter = HTTPAdapter(pool_maxsize=getConfiguration("BeatSaverDownloadWorkers", DEFAULT_DOWNLOAD_WORKERS))
+session.mount("http://", sessionAdapter)
+session.mount("https://", sessionAdapter)
+rateLimiter = RateLimiter()
+
+
+def pauseForRateLimit(response: requests.Response) -> bool:
+    """Pauses the requests until the rate limit resets if a response is a rate limit response.
+
+    :param response: Response to check.
+    :return: Whether the response is a rate limit response, in which case the request should be retried.
+    """
+
+    # Try to parse the JSON response.
+    try:
+        responseJson = json.loads(response.content.decode())
+        if not isinstance(responseJson, dict) or responseJson.get("identifier") != "RATE_LIMIT_EXCEEDED":
+            return False
+        delay = (responseJson["resetAfter"] / 1000) + 1
+    except Exception:
+        return False
+
+    # Pause the requests.
+    print("Rate limit reached. Retrying in " + str(delay) + " seconds.")
+    rateLimiter.pause(delay)
+    return True
+
+
+def getResponse(url: str) -> requests.Response:
+    """Fetches the response for a URL.
+    Rate limit responses are retried after the rate limit resets.
+
+    :param url: URL to fetch.
+    :return: The response.
+    """
+
+    while True:
+        rateLimiter.wait()
+        response = session.get(url)
+        if not pauseForRateLimit(response):
+            return response
 
 
 def get(url: str) -> bytes:
@@ -19,23 +74,20 @@ def get(url: str) -> bytes:
     :return: The binary response.
     """
 
-    # Get the response.
-    response = requests.get(url).content
+    return getResponse(url).content
 
-    # Try to parse the JSON response and re-run if it is requires a retry.
-    try:
-        responseString = response.decode()
-        responseJson = json.loads(responseString)
-        if "identifier" in responseJson and responseJson["identifier"] == "RATE_LIMIT_EXCEEDED":
-            delay = (responseJson["resetAfter"] / 1000) + 1
-            print("Rate limit reached. Retrying in " + str(delay) + " seconds.")
-            time.sleep(delay)
-            return get(url)
-    except Exception:
-        pass
 
-    # Return the response.
-    return response
+def getJson(url: str) -> any:
+    """Fetches and parses the JSON response for a URL.
+
+    :param url: URL to fetch.
+    :return: The parsed response.
+    """
+
+    response = getResponse(url)
+    if response.status_code != 200:
+        raise IOError("HTTP " + str(response.status_code) + " for " + url + ": " + response.content[:200].decode(errors="replace"))
+    return json.loads(response.content.decode())
 
 
 def getPage(page: int) -> List[Song]:
@@ -46,7 +98,7 @@ def getPage(page: int) -> List[Song]:
     """
 
     songs = []
-    pageData = json.loads(get("https://api.beatsaver.com/search/text/" + str(page) + "?sortOrder=Latest").decode())
+    pageData = json.loads(get(BEATSAVER_API_URL + "/search/text/" + str(page) + "?sortOrder=Latest").decode())
     for songData in pageData["docs"]:
         song = Song()
         song.artist = songData["metadata"]["songAuthorName"]
@@ -57,20 +109,171 @@ def getPage(page: int) -> List[Song]:
     return songs
 
 
-def downloadMap(beatSaverId: str, downloadLocation: str) -> None:
+def getLatestVersion(mapData: any) -> Optional[Tuple[str, str]]:
+    """Returns the download URL and hash of the latest version of a map.
+
+    :param mapData: Map information from BeatSaver.
+    :return: The download URL and version hash, or None if the map information has no versions.
+    """
+
+    if not isinstance(mapData, dict) or not isinstance(mapData.get("versions"), list) or len(mapData["versions"]) == 0:
+        return None
+    version = mapData["versions"][0]
+    if not isinstance(version, dict) or "downloadURL" not in version.keys() or "hash" not in version.keys():
+        return None
+    return version["downloadURL"], version["hash"]
+
+
+def getMapVersion(beatSaverId: str) -> Tuple[str, str]:
+    """Returns the download URL and hash of the latest version of a map.
+
+    :param beatSaverId: BeatSaver id of the map.
+    :return: The download URL and version hash.
+    """
+
+    mapVersion = getLatestVersion(getJson(BEATSAVER_API_URL + "/maps/id/" + beatSaverId))
+    if mapVersion is None:
+        raise LookupError("BeatSaver map " + beatSaverId + " has no versions.")
+    return mapVersion
+
+
+def getMapVersions(beatSaverIds: List[str]) -> Tuple[Dict[str, Tuple[str, str]], Dict[str, Exception]]:
+    """Returns the download URLs and hashes of the latest versions of maps.
+    The maps are requested in batches instead of one request per map. If a batch fails or is missing
+    maps (such as deleted maps), the maps that were not found are requested one at a time.
+
+    :param beatSaverIds: BeatSaver ids of the maps.
+    :return: The download URL and version hash for each BeatSaver id (lowercase) that was found, and
+             the errors of the BeatSaver ids (lowercase) that could not be found.
+    """
+
+    mapVersions = {}
+    failedIds = {}
+    for i in range(0, len(beatSaverIds), MAX_MAP_IDS_PER_REQUEST):
+        # Get the map information.
+        mapIds = beatSaverIds[i:i + MAX_MAP_IDS_PER_REQUEST]
+        mapsData = {}
+        if len(mapIds) > 1:
+            try:
+                mapsData = getJson(BEATSAVER_API_URL + "/maps/ids/" + ",".join(mapIds))
+                if not isinstance(mapsData, dict):
+                    raise IOError("Unexpected response for the BeatSaver maps: " + type(mapsData).__name__)
+            except Exception as error:
+                print("\tFailed to get the versions of " + str(len(mapIds)) + " maps (" + str(error) + "). Requesting the maps one at a time.")
+                mapsData = {}
+
+        # Store the latest versions.
+        for mapId, mapData in mapsData.items():
+            mapVersion = getLatestVersion(mapData)
+            if mapVersion is not None:
+                mapVersions[str(mapId).lower()] = mapVersion
+
+        # Request the maps that were not found one at a time.
+        # A single map is always requested this way since the batch would only be repeated.
+        for mapId in mapIds:
+            if mapId.lower() in mapVersions.keys():
+                continue
+            try:
+                mapVersions[mapId.lower()] = getMapVersion(mapId)
+            except Exception as error:
+                failedIds[mapId.lower()] = error
+    return mapVersions, failedIds
+
+
+def getDownloadUrls(songs: List[Song], database: Database) -> Tuple[Dict[str, str], Dict[str, Exception]]:
+    """Returns the download URLs for the maps of songs.
+    The URLs are cached in the database so only maps that were never resolved are requested.
+
+    :param songs: Songs to get the download URLs of.
+    :param database: Database to cache the download URLs in.
+    :return: The download URL for each BeatSaver id (lowercase), and the errors of the BeatSaver ids (lowercase) that could not be found.
+    """
+
+    # Read the cached download URLs.
+    downloadUrls = {}
+    for beatSaverKey, downloadUrl in database.iterate("SELECT BeatSaverKey,DownloadURL FROM BeatSaverMapVersions;"):
+        downloadUrls[beatSaverKey.lower()] = downloadUrl
+
+    # Request and cache the missing download URLs.
+    missingIds = []
+    for song in songs:
+        if song.beatSaverKey.lower() not in downloadUrls.keys() and song.beatSaverKey.lower() not in missingIds:
+            missingIds.append(song.beatSaverKey.lower())
+    failedIds = {}
+    if len(missingIds) > 0:
+        mapVersions, failedIds = getMapVersions(missingIds)
+        for beatSaverKey, (downloadUrl, versionHash) in mapVersions.items():
+            downloadUrls[beatSaverKey] = downloadUrl
+            database.execute("INSERT OR REPLACE INTO BeatSaverMapVersions VALUES (?,?,?);", [beatSaverKey, downloadUrl, versionHash])
+        database.commit()
+    return downloadUrls, failedIds
+
+
+def clearDownloadUrls(beatSaverIds: List[str], database: Database) -> None:
+    """Clears the cached download URLs of maps so they are requested again.
+    Used when a download fails since the cached URL may no longer be valid.
+
+    :param beatSaverIds: BeatSaver ids of the maps.
+    :param database: Database the download URLs are cached in.
+    """
+
+    database.executeMany("DELETE FROM BeatSaverMapVersions WHERE BeatSaverKey = ?;", [[beatSaverId.lower()] for beatSaverId in beatSaverIds])
+    database.commit()
+
+
+def downloadMap(beatSaverId: str, downloadLocation: str, downloadUrl: Optional[str] = None) -> None:
     """Downloads a map.
 
     :param beatSaverId: BeatSaver id to download.
     :param downloadLocation: Location to save the downloaded file to.
+    :param downloadUrl: Download URL of the map. If it is not provided, the map information is requested.
     """
 
     # Get the map information.
-    mapData = json.loads(get("https://api.beatsaver.com/maps/id/" + beatSaverId).decode())
-    downloadUrl = mapData["versions"][0]["downloadURL"]
+    if downloadUrl is None:
+        downloadUrl = getMapVersion(beatSaverId)[0]
 
     # Download the map.
-    parentDirectory = os.path.dirname(downloadLocation)
-    if not os.path.exists(parentDirectory):
-        os.makedirs(parentDirectory)
-    with open(downloadLocation, "wb") as file:
-        file.write(get(downloadUrl))
+    # The directory may be created by another download thread at the same time.
+    # Rate limit responses are retried after the rate limit resets, the same as the other requests.
+    os.makedirs(os.path.dirname(downloadLocation), exist_ok=True)
+    while True:
+        rateLimiter.wait()
+        try:
+            Generic.downloadFile(downloadUrl, downloadLocation, session)
+            return
+        except requests.HTTPError as error:
+            if error.response is None or not pauseForRateLimit(error.response):
+                raise
+
+
+def downloadMaps(songs: List[Song], workers: int = DEFAULT_DOWNLOAD_WORKERS, downloadUrls: Optional[Dict[str, str]] = None) -> Dict[str, Exception]:
+    """Downloads the maps for a list of songs at the same time.
+    A map that fails to download does not stop the other maps from downloading.
+
+    :param songs: Songs to download the maps of.
+    :param workers: Maximum amount of maps to download at once. The session pools a connection for the amount of
+                    workers in the BeatSaverDownloadWorkers configuration.
+    :param downloadUrls: Download URLs for the BeatSaver ids (lowercase). Maps without a download URL request the map information.
+    :return: The errors of the maps that failed to download, keyed by the map download path.
+    """
+
+    if downloadUrls is None:
+        downloadUrls = {}
+
+    # Download the maps.
+    failedDownloads = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for song in songs:
+            downloadUrl = downloadUrls.get(song.beatSaverKey.lower())
+            futures[executor.submit(downloadMap, song.beatSaverKey, song.mapDownloadPath, downloadUrl)] = song
+        for future in as_completed(futures.keys()):
+            song = futures[future]
+            try:
+                future.result()
+                print("\tDownloaded " + song.getSongName())
+            except Exception as error:
+                print("\tFailed to download " + song.getSongName() + " (" + str(error) + ").")
+                failedDownloads[song.mapDownloadPath] = error
+    return failedDownloads
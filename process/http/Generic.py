@@ -4,7 +4,113 @@ TheNexusAvenger
 Generic HTTP helper methods.
 """
 
+import os
+import re
 import requests
+from typing import Optional
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+PARTIAL_DOWNLOAD_EXTENSION = ".part"
+# The validator of a partial file is stored next to it with the partial file extension so it is ignored like the partial file.
+VALIDATOR_EXTENSION = ".validator" + PARTIAL_DOWNLOAD_EXTENSION
+
+
+def getValidator(response: requests.Response) -> Optional[str]:
+    """Returns the validator of a response that can be used with If-Range.
+    Weak ETags can't be used with If-Range, so the modified time is used instead.
+
+    :param response: Response to get the validator of.
+    :return: The ETag or Last-Modified of the response, or None if the response has no validator.
+    """
+
+    eTag = response.headers.get("ETag")
+    if eTag is not None and not eTag.startswith("W/"):
+        return eTag
+    return response.headers.get("Last-Modified")
+
+
+def downloadPartialFile(url: str, partialPath: str, session: Optional[requests.Session] = None) -> requests.Response:
+    """Downloads a URL to a partial file in chunks.
+    If the partial file already exists from an interrupted download, the download is resumed with If-Range
+    so that the remaining part is only used if the file did not change. Partial files without a validator
+    are downloaded again.
+
+    :param url: The URL to download from.
+    :param partialPath: The path of the partial file to download to.
+    :param session: Session to make the request with.
+    :return: The response of the download.
+    """
+
+    if session is None:
+        with requests.Session() as session:
+            return downloadPartialFile(url, partialPath, session)
+
+    # Request the remaining part of the file.
+    # Compression is disabled so that the sizes match the Content-Length and Content-Range headers.
+    validatorPath = partialPath + VALIDATOR_EXTENSION
+    existingSize = 0
+    headers = {"Accept-Encoding": "identity"}
+    if os.path.exists(partialPath) and os.path.exists(validatorPath):
+        with open(validatorPath) as file:
+            headers["If-Range"] = file.read()
+        existingSize = os.path.getsize(partialPath)
+        headers["Range"] = "bytes=" + str(existingSize) + "-"
+    response = session.get(url, headers=headers, stream=True)
+
+    # Restart the download if the server did not return the requested range.
+    if response.status_code == 416:
+        response.close()
+        os.remove(partialPath)
+        return downloadPartialFile(url, partialPath, session)
+    response.raise_for_status()
+    with response:
+        # The server returns the whole file if it changed since the partial file was downloaded.
+        expectedSize = None
+        if response.status_code == 206:
+            mode = "ab"
+            contentRange = re.match(r"bytes (\d+)-\d+/(\d+)", response.headers.get("Content-Range", ""))
+            if contentRange is None or int(contentRange.group(1)) != existingSize:
+                raise IOError("Unexpected Content-Range for " + url + ": " + str(response.headers.get("Content-Range")))
+            expectedSize = int(contentRange.group(2))
+        else:
+            mode = "wb"
+            if "Content-Length" in response.headers:
+                expectedSize = int(response.headers["Content-Length"])
+
+            # Store the validator to resume the download with if it is interrupted.
+            validator = getValidator(response)
+            if validator is not None:
+                with open(validatorPath, "w") as file:
+                    file.write(validator)
+            elif os.path.exists(validatorPath):
+                os.remove(validatorPath)
+
+        # Write the response in chunks.
+        with open(partialPath, mode) as file:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+
+    # Keep the partial file to resume if the download was incomplete.
+    downloadedSize = os.path.getsize(partialPath)
+    if expectedSize is not None and downloadedSize != expectedSize:
+        raise IOError("Incomplete download of " + url + " (" + str(downloadedSize) + " of " + str(expectedSize) + " bytes).")
+    if os.path.exists(validatorPath):
+        os.remove(validatorPath)
+    return response
+
+
+def downloadFile(url: str, path: str, session: Optional[requests.Session] = None) -> None:
+    """Downloads a file.
+    The file is only moved to the path once it is complete.
+
+    :param url: The URL to download from.
+    :param path: The path to save to.
+    :param session: Session to make the request with.
+    """
+
+    partialPath = path + PARTIAL_DOWNLOAD_EXTENSION
+    downloadPartialFile(url, partialPath, session)
+    os.replace(partialPath, path)
 
 
 def downloadImage(url: str, pathWithoutExtension: str) -> str:
@@ -15,8 +121,8 @@ def downloadImage(url: str, pathWithoutExtension: str) -> str:
     :return: The path the file is saved to.
     """
 
-    response = requests.get(url)
+    partialPath = pathWithoutExtension + PARTIAL_DOWNLOAD_EXTENSION
+    response = downloadPartialFile(url, partialPath)
     path = pathWithoutExtension + "." + response.headers["Content-Type"].split("/")[1]
-    with open(path, "wb") as file:
-        file.write(response.content)
-    return path
\ No newline at end of file
+    os.replace(partialPath, path)
+    return path
@@ -0,0 +1,38 @@
+"""
+TheNexusAvenger
+
+Rate limiter shared between the threads making requests to a service.
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    def __init__(self):
+        """Creates the rate limiter.
+        """
+
+        self.lock = threading.Lock()
+        self.resumeTime = 0
+
+    def wait(self) -> None:
+        """Waits until requests are allowed.
+        """
+
+        # A loop is used since the resume time can be extended while waiting.
+        while True:
+            with self.lock:
+                delay = self.resumeTime - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def pause(self, delay: float) -> None:
+        """Pauses requests for all threads.
+
+        :param delay: Time in seconds to pause the requests for.
+        """
+
+        with self.lock:
+            self.resumeTime = max(self.resumeTime, time.monotonic() + delay)
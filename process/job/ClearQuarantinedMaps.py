@@ -0,0 +1,30 @@
+"""
+TheNexusAvenger
+
+Clears the quarantine of maps that failed too many times so they are attempted again.
+Specific maps can be cleared by passing their keys (such as "BeatSaver/Artist - Song [BeatSaver 1a2b]").
+"""
+
+import sys
+from data.Database import Database
+from data.MapStates import MapStates
+
+
+# Get the quarantined maps.
+database = Database()
+mapStates = MapStates(database)
+quarantinedMapKeys = mapStates.getQuarantinedMapKeys()
+if len(quarantinedMapKeys) == 0:
+    print("No maps are quarantined.")
+    database.close()
+    exit(0)
+
+# Clear the quarantine of the maps.
+mapKeys = sys.argv[1:] if len(sys.argv) > 1 else list(quarantinedMapKeys.keys())
+for mapKey in mapKeys:
+    if mapKey not in quarantinedMapKeys.keys():
+        print("Map " + mapKey + " is not quarantined.")
+        continue
+    print("Clearing the quarantine of " + mapKey + " (" + str(quarantinedMapKeys[mapKey]) + ").")
+mapStates.clearQuarantine([mapKey for mapKey in mapKeys if mapKey in quarantinedMapKeys.keys()])
+database.close()
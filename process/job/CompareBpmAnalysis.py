@@ -0,0 +1,49 @@
+"""
+TheNexusAvenger
+
+Compares the BPM of the downloaded Beat Sage songs between the full analysis and a faster analysis mode.
+The results are cached in the database, so the chosen mode does not need to analyze the songs again.
+"""
+
+import os
+import sys
+import time
+from data.Database import Database
+from process.http import BeatSage
+
+
+# Determine the mode to compare.
+mode = "Fast"
+if len(sys.argv) > 1:
+    mode = sys.argv[1]
+if mode not in BeatSage.BPM_ANALYSIS_MODES.keys():
+    print("Unknown BPM analysis mode " + mode + ". Exiting.")
+    exit(-1)
+
+# Compare the songs.
+database = Database()
+songsPath = os.path.realpath(os.path.join(__file__, "..", "..", "..", "maps", "Downloads", "Songs"))
+totalDifference = 0
+totalSongs = 0
+if os.path.exists(songsPath):
+    print("Comparing the Full and " + mode + " BPM analysis modes.")
+    for songFileName in sorted(os.listdir(songsPath)):
+        if not songFileName.endswith(".mp3"):
+            continue
+        songPath = os.path.join(songsPath, songFileName)
+        startTime = time.time()
+        fullBpm = BeatSage.getBpm(songPath, "Full", database)
+        fullTime = time.time() - startTime
+        startTime = time.time()
+        modeBpm = BeatSage.getBpm(songPath, mode, database)
+        modeTime = time.time() - startTime
+        totalDifference += abs(modeBpm - fullBpm)
+        totalSongs += 1
+        print("\t" + songFileName + ": " + str(round(fullBpm, 3)) + " BPM (" + str(round(fullTime, 2)) + " seconds) vs " + str(round(modeBpm, 3)) + " BPM (" + str(round(modeTime, 2)) + " seconds), difference of " + str(round(modeBpm - fullBpm, 3)) + " BPM")
+
+# Output the summary.
+if totalSongs == 0:
+    print("No songs to compare.")
+else:
+    print("Average difference of " + str(round(totalDifference / totalSongs, 3)) + " BPM over " + str(totalSongs) + " songs.")
+database.close()
@@ -4,11 +4,17 @@ TheNexusAvenger
 Creates a mapping between custom map hashes and BeatSaver map hashes.
 """
 
-import hashlib
-import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from data.Configuration import getConfiguration
+from data.LevelHash import calculateLevelHash, saveHashMapping
+from data.MapHashCache import MapHashCache
+from typing import Dict, List, Optional
 from zipfile import ZipFile
 
+MAPS_PATH = os.path.realpath(os.path.join(__file__, "..", "..", "..", "maps"))
+MAP_DIRECTORY_NAMES = ["Maps", "UnvalidatedMaps"]
+
 
 def getMapFiles(filePath: str) -> dict[str, bytes]:
     """Reads a directory or zip file map.
@@ -45,51 +51,116 @@ def calculateMapHash(filePath: str) -> str:
     :return: Hash of the map.
     """
 
-    # Read the info file.
-    mapFiles = getMapFiles(filePath)
-    mapInfo = json.loads(mapFiles["info.dat"].decode("utf8"))
+    return calculateLevelHash(getMapFiles(filePath))
+
+
+def getMapFingerprint(filePath: str) -> any:
+    """Returns the fingerprint of the files of a directory or zip map from the sizes and modified times.
+    Only the .dat files are part of the hash, so the other files of a directory map are ignored.
+
+    :param filePath: Path of the map.
+    :return: The fingerprint of the map.
+    """
+
+    if not os.path.isdir(filePath):
+        fileStat = os.stat(filePath)
+        return [fileStat.st_size, fileStat.st_mtime_ns]
+    fingerprint = []
+    for fileName in os.listdir(filePath):
+        if not fileName.endswith(".dat"):
+            continue
+        fileStat = os.stat(os.path.join(filePath, fileName))
+        fingerprint.append([fileName, fileStat.st_size, fileStat.st_mtime_ns])
+    fingerprint.sort()
+    return fingerprint
+
 
-    # Hash the info file.
-    sha1 = hashlib.sha1()
-    sha1.update(mapFiles["info.dat"])
+def calculateMapHashes(filePaths: List[str], jobs: int = 1, cache: Optional[MapHashCache] = None, mapsPath: str = MAPS_PATH) -> Dict[str, str]:
+    """Calculates the hashes of directory or zip maps.
+    Maps with the same fingerprint as when they were last hashed use the cached hash.
 
-    # Hash the difficulty maps.
-    if "_difficultyBeatmapSets" in mapInfo.keys():
-        # Handle V3 and older maps.
-        for difficultyBeatmapSets in mapInfo["_difficultyBeatmapSets"]:
-            for difficultyBeatmap in difficultyBeatmapSets["_difficultyBeatmaps"]:
-                sha1.update(mapFiles[difficultyBeatmap["_beatmapFilename"].lower()])
+    :param filePaths: Paths of the maps.
+    :param jobs: Amount of worker processes to hash the maps with. 1 hashes the maps in the current process.
+    :param cache: Cache of the map hashes. The default cache is used if none is provided.
+    :param mapsPath: Path the cache keys are relative to.
+    :return: Hashes of the maps, keyed by the path.
+    """
+
+    # Load the cache.
+    if cache is None:
+        cache = MapHashCache()
+
+    # Get the cached hashes.
+    mapHashes = {}
+    mapsToHash = []
+    for filePath in filePaths:
+        cacheKey = os.path.relpath(filePath, mapsPath).replace("\\", "/")
+        fingerprint = getMapFingerprint(filePath)
+        mapHash = cache.getHash(cacheKey, fingerprint)
+        if mapHash is None:
+            mapsToHash.append((filePath, cacheKey, fingerprint))
+        else:
+            mapHashes[filePath] = mapHash
+
+    # Hash the new and changed maps.
+    if jobs <= 1 or len(mapsToHash) <= 1:
+        calculatedHashes = [calculateMapHash(filePath) for filePath, _, _ in mapsToHash]
     else:
-        # Handle V4 and newer maps.
-        if "audioDataFilename" in mapInfo["audio"].keys():
-            sha1.update(mapFiles[mapInfo["audio"]["audioDataFilename"].lower()])
-        for difficultyBeatmap in mapInfo["difficultyBeatmaps"]:
-            if "beatmapDataFilename" in difficultyBeatmap.keys():
-                sha1.update(mapFiles[difficultyBeatmap["beatmapDataFilename"].lower()])
-            if "lightshowDataFilename" in difficultyBeatmap.keys():
-                sha1.update(mapFiles[difficultyBeatmap["lightshowDataFilename"].lower()])
-
-    # Hash the map files.
-    return sha1.hexdigest()
-
-
-# Create the hash mapping.
-mapHashes = {}
-mapsPath = os.path.realpath(os.path.join(__file__, "..", "..", "..", "maps"))
-for mapDirectoryName in ["Maps", "UnvalidatedMaps"]:
-    mapDirectory = os.path.join(mapsPath, mapDirectoryName)
-    if not os.path.exists(mapDirectory):
-        continue
-
-    # Add the hashes for the maps.
-    print("Generating hashes for " + mapDirectoryName)
-    for mapName in os.listdir(mapDirectory):
-        mapFilePath = os.path.join(mapDirectory, mapName)
-        mapDownloadFilePath = os.path.join(mapsPath, "Downloads", "BeatSaver", mapName + ".zip")
-        if not os.path.exists(mapDownloadFilePath):
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            calculatedHashes = list(executor.map(calculateMapHash, [filePath for filePath, _, _ in mapsToHash]))
+    for (filePath, cacheKey, fingerprint), mapHash in zip(mapsToHash, calculatedHashes):
+        cache.setHash(cacheKey, fingerprint, mapHash)
+        mapHashes[filePath] = mapHash
+
+    # Return the hashes.
+    return mapHashes
+
+
+def createHashMapping(jobs: int = 1, cache: Optional[MapHashCache] = None, mapsPath: str = MAPS_PATH) -> Dict[str, str]:
+    """Creates the mapping between the hashes of the processed maps and the hashes of the BeatSaver downloads.
+    The mapping is stored in hashes.json in the validated maps directory if it changed.
+
+    :param jobs: Amount of worker processes to hash the maps with. 1 hashes the maps in the current process.
+    :param cache: Cache of the map hashes. The default cache is used if none is provided.
+    :param mapsPath: Path of the maps.
+    :return: Hashes of the BeatSaver downloads, keyed by the hashes of the processed maps.
+    """
+
+    # Load the cache.
+    if cache is None:
+        cache = MapHashCache()
+
+    # Determine the maps to hash.
+    mapPairs = []
+    for mapDirectoryName in MAP_DIRECTORY_NAMES:
+        mapDirectory = os.path.join(mapsPath, mapDirectoryName)
+        if not os.path.exists(mapDirectory):
             continue
-        mapHashes[calculateMapHash(mapFilePath)] = calculateMapHash(mapDownloadFilePath)
+        for mapName in os.listdir(mapDirectory):
+            mapFilePath = os.path.join(mapDirectory, mapName)
+            mapDownloadFilePath = os.path.join(mapsPath, "Downloads", "BeatSaver", mapName + ".zip")
+            if not os.path.isdir(mapFilePath) or not os.path.exists(mapDownloadFilePath):
+                continue
+            mapPairs.append((mapFilePath, mapDownloadFilePath))
+
+    # Hash the maps.
+    print("Generating hashes for " + str(len(mapPairs)) + " maps.")
+    filePaths = [filePath for mapPair in mapPairs for filePath in mapPair]
+    mapHashes = calculateMapHashes(filePaths, jobs, cache, mapsPath)
+    cache.removeMissingEntries({os.path.relpath(filePath, mapsPath).replace("\\", "/") for filePath in filePaths})
+    cache.save()
+
+    # Create the hash mapping.
+    hashMapping = {}
+    for mapFilePath, mapDownloadFilePath in mapPairs:
+        hashMapping[mapHashes[mapFilePath]] = mapHashes[mapDownloadFilePath]
+
+    # Store the hashes if they changed.
+    if not saveHashMapping(hashMapping, os.path.join(mapsPath, "Maps", "hashes.json")):
+        print("\tHashes are unchanged.")
+    return hashMapping
+
 
-# Store the hashes.
-with open(os.path.join(mapsPath, "Maps", "hashes.json"), "w") as file:
-    file.write(json.dumps(mapHashes, indent=4))
+# The script is guarded since the hashing worker processes re-import the main module on Windows.
+if __name__ == "__main__":
+    createHashMapping(getConfiguration("ProcessingJobs", 1))
@@ -6,116 +6,233 @@ Downloads and processes maps.
 
 import os
 import shutil
+import time
+import zipfile
 
 from data import Configuration
 from data.Database import Database
+from data.LibraryIndex import LibraryIndex
+from data.MapStates import DEFAULT_MAX_ATTEMPTS, STAGE_DOWNLOADED, STAGE_GENERATED, STAGE_PROCESSED, MapStates, getMapKey
 from data.Song import Song
-from process.ProcessMap import processMaps
+from process.ProcessMap import BASE_PATH, processMaps
 from process.http import BeatSage
 from process.http import BeatSaver
 from process.http import Generic
 from process.http import YouTube
-
-
-# Open the database.
-database = Database()
-baseDownloadsPath = os.path.realpath(os.path.join(__file__, "..", "..", "..", "maps", "Downloads"))
-coversDownloadsPath = os.path.join(baseDownloadsPath, "Covers")
-beatSageDownloadsPath = os.path.join(baseDownloadsPath, "BeatSage")
-beatSageRawDownloadsPath = os.path.join(baseDownloadsPath, "BeatSage", "Raw")
-if not os.path.exists(coversDownloadsPath):
-    os.makedirs(coversDownloadsPath)
-if not os.path.exists(beatSageRawDownloadsPath):
-    os.makedirs(beatSageRawDownloadsPath)
-
-# Get the songs to process.
-beatSaverEnabled = Configuration.sourceEnabled("BeatSaver")
-beatSageEnabled = Configuration.sourceEnabled("BeatSage")
-songsToProcess = []
-if beatSaverEnabled:
-    for songData in database.execute("SELECT Artist,SongName,SongSubName,Validated,BeatSaverKey,SubjectiveQualityRating FROM BeatSaverMaps WHERE Include = 1;"):
-        # Store the base data.
-        song = Song()
-        song.mapSource = "BeatSaver"
-        song.artist = songData[0]
-        song.songName = songData[1]
-        song.songSubName = songData[2]
-        song.validated = (songData[3] == 1)
-        song.beatSaverKey = songData[4]
-        song.subjectiveQualityRating = songData[5]
-        song.mapDownloadPath = os.path.join(baseDownloadsPath, "BeatSaver", song.getSongName(True) + " [BeatSaver " + song.beatSaverKey + "].zip")
-
-        # Add the song.
-        songsToProcess.append(song)
-if beatSageEnabled:
-    for songData in database.execute("SELECT Artist,SongName,SongSubName,Validated,SongURL,CoverURL,SubjectiveQualityRating FROM BeatSageMaps WHERE Include = 1;"):
-        # Store the base data.
-        song = Song()
-        song.mapSource = "BeatSage"
-        song.artist = songData[0]
-        song.songName = songData[1]
-        song.songSubName = songData[2]
-        song.validated = (songData[3] == 1)
-        song.songUrl = songData[4]
-        song.coverUrl = songData[5]
-        song.subjectiveQualityRating = songData[6]
-        song.mapDownloadPath = os.path.join(baseDownloadsPath, "BeatSage", song.getSongName(True))
-
-        # Add the song.
-        songsToProcess.append(song)
-
-# Download the missing maps from BeatSaver.
-if beatSaverEnabled:
-    print("Downloading missing maps from BeatSaver.")
+from typing import Dict
+
+DOWNLOADS_PATH = os.path.join(BASE_PATH, "Downloads")
+
+
+def downloadAndProcessMaps(database: Database, baseDownloadsPath: str = DOWNLOADS_PATH, mapsPath: str = BASE_PATH) -> Dict[str, float]:
+    """Downloads and processes the maps that are included in the database.
+
+    :param database: Database of the maps.
+    :param baseDownloadsPath: Directory to store the downloads in.
+    :param mapsPath: Directory to store the processed maps in.
+    :return: The time in seconds of each stage of the run.
+    """
+
+    # Prepare the directories.
+    stageTimes = {}
+    stageStartTime = time.perf_counter()
+    coversDownloadsPath = os.path.join(baseDownloadsPath, "Covers")
+    beatSageDownloadsPath = os.path.join(baseDownloadsPath, "BeatSage")
+    beatSageRawDownloadsPath = os.path.join(baseDownloadsPath, "BeatSage", "Raw")
+    if not os.path.exists(coversDownloadsPath):
+        os.makedirs(coversDownloadsPath)
+    if not os.path.exists(beatSageRawDownloadsPath):
+        os.makedirs(beatSageRawDownloadsPath)
+
+    # Get the songs to process.
+    beatSaverEnabled = Configuration.sourceEnabled("BeatSaver")
+    beatSageEnabled = Configuration.sourceEnabled("BeatSage")
+    songsToProcess = []
+    if beatSaverEnabled:
+        for songData in database.iterate("SELECT Artist,SongName,SongSubName,Validated,BeatSaverKey,SubjectiveQualityRating FROM BeatSaverMaps WHERE Include = 1;"):
+            # Store the base data.
+            song = Song()
+            song.mapSource = "BeatSaver"
+            song.artist = songData[0]
+            song.songName = songData[1]
+            song.songSubName = songData[2]
+            song.validated = (songData[3] == 1)
+            song.beatSaverKey = songData[4]
+            song.subjectiveQualityRating = songData[5]
+            song.mapDownloadPath = os.path.join(baseDownloadsPath, "BeatSaver", song.getSongName(True) + " [BeatSaver " + song.beatSaverKey + "].zip")
+
+            # Add the song.
+            songsToProcess.append(song)
+    if beatSageEnabled:
+        for songData in database.iterate("SELECT Artist,SongName,SongSubName,Validated,SongURL,CoverURL,SubjectiveQualityRating FROM BeatSageMaps WHERE Include = 1;"):
+            # Store the base data.
+            song = Song()
+            song.mapSource = "BeatSage"
+            song.artist = songData[0]
+            song.songName = songData[1]
+            song.songSubName = songData[2]
+            song.validated = (songData[3] == 1)
+            song.songUrl = songData[4]
+            song.coverUrl = songData[5]
+            song.subjectiveQualityRating = songData[6]
+            song.mapDownloadPath = os.path.join(baseDownloadsPath, "BeatSage", song.getSongName(True))
+
+            # Add the song.
+            songsToProcess.append(song)
+    stageTimes["ReadSongs"] = time.perf_counter() - stageStartTime
+
+    # Skip the quarantined maps.
+    # Maps that fail are skipped for the rest of the run and keep their existing output.
+    mapStates = MapStates(database, Configuration.getConfiguration("MaxMapAttempts", DEFAULT_MAX_ATTEMPTS))
+    quarantinedMapKeys = mapStates.getQuarantinedMapKeys()
+    skippedSongs = []
     for song in songsToProcess:
-        if song.mapSource == "BeatSaver" and not os.path.exists(song.mapDownloadPath):
-            print("\tDownloading " + song.getSongName())
-            BeatSaver.downloadMap(song.beatSaverKey, song.mapDownloadPath)
-
-# Download the missing maps from Beat Sage.
-if beatSageEnabled:
-    print("Downloading missing maps from Beat Sage.")
+        mapKey = getMapKey(song)
+        if mapKey in quarantinedMapKeys.keys():
+            print("Skipping quarantined map " + song.getSongName() + " (" + str(quarantinedMapKeys[mapKey]) + ").")
+            skippedSongs.append(song)
+
+    def skipFailedSong(song: Song, stage: str, error: Exception) -> None:
+        """Stores the failure of a song and skips it for the rest of the run.
+        The existing output of the song is kept.
+
+        :param song: Song that failed.
+        :param stage: Stage that failed.
+        :param error: Error of the failure.
+        """
+
+        if mapStates.recordFailure(song, stage, error):
+            print("\tQuarantined " + song.getSongName() + " after " + str(mapStates.maxAttempts) + " failed attempts.")
+        skippedSongs.append(song)
+
+    # Download the missing maps from BeatSaver.
+    if beatSaverEnabled:
+        stageStartTime = time.perf_counter()
+        print("Downloading missing maps from BeatSaver.")
+        songsToDownload = []
+        skippedSongSet = set(skippedSongs)
+        for song in songsToProcess:
+            if song.mapSource == "BeatSaver" and song not in skippedSongSet and not os.path.exists(song.mapDownloadPath):
+                songsToDownload.append(song)
+        downloadUrls, failedLookups = BeatSaver.getDownloadUrls(songsToDownload, database)
+        for song in songsToDownload:
+            if song.beatSaverKey.lower() in failedLookups.keys():
+                print("\tFailed to get the download of " + song.getSongName() + " (" + str(failedLookups[song.beatSaverKey.lower()]) + ").")
+                skipFailedSong(song, STAGE_DOWNLOADED, failedLookups[song.beatSaverKey.lower()])
+        songsToDownload = [song for song in songsToDownload if song.beatSaverKey.lower() not in failedLookups.keys()]
+        failedDownloads = BeatSaver.downloadMaps(songsToDownload, Configuration.getConfiguration("BeatSaverDownloadWorkers", BeatSaver.DEFAULT_DOWNLOAD_WORKERS), downloadUrls)
+        for song in songsToDownload:
+            if song.mapDownloadPath in failedDownloads.keys():
+                skipFailedSong(song, STAGE_DOWNLOADED, failedDownloads[song.mapDownloadPath])
+        mapStates.setStages([song for song in songsToDownload if song.mapDownloadPath not in failedDownloads.keys()], STAGE_DOWNLOADED)
+
+        # Clear the cached download URLs of the failed downloads so they are requested again.
+        BeatSaver.clearDownloadUrls([song.beatSaverKey for song in songsToDownload if song.mapDownloadPath in failedDownloads.keys()], database)
+        stageTimes["BeatSaverDownloads"] = time.perf_counter() - stageStartTime
+
+    # Download the missing maps from Beat Sage.
+    if beatSageEnabled:
+        stageStartTime = time.perf_counter()
+        print("Downloading missing maps from Beat Sage.")
+        beatSageSongs = []
+        beatSageJobs = []
+        skippedSongSet = set(skippedSongs)
+        for song in songsToProcess:
+            if song.mapSource == "BeatSage" and song not in skippedSongSet:
+                songName = song.getSongName(True)
+                mapArchivePath = os.path.join(beatSageRawDownloadsPath, songName + ".zip")
+                if os.path.exists(song.mapDownloadPath) and not os.path.exists(mapArchivePath):
+                    # Clear the existing map if the download was deleted (rejected).
+                    shutil.rmtree(song.mapDownloadPath)
+
+                if not os.path.exists(os.path.join(song.mapDownloadPath, "Info.dat")):
+                    try:
+                        # Download the cover.
+                        print("\tDownloading " + song.getSongName())
+                        coverPathWithoutExtension = os.path.join(baseDownloadsPath, "Covers", songName)
+                        coverPath = None
+                        for existingFile in os.listdir(coversDownloadsPath):
+                            if existingFile.startswith(songName + ".") and not existingFile.endswith(Generic.PARTIAL_DOWNLOAD_EXTENSION):
+                                coverPath = os.path.join(baseDownloadsPath, "Covers", existingFile)
+                        if coverPath is None:
+                            print("\t\tDownloading the cover art.")
+                            coverPath = Generic.downloadImage(song.coverUrl, coverPathWithoutExtension)
+
+                        # Download the song.
+                        songPath = os.path.join(baseDownloadsPath, "Songs", songName + ".mp3")
+                        if not os.path.exists(songPath):
+                            print("\t\tDownloading the song file.")
+                            YouTube.downloadMp3(song.songUrl, songPath)
+                    except Exception as error:
+                        print("\t\tFailed to download " + song.getSongName() + " (" + str(error) + ").")
+                        skipFailedSong(song, STAGE_DOWNLOADED, error)
+                        continue
+                    mapStates.setStages([song], STAGE_DOWNLOADED)
+
+                    # Queue requesting the map.
+                    if not os.path.exists(mapArchivePath):
+                        beatSageJobs.append(BeatSage.BeatSageJob(songPath, coverPath, mapArchivePath))
+                    beatSageSongs.append((song, songPath, coverPath, mapArchivePath))
+
+        stageTimes["BeatSageDownloads"] = time.perf_counter() - stageStartTime
+
+        # Request the maps.
+        # The maps are generated by Beat Sage, so multiple maps are requested at once.
+        stageStartTime = time.perf_counter()
+        failedJobs = {}
+        if len(beatSageJobs) > 0:
+            print("\tRequesting " + str(len(beatSageJobs)) + " maps from Beat Sage.")
+            failedJobs = BeatSage.getBeatSageMaps(beatSageJobs, Configuration.getConfiguration("BeatSageConcurrentJobs", BeatSage.DEFAULT_CONCURRENT_JOBS))
+
+        stageTimes["BeatSageJobs"] = time.perf_counter() - stageStartTime
+
+        # Process the maps.
+        stageStartTime = time.perf_counter()
+        bpmAnalysisMode = Configuration.getConfiguration("BeatSageBpmAnalysis", "Full")
+        for song, songPath, coverPath, mapArchivePath in beatSageSongs:
+            if not os.path.exists(mapArchivePath):
+                print("\tSkipping " + song.getSongName() + " (Beat Sage map was not downloaded).")
+                skipFailedSong(song, STAGE_GENERATED, failedJobs.get(mapArchivePath, FileNotFoundError("Beat Sage map was not downloaded.")))
+                continue
+            print("\tProcessing Beat Sage map " + song.getSongName())
+            try:
+                BeatSage.processBeatSageMap(song, songPath, coverPath, mapArchivePath, song.mapDownloadPath, database, bpmAnalysisMode)
+            except Exception as error:
+                print("\t\tFailed to process Beat Sage map " + song.getSongName() + " (" + type(error).__name__ + ": " + str(error) + ").")
+                skipFailedSong(song, STAGE_GENERATED, error)
+                continue
+            mapStates.setStages([song], STAGE_GENERATED)
+        stageTimes["BeatSageProcessing"] = time.perf_counter() - stageStartTime
+
+    # Process the maps.
+    stageStartTime = time.perf_counter()
+    skippedSongSet = set(skippedSongs)
+    songsToProcess = [song for song in songsToProcess if song not in skippedSongSet]
+    if len(songsToProcess) == 1:
+        print("Processing 1 map.")
+    else:
+        print("Processing " + str(len(songsToProcess)) + " maps.")
+    failedMaps = processMaps(songsToProcess, Configuration.getConfiguration("ProcessingJobs", 1), excludedSongs=skippedSongs, mapsPath=mapsPath, libraryIndex=LibraryIndex(database))
     for song in songsToProcess:
-        if song.mapSource == "BeatSage":
-            songName = song.getSongName(True)
-            mapArchivePath = os.path.join(beatSageRawDownloadsPath, songName + ".zip")
-            if os.path.exists(song.mapDownloadPath) and not os.path.exists(mapArchivePath):
-                # Clear the existing map if the download was deleted (rejected).
-                shutil.rmtree(song.mapDownloadPath)
-
-            if not os.path.exists(os.path.join(song.mapDownloadPath, "Info.dat")):
-                # Download the cover.
-                print("\tDownloading " + song.getSongName())
-                coverPathWithoutExtension = os.path.join(baseDownloadsPath, "Covers", songName)
-                coverPath = None
-                for existingFile in os.listdir(coversDownloadsPath):
-                    if existingFile.startswith(songName + "."):
-                        coverPath = os.path.join(baseDownloadsPath, "Covers", existingFile)
-                if coverPath is None:
-                    print("\t\tDownloading the cover art.")
-                    coverPath = Generic.downloadImage(song.coverUrl, coverPathWithoutExtension)
-
-                # Download the song.
-                songPath = os.path.join(baseDownloadsPath, "Songs", songName + ".mp3")
-                if not os.path.exists(songPath):
-                    print("\t\tDownloading the song file.")
-                    YouTube.downloadMp3(song.songUrl, songPath)
-
-                # Request the map.
-                if not os.path.exists(mapArchivePath):
-                    print("\t\tRequesting the map from Beat Sage.")
-                    BeatSage.getBeatSageMap(songPath, coverPath, mapArchivePath)
-
-                # Process the map.
-                print("\t\tProcessing Beat Sage map.")
-                BeatSage.processBeatSageMap(song, songPath, coverPath, mapArchivePath, song.mapDownloadPath)
-
-# Process the maps.
-if len(songsToProcess) == 1:
-    print("Processing 1 map.")
-else:
-    print("Processing " + str(len(songsToProcess)) + " maps.")
-processMaps(songsToProcess)
-
-# Close the database.
-database.close()
\ No newline at end of file
+        if song.mapDownloadPath in failedMaps.keys():
+            error = failedMaps[song.mapDownloadPath]
+            if isinstance(error, zipfile.BadZipFile) and os.path.isfile(song.mapDownloadPath):
+                # Delete the corrupt download so that it is downloaded again.
+                print("\tDeleting the corrupt download of " + song.getSongName() + ".")
+                os.remove(song.mapDownloadPath)
+            skipFailedSong(song, STAGE_PROCESSED, error)
+    mapStates.setStages([song for song in songsToProcess if song.mapDownloadPath not in failedMaps.keys()], STAGE_PROCESSED)
+    stageTimes["ProcessMaps"] = time.perf_counter() - stageStartTime
+
+    # Print the times of the stages.
+    print("Stage times:")
+    for stageName, stageTime in stageTimes.items():
+        print("\t" + stageName + ": " + str(round(stageTime, 2)) + " seconds")
+    return stageTimes
+
+
+# The script is guarded since the map processing worker processes re-import the main module on Windows.
+if __name__ == "__main__":
+    database = Database()
+    downloadAndProcessMaps(database)
+    database.close()
\ No newline at end of file
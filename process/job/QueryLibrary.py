@@ -0,0 +1,97 @@
+"""
+TheNexusAvenger
+
+Queries the difficulties of the processed maps from the library index.
+The index is updated when maps are processed by DownloadAndProcessMaps.
+Example: python -m process.job.QueryLibrary --difficulty ExpertPlus --minimum-njs 20
+"""
+
+import argparse
+import json
+from data.Database import Database
+from data.LibraryIndex import DIFFICULTY_COLUMNS, LibraryIndex
+from typing import List, Tuple
+
+# Columns to show for each difficulty.
+DISPLAYED_COLUMNS = ["Characteristic", "DifficultyLabel", "NoteJumpSpeed", "ReactionTime", "Notes", "Requirements"]
+
+
+def getConditions(arguments: argparse.Namespace) -> Tuple[List[str], list]:
+    """Returns the SQL conditions of the filters in the arguments.
+
+    :param arguments: Parsed arguments.
+    :return: The conditions and the parameters of the conditions.
+    """
+
+    conditions = []
+    parameters = []
+    def addCondition(condition: str, value: any) -> None:
+        if value is not None:
+            conditions.append(condition)
+            parameters.append(value)
+    addCondition("MapKey LIKE ?", "%" + arguments.map + "%" if arguments.map is not None else None)
+    addCondition("MapSource = ?", arguments.source)
+    addCondition("Characteristic = ?", arguments.characteristic)
+    addCondition("Difficulty = ?", arguments.difficulty)
+    addCondition("NoteJumpSpeed >= ?", arguments.minimum_njs)
+    addCondition("NoteJumpSpeed <= ?", arguments.maximum_njs)
+    addCondition("ReactionTime >= ?", arguments.minimum_reaction_time)
+    addCondition("ReactionTime <= ?", arguments.maximum_reaction_time)
+    addCondition("Notes >= ?", arguments.minimum_notes)
+    addCondition("Notes <= ?", arguments.maximum_notes)
+    for requirement in arguments.requirement or []:
+        addCondition("Requirements LIKE ?", "%" + json.dumps(requirement) + "%")
+    return conditions, parameters
+
+
+if __name__ == "__main__":
+    # Parse the arguments.
+    parser = argparse.ArgumentParser(description="Queries the difficulties of the processed maps.")
+    parser.add_argument("--map", default=None, help="Text that the map key (such as \"Maps/Artist - Song [BeatSaver 1a2b]\") contains.")
+    parser.add_argument("--source", default=None, help="Source of the maps (BeatSaver or BeatSage).")
+    parser.add_argument("--characteristic", default=None, help="Characteristic of the difficulties (such as Standard or OneSaber).")
+    parser.add_argument("--difficulty", default=None, help="Difficulty of the difficulties (Easy, Normal, Hard, Expert, or ExpertPlus).")
+    parser.add_argument("--minimum-njs", type=float, default=None, help="Minimum Note Jump Speed.")
+    parser.add_argument("--maximum-njs", type=float, default=None, help="Maximum Note Jump Speed.")
+    parser.add_argument("--minimum-reaction-time", type=float, default=None, help="Minimum reaction time in milliseconds.")
+    parser.add_argument("--maximum-reaction-time", type=float, default=None, help="Maximum reaction time in milliseconds.")
+    parser.add_argument("--minimum-notes", type=int, default=None, help="Minimum amount of notes.")
+    parser.add_argument("--maximum-notes", type=int, default=None, help="Maximum amount of notes.")
+    parser.add_argument("--requirement", action="append", default=None, help="Mod requirement of the difficulties (such as \"Noodle Extensions\"). Can be used more than once.")
+    parser.add_argument("--sort", default=None, choices=DIFFICULTY_COLUMNS, help="Column to sort the difficulties by.")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum amount of difficulties to list.")
+    parser.add_argument("--count", action="store_true", help="Only print the amount of difficulties and maps.")
+    parser.add_argument("--json", action="store_true", help="Print the difficulties as JSON.")
+    arguments = parser.parse_args()
+
+    # Query the difficulties.
+    database = Database()
+    libraryIndex = LibraryIndex(database)
+    conditions, parameters = getConditions(arguments)
+    if arguments.count:
+        counts = libraryIndex.countDifficulties(conditions, parameters)
+        print(str(counts["Difficulties"]) + " difficulties in " + str(counts["Maps"]) + " maps.")
+        database.close()
+        exit(0)
+    difficulties = libraryIndex.queryDifficulties(conditions, parameters, arguments.sort, arguments.limit)
+    database.close()
+
+    # Print the difficulties.
+    if arguments.json:
+        print(json.dumps(difficulties, indent=4))
+        exit(0)
+    lastMapKey = None
+    for difficulty in difficulties:
+        if difficulty["MapKey"] != lastMapKey:
+            print(difficulty["MapKey"])
+            lastMapKey = difficulty["MapKey"]
+        values = []
+        for column in DISPLAYED_COLUMNS:
+            value = difficulty[column]
+            if isinstance(value, float):
+                value = round(value, 2)
+            elif isinstance(value, list):
+                value = ", ".join(value)
+            values.append(column + ": " + str(value))
+        print("\t" + ", ".join(values))
+    print(str(len(difficulties)) + " difficulties.")
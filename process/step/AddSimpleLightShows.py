@@ -4,8 +4,12 @@ TheNexusAvenger
 Adds simple light shows if there is no events.
 """
 
+import numpy
 from data.MapFileSet import MapFileSet
 
+# Distance in beats of the notes that count towards the laser speed of a note.
+LASER_SPEED_WINDOW = 2
+
 
 def addSimpleLightShows(mapFiles: MapFileSet) -> None:
     """Clamps the speed of maps.
@@ -24,152 +28,121 @@ def addSimpleLightShows(mapFiles: MapFileSet) -> None:
         if len(mapData["_events"]) != 0:
             continue
 
-        # Process the notes.
+        # Get the color notes.
         print("\t\tAdding a simple light show to " + mapDataName)
-        processedNotes = []
-        lastMainLightsRed = False
-        eventGroups = []
-        for note in mapData["_notes"]:
-            # Ignore the note if it was processed.
-            if note in processedNotes or not (note["_type"] == 0 or note["_type"] == 1):
-                continue
-
-            # Determine the notes at the time.
-            notesAtTime = []
-            for otherNote in mapData["_notes"]:
-                if note["_time"] == otherNote["_time"] and (otherNote["_type"] == 0 or otherNote["_type"] == 1):
-                    notesAtTime.append(otherNote)
-
-            # Determine the types for each column.
-            totalTypes = []
-            typesPerColumn = [[], [], [], []]
-            for noteAtTime in notesAtTime:
-                column = typesPerColumn[noteAtTime["_lineIndex"]]
-                if noteAtTime["_type"] not in column:
-                    column.append(noteAtTime["_type"])
-                if noteAtTime["_type"] not in totalTypes:
-                    totalTypes.append(noteAtTime["_type"])
-
-            # Determine the first column with notes.
-            firstColumn = 0
-            columnsWithNotes = []
-            for i in range(0, len(typesPerColumn)):
-                if len(typesPerColumn[i]) != 0:
-                    firstColumn = i
-                    break
-            for column in typesPerColumn:
-                if len(column) != 0:
-                    columnsWithNotes.append(column)
-
-            # Add the lights.
-            timeEvents = []
-            eventGroups.append(timeEvents)
-            eventTime = note["_time"]
-            if len(totalTypes) == 1:
-                noteType = totalTypes[0] == 0 and 7 or 3
-                if len(columnsWithNotes) == 1:
-                    if firstColumn == 0 or firstColumn == 1:
-                        timeEvents.append({
-                            "_time": eventTime,
-                            "_type": 2,
-                            "_value": noteType,
-                        })
-                    else:
-                        timeEvents.append({
-                            "_time": eventTime,
-                            "_type": 3,
-                            "_value": noteType,
-                        })
-                else:
-                    timeEvents.append({
-                        "_time": eventTime,
-                        "_type": 0,
-                        "_value": noteType,
-                    })
-                    timeEvents.append({
-                        "_time": eventTime,
-                        "_type": 1,
-                        "_value": noteType,
-                    })
-                    timeEvents.append({
-                        "_time": eventTime,
-                        "_type": 2,
-                        "_value": noteType,
-                    })
-                    timeEvents.append({
-                        "_time": eventTime,
-                        "_type": 3,
-                        "_value": noteType,
-                    })
-                    lastMainLightsRed = (totalTypes[0] == 0)
-            else:
-                # Get the values of the notes.
-                backLaserValue = (lastMainLightsRed and 7 or 3)
-                lastMainLightsRed = not lastMainLightsRed
-                leftValue = 0
-                rightValue = 0
-                if len(columnsWithNotes) == 1:
-                    leftValue = (lastMainLightsRed and 7 or 3)
-                    rightValue = (lastMainLightsRed and 3 or 7)
-                else:
-                    if 0 in columnsWithNotes[0] and 1 in columnsWithNotes[len(columnsWithNotes) - 1]:
-                        leftValue = 7
-                        rightValue = 3
-                    elif 1 in columnsWithNotes[0] and 0 in columnsWithNotes[len(columnsWithNotes) - 1]:
-                        leftValue = 3
-                        rightValue = 7
-
-                # Get the events.
-                timeEvents.append({
-                    "_time": eventTime,
-                    "_type": 0,
-                    "_value": backLaserValue,
-                })
-                timeEvents.append({
-                    "_time": eventTime,
-                    "_type": 1,
-                    "_value": backLaserValue,
-                })
-                timeEvents.append({
-                    "_time": eventTime,
-                    "_type": 2,
-                    "_value": leftValue,
-                })
-                timeEvents.append({
-                    "_time": eventTime,
-                    "_type": 3,
-                    "_value": rightValue,
-                })
-
-        # Add the laser speed events.
+        notes = mapFiles.getDifficultyColumns(mapDataName).notes
+        noteTypes = notes.getColumn("type")
+        colorNoteIndices = numpy.flatnonzero((noteTypes == 0) | (noteTypes == 1))
+        mapFiles.setDifficultyFileModified(mapDataName)
+        if len(colorNoteIndices) == 0:
+            mapData["_events"] = []
+            continue
+        noteTimeValues = notes.getValues("time")
+        colorNoteTimeValues = [noteTimeValues[i] for i in colorNoteIndices.tolist()]
+        colorNoteTimes = numpy.array(colorNoteTimeValues, dtype=numpy.float64)
+        colorNoteTypes = noteTypes[colorNoteIndices].astype(numpy.int64)
+
+        # Get the columns of the notes.
+        # The line indices are checked the same way as indexing a list of the 4 columns with them.
+        lineIndexValues = notes.getValues("lineIndex")
+        colorNoteLineIndexValues = [lineIndexValues[i] for i in colorNoteIndices.tolist()]
+        if any(not isinstance(lineIndex, int) for lineIndex in colorNoteLineIndexValues):
+            raise TypeError("Note line indices must be integers for AddSimpleLightShows in " + mapDataName)
+        colorNoteLineIndices = numpy.array(colorNoteLineIndexValues, dtype=numpy.int64)
+        if numpy.any((colorNoteLineIndices < -4) | (colorNoteLineIndices > 3)):
+            raise IndexError("Note line index out of range for AddSimpleLightShows in " + mapDataName)
+        colorNoteColumns = colorNoteLineIndices % 4
+
+        # Group the notes by time and determine the types in each column.
+        # Each note still creates its own event group, so notes at the same time create repeated groups.
+        groupTimes, noteGroups = numpy.unique(colorNoteTimes, return_inverse=True)
+        noteGroups = noteGroups.reshape(-1)
+        groupTypesPerColumn = numpy.zeros((len(groupTimes), 4, 2), dtype=bool)
+        groupTypesPerColumn[noteGroups, colorNoteColumns, colorNoteTypes] = True
+        groupTypes = groupTypesPerColumn.any(axis=1)
+        groupColumns = groupTypesPerColumn.any(axis=2)
+        groupIndices = numpy.arange(len(groupTimes))
+        groupFirstColumns = groupColumns.argmax(axis=1)
+        groupLastColumns = 3 - groupColumns[:, ::-1].argmax(axis=1)
+        groupFirstColumnTypes = groupTypesPerColumn[groupIndices, groupFirstColumns]
+        groupLastColumnTypes = groupTypesPerColumn[groupIndices, groupLastColumns]
+
+        # Determine the groups of the notes.
+        isSingleType = (groupTypes.sum(axis=1) == 1)[noteGroups]
+        isSingleColumn = (groupColumns.sum(axis=1) == 1)[noteGroups]
+        isRed = groupTypes[noteGroups, 0]
+        firstColumns = groupFirstColumns[noteGroups]
+        firstColumnTypes = groupFirstColumnTypes[noteGroups]
+        lastColumnTypes = groupLastColumnTypes[noteGroups]
+
+        # Determine if the main lights were last red before each note.
+        # Notes with one type in multiple columns set the state, and notes with multiple types toggle it.
+        noteIndices = numpy.arange(len(colorNoteIndices))
+        setsMainLights = isSingleType & ~isSingleColumn
+        togglesMainLights = ~isSingleType
+        lastSetIndices = numpy.concatenate([[-1], numpy.maximum.accumulate(numpy.where(setsMainLights, noteIndices, -1))[:-1]])
+        totalToggles = numpy.cumsum(togglesMainLights)
+        togglesBefore = totalToggles - togglesMainLights
+        togglesBeforeLastSet = numpy.where(lastSetIndices >= 0, totalToggles[numpy.maximum(lastSetIndices, 0)], 0)
+        lastSetRed = numpy.where(lastSetIndices >= 0, isRed[numpy.maximum(lastSetIndices, 0)], False)
+        lastMainLightsRed = lastSetRed ^ ((togglesBefore - togglesBeforeLastSet) % 2 == 1)
+        toggledMainLightsRed = ~lastMainLightsRed
+
+        # Determine the values of the light events.
+        noteTypeValues = numpy.where(isRed, 7, 3)
+        backLaserValues = numpy.where(lastMainLightsRed, 7, 3)
+        leftValues = numpy.where(isSingleColumn, numpy.where(toggledMainLightsRed, 7, 3), numpy.where(firstColumnTypes[:, 0] & lastColumnTypes[:, 1], 7, numpy.where(firstColumnTypes[:, 1] & lastColumnTypes[:, 0], 3, 0)))
+        rightValues = numpy.where(isSingleColumn, numpy.where(toggledMainLightsRed, 3, 7), numpy.where(firstColumnTypes[:, 0] & lastColumnTypes[:, 1], 3, numpy.where(firstColumnTypes[:, 1] & lastColumnTypes[:, 0], 7, 0)))
+        eventValues = numpy.where(isSingleType[:, None], noteTypeValues[:, None], numpy.stack([backLaserValues, backLaserValues, leftValues, rightValues], axis=1))
+        singleEventTypes = numpy.where(firstColumns <= 1, 2, 3)
+        hasSingleEvent = isSingleType & isSingleColumn
+
+        # Determine the total notes that are near each group.
+        # The window is moved over the sorted note times with two pointers. The differences are compared
+        # instead of the times so the floating point rounding is the same as comparing the notes individually.
+        sortedTimes = numpy.sort(colorNoteTimes).tolist()
+        windowStart = 0
+        windowEnd = 0
+        nearNotes = []
+        for groupTime in groupTimes.tolist():
+            while windowStart < len(sortedTimes) and sortedTimes[windowStart] - groupTime < -LASER_SPEED_WINDOW:
+                windowStart += 1
+            while windowEnd < len(sortedTimes) and sortedTimes[windowEnd] - groupTime <= LASER_SPEED_WINDOW:
+                windowEnd += 1
+            nearNotes.append(windowEnd - windowStart)
+        laserSpeeds = numpy.clip(numpy.array(nearNotes, dtype=numpy.int64), 1, 8)[noteGroups]
+        laserSpeedChanged = (laserSpeeds != numpy.concatenate([[0], laserSpeeds[:-1]]))
+
+        # Create the events.
         events = []
-        currentLaserSpeed = 0
-        for eventGroup in eventGroups:
-            # Get the total events that are near.
-            eventTime = eventGroup[0]["_time"]
-            totalNearEvents = 0
-            for otherEventGroup in eventGroups:
-                otherEventTime = otherEventGroup[0]["_time"]
-                eventTimeDifference = otherEventTime - eventTime
-                if eventTimeDifference >= -2 and eventTimeDifference <= 2:
-                    totalNearEvents += 1
-
-            # Set the laser speeed.
-            newLaserSpeed = max(1, min(round(totalNearEvents), 8))
-            if currentLaserSpeed != newLaserSpeed:
-                currentLaserSpeed = newLaserSpeed
+        for eventTime, laserSpeed, changedLaserSpeed, singleEvent, singleEventType, noteEventValues in zip(colorNoteTimeValues, laserSpeeds.tolist(), laserSpeedChanged.tolist(), hasSingleEvent.tolist(), singleEventTypes.tolist(), eventValues.tolist()):
+            # Set the laser speed.
+            if changedLaserSpeed:
                 events.append({
                     "_time": eventTime,
                     "_type": 12,
-                    "_value": currentLaserSpeed,
+                    "_value": laserSpeed,
                 })
                 events.append({
                     "_time": eventTime,
                     "_type": 13,
-                    "_value": currentLaserSpeed,
+                    "_value": laserSpeed,
                 })
-            for event in eventGroup:
-                events.append(event)
+
+            # Add the lights.
+            if singleEvent:
+                events.append({
+                    "_time": eventTime,
+                    "_type": singleEventType,
+                    "_value": noteEventValues[0],
+                })
+            else:
+                for eventType in range(4):
+                    events.append({
+                        "_time": eventTime,
+                        "_type": eventType,
+                        "_value": noteEventValues[eventType],
+                    })
 
         # Save the events.
         mapData["_events"] = events
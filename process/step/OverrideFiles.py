@@ -4,10 +4,25 @@ TheNexusAvenger
 Overrides map files.
 """
 
-import json
 import os
+from data import JsonCodec
+from data.FileHandle import PathFileHandle
 from data.Map import Map
 from data.MapFileSet import MapFileSet
+from data.Song import Song
+
+
+def getOverridesDirectory(song: Song) -> str:
+    """Returns the directory of the override files for a song.
+
+    :param song: Song to get the overrides directory of.
+    :return: The directory of the override files. It may not exist.
+    """
+
+    mapDownloadFile = os.path.basename(song.mapDownloadPath)
+    if mapDownloadFile.endswith(".zip"):
+        mapDownloadFile = mapDownloadFile.replace(".zip", "")
+    return os.path.realpath(os.path.join(__file__, "..", "..", "..", "maps", "Overrides", mapDownloadFile))
 
 
 def overrideFiles(mapFiles: MapFileSet) -> None:
@@ -17,10 +32,7 @@ def overrideFiles(mapFiles: MapFileSet) -> None:
     """
 
     # Return if there are no overrides.
-    mapDownloadFile = os.path.basename(mapFiles.song.mapDownloadPath)
-    if mapDownloadFile.endswith(".zip"):
-        mapDownloadFile = mapDownloadFile.replace(".zip", "")
-    overridesDirectory = os.path.realpath(os.path.join(__file__, "..", "..", "..", "maps", "Overrides", mapDownloadFile))
+    overridesDirectory = getOverridesDirectory(mapFiles.song)
     if not os.path.exists(overridesDirectory):
         return
 
@@ -36,11 +48,12 @@ def overrideFiles(mapFiles: MapFileSet) -> None:
         if fileName.lower() == "info.dat":
             print("\t\tOverriding info.dat file.")
             with open(os.path.join(overridesDirectory, fileName), encoding="utf8") as file:
-                mapFiles.map = Map(json.loads(file.read()))
+                mapFiles.map = Map(JsonCodec.loads(file.read()))
         elif fileName in mapFiles.difficultyFiles.keys():
             print("\t\tOverriding difficulty file " + fileName)
             with open(os.path.join(overridesDirectory, fileName), encoding="utf8") as file:
-                mapFiles.difficultyFiles[fileName] = json.loads(file.read())
+                mapFiles.difficultyFiles[fileName] = JsonCodec.loads(file.read())
+            mapFiles.setDifficultyFileModified(fileName)
         else:
             isNewMapFile = False
             for mapSet in mapFiles.map.difficultyBeatmapSets:
@@ -52,8 +65,8 @@ def overrideFiles(mapFiles: MapFileSet) -> None:
             if isNewMapFile:
                 print("\t\tAdding difficulty file " + fileName)
                 with open(os.path.join(overridesDirectory, fileName), encoding="utf8") as file:
-                    mapFiles.difficultyFiles[fileName] = json.loads(file.read())
+                    mapFiles.difficultyFiles[fileName] = JsonCodec.loads(file.read())
+                mapFiles.setDifficultyFileModified(fileName)
             else:
                 print("\t\tOverriding other file " + fileName)
-                with open(os.path.join(overridesDirectory, fileName), "rb") as file:
-                    mapFiles.otherFiles[fileName] = file.read()
+                mapFiles.otherFiles[fileName] = PathFileHandle(os.path.join(overridesDirectory, fileName))
@@ -5,12 +5,28 @@ Replaces the song Covers.
 """
 
 import os
+from data.FileHandle import PathFileHandle
 from data.MapFileSet import MapFileSet
+from typing import Optional
 
 COVERS_DIRECTORY = os.path.realpath(__file__ + "/../../../maps/Covers")
 KNOWN_EXTENSIONS = ["png", "jpg", "jpeg"]
 
 
+def getSongCover(songName: str) -> Optional[str]:
+    """Returns the replacement cover for a song.
+
+    :param songName: File-escaped name of the song.
+    :return: The path of the replacement cover, or None if there is no replacement.
+    """
+
+    for extension in KNOWN_EXTENSIONS:
+        songCover = os.path.join(COVERS_DIRECTORY, songName + "." + extension)
+        if os.path.exists(songCover):
+            return songCover
+    return None
+
+
 def setSongCover(mapFiles: MapFileSet) -> None:
     """Replaces the song cover of a map.
 
@@ -18,17 +34,12 @@ def setSongCover(mapFiles: MapFileSet) -> None:
     """
 
     # Get the cover.
-    songCover = None
-    extension = None
-    for newExtension in KNOWN_EXTENSIONS:
-        newSongCover = os.path.join(COVERS_DIRECTORY, mapFiles.getSongName(True) + "." + newExtension)
-        if os.path.exists(newSongCover):
-            songCover = newSongCover
-            extension = newExtension
-            break
+    songCover = getSongCover(mapFiles.getSongName(True))
 
     # Change the cover.
     if songCover:
+        extension = os.path.splitext(songCover)[1][1:]
+
         # Remove the existing file.
         # A loop is done since the casing of files can be different on Windows.
         print("\t\tReplacing album cover.")
@@ -40,5 +51,4 @@ def setSongCover(mapFiles: MapFileSet) -> None:
 
         # Set the new file.
         mapFiles.map.setCoverImageFilename("cover." + extension)
-        with open(songCover, "rb") as file:
-            mapFiles.otherFiles["cover." + extension] = file.read()
\ No newline at end of file
+        mapFiles.otherFiles["cover." + extension] = PathFileHandle(songCover)
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+TheNexusAvenger
+
+Stores the configuration of the tests in a temporary directory instead of the repository.
+"""
+
+import os
+import tempfile
+
+# The configuration is created when it is first imported, so the location is set before the tests are imported.
+os.environ["LIBRARY_MANAGER_CONFIGURATION"] = os.path.join(tempfile.mkdtemp(), "configuration.json")
@@ -0,0 +1,318 @@
+"""
+TheNexusAvenger
+
+Tests that AddSimpleLightShows creates the same events as the original implementation.
+"""
+
+import contextlib
+import copy
+import io
+import pytest
+import random
+from data.MapFileSet import MapFileSet
+from process.step.AddSimpleLightShows import addSimpleLightShows
+from typing import List
+
+
+def getReferenceEvents(notes: List[dict]) -> List[dict]:
+    """Returns the events of a light show using the original implementation of AddSimpleLightShows.
+    Each note compares its time with every other note, so this is only used for the tests.
+
+    :param notes: Notes of the difficulty.
+    :return: The events of the light show.
+    """
+
+    # Process the notes.
+    processedNotes = []
+    lastMainLightsRed = False
+    eventGroups = []
+    for note in notes:
+        # Ignore the note if it was processed.
+        if note in processedNotes or not (note["_type"] == 0 or note["_type"] == 1):
+            continue
+
+        # Determine the notes at the time.
+        notesAtTime = []
+        for otherNote in notes:
+            if note["_time"] == otherNote["_time"] and (otherNote["_type"] == 0 or otherNote["_type"] == 1):
+                notesAtTime.append(otherNote)
+
+        # Determine the types for each column.
+        totalTypes = []
+        typesPerColumn = [[], [], [], []]
+        for noteAtTime in notesAtTime:
+            column = typesPerColumn[noteAtTime["_lineIndex"]]
+            if noteAtTime["_type"] not in column:
+                column.append(noteAtTime["_type"])
+            if noteAtTime["_type"] not in totalTypes:
+                totalTypes.append(noteAtTime["_type"])
+
+        # Determine the first column with notes.
+        firstColumn = 0
+        columnsWithNotes = []
+        for i in range(0, len(typesPerColumn)):
+            if len(typesPerColumn[i]) != 0:
+                firstColumn = i
+                break
+        for column in typesPerColumn:
+            if len(column) != 0:
+                columnsWithNotes.append(column)
+
+        # Add the lights.
+        timeEvents = []
+        eventGroups.append(timeEvents)
+        eventTime = note["_time"]
+        if len(totalTypes) == 1:
+            noteType = totalTypes[0] == 0 and 7 or 3
+            if len(columnsWithNotes) == 1:
+                if firstColumn == 0 or firstColumn == 1:
+                    timeEvents.append({
+                        "_time": eventTime,
+                        "_type": 2,
+                        "_value": noteType,
+                    })
+                else:
+                    timeEvents.append({
+                        "_time": eventTime,
+                        "_type": 3,
+                        "_value": noteType,
+                    })
+            else:
+                timeEvents.append({
+                    "_time": eventTime,
+                    "_type": 0,
+                    "_value": noteType,
+                })
+                timeEvents.append({
+                    "_time": eventTime,
+                    "_type": 1,
+                    "_value": noteType,
+                })
+                timeEvents.append({
+                    "_time": eventTime,
+                    "_type": 2,
+                    "_value": noteType,
+                })
+                timeEvents.append({
+                    "_time": eventTime,
+                    "_type": 3,
+                    "_value": noteType,
+                })
+                lastMainLightsRed = (totalTypes[0] == 0)
+        else:
+            # Get the values of the notes.
+            backLaserValue = (lastMainLightsRed and 7 or 3)
+            lastMainLightsRed = not lastMainLightsRed
+            leftValue = 0
+            rightValue = 0
+            if len(columnsWithNotes) == 1:
+                leftValue = (lastMainLightsRed and 7 or 3)
+                rightValue = (lastMainLightsRed and 3 or 7)
+            else:
+                if 0 in columnsWithNotes[0] and 1 in columnsWithNotes[len(columnsWithNotes) - 1]:
+                    leftValue = 7
+                    rightValue = 3
+                elif 1 in columnsWithNotes[0] and 0 in columnsWithNotes[len(columnsWithNotes) - 1]:
+                    leftValue = 3
+                    rightValue = 7
+
+            # Get the events.
+            timeEvents.append({
+                "_time": eventTime,
+                "_type": 0,
+                "_value": backLaserValue,
+            })
+            timeEvents.append({
+                "_time": eventTime,
+                "_type": 1,
+                "_value": backLaserValue,
+            })
+            timeEvents.append({
+                "_time": eventTime,
+                "_type": 2,
+                "_value": leftValue,
+            })
+            timeEvents.append({
+                "_time": eventTime,
+                "_type": 3,
+                "_value": rightValue,
+            })
+
+    # Add the laser speed events.
+    events = []
+    currentLaserSpeed = 0
+    for eventGroup in eventGroups:
+        # Get the total events that are near.
+        eventTime = eventGroup[0]["_time"]
+        totalNearEvents = 0
+        for otherEventGroup in eventGroups:
+            otherEventTime = otherEventGroup[0]["_time"]
+            eventTimeDifference = otherEventTime - eventTime
+            if eventTimeDifference >= -2 and eventTimeDifference <= 2:
+                totalNearEvents += 1
+
+        # Set the laser speeed.
+        newLaserSpeed = max(1, min(round(totalNearEvents), 8))
+        if currentLaserSpeed != newLaserSpeed:
+            currentLaserSpeed = newLaserSpeed
+            events.append({
+                "_time": eventTime,
+                "_type": 12,
+                "_value": currentLaserSpeed,
+            })
+            events.append({
+                "_time": eventTime,
+                "_type": 13,
+                "_value": currentLaserSpeed,
+            })
+        for event in eventGroup:
+            events.append(event)
+
+    return events
+
+
+def createNote(time: float, lineIndex: int, noteType: int) -> dict:
+    """Creates a note in the V2 format.
+
+    :param time: Time of the note in beats.
+    :param lineIndex: Column of the note.
+    :param noteType: Type of the note (0 for red, 1 for blue, 3 for bombs).
+    :return: The note.
+    """
+
+    return {
+        "_time": time,
+        "_lineIndex": lineIndex,
+        "_lineLayer": 0,
+        "_type": noteType,
+        "_cutDirection": 8,
+    }
+
+
+def getEvents(notes: List[dict]) -> List[dict]:
+    """Returns the events that AddSimpleLightShows creates for a difficulty.
+
+    :param notes: Notes of the difficulty.
+    :return: The events of the light show.
+    """
+
+    mapFiles = MapFileSet()
+    mapFiles.difficultyFiles = {"ExpertStandard.dat": {"_version": "2.0.0", "_notes": copy.deepcopy(notes), "_events": [], "_obstacles": []}}
+    with contextlib.redirect_stdout(io.StringIO()):
+        addSimpleLightShows(mapFiles)
+    assert "ExpertStandard.dat" in mapFiles.modifiedDifficultyFiles
+    return mapFiles.difficultyFiles["ExpertStandard.dat"]["_events"]
+
+
+def assertSameEvents(notes: List[dict]) -> None:
+    """Asserts that the events are the same as the original implementation, including the types of the times.
+
+    :param notes: Notes of the difficulty.
+    """
+
+    events = getEvents(notes)
+    referenceEvents = getReferenceEvents(copy.deepcopy(notes))
+    assert events == referenceEvents
+    assert [type(event["_time"]) for event in events] == [type(event["_time"]) for event in referenceEvents]
+
+
+def test_sharedNoteTimes() -> None:
+    assertSameEvents([
+        createNote(1, 0, 0),
+        createNote(1, 3, 0),
+        createNote(2, 1, 0),
+        createNote(2, 2, 1),
+        createNote(3, 1, 1),
+        createNote(3, 1, 0),
+        createNote(4, 0, 1),
+        createNote(4, 1, 1),
+        createNote(4, 2, 0),
+        createNote(4, 3, 0),
+        createNote(5, 2, 1),
+        createNote(5, 0, 0),
+        createNote(6, 2, 0),
+        createNote(6, 2, 0),
+    ])
+
+
+def test_bombs() -> None:
+    assertSameEvents([
+        createNote(1, 0, 3),
+        createNote(1, 1, 0),
+        createNote(2, 3, 3),
+        createNote(2.5, 2, 1),
+        createNote(2.5, 0, 3),
+        createNote(6, 1, 3),
+    ])
+    assert getEvents([createNote(1, 0, 3), createNote(2, 1, 3)]) == []
+
+
+def test_intAndFloatTimes() -> None:
+    assertSameEvents([
+        createNote(1, 0, 0),
+        createNote(1.0, 3, 1),
+        createNote(1.5, 1, 0),
+        createNote(3, 2, 1),
+        createNote(3.0, 2, 1),
+        createNote(1 / 3, 0, 1),
+        createNote(2 + 1 / 3, 1, 0),
+        createNote(4.0000000001, 3, 0),
+    ])
+
+
+def test_unsortedNotes() -> None:
+    assertSameEvents([
+        createNote(8, 0, 0),
+        createNote(2, 3, 1),
+        createNote(5, 1, 0),
+        createNote(2, 0, 0),
+        createNote(0.5, 2, 1),
+        createNote(8, 1, 1),
+        createNote(3, 3, 0),
+    ])
+
+
+def test_lineIndexEdges() -> None:
+    assertSameEvents([
+        createNote(1, 0, 0),
+        createNote(1, 3, 1),
+        createNote(2, -1, 0),
+        createNote(2, -4, 1),
+        createNote(3, -2, 1),
+        createNote(4, 3, 0),
+        createNote(4, -1, 0),
+    ])
+    for lineIndex in [4, -5]:
+        with pytest.raises(IndexError):
+            getReferenceEvents([createNote(1, lineIndex, 0)])
+        with pytest.raises(IndexError):
+            getEvents([createNote(1, lineIndex, 0)])
+    for lineIndex in [1.5, 1.0, "1", None]:
+        with pytest.raises(TypeError):
+            getReferenceEvents([createNote(1, lineIndex, 0)])
+        with pytest.raises(TypeError):
+            getEvents([createNote(1, lineIndex, 0)])
+
+
+def test_existingEvents() -> None:
+    mapFiles = MapFileSet()
+    events = [{"_time": 1, "_type": 0, "_value": 1}]
+    mapFiles.difficultyFiles = {"ExpertStandard.dat": {"_version": "2.0.0", "_notes": [createNote(1, 0, 0)], "_events": events, "_obstacles": []}}
+    addSimpleLightShows(mapFiles)
+    assert mapFiles.difficultyFiles["ExpertStandard.dat"]["_events"] is events
+    assert len(mapFiles.modifiedDifficultyFiles) == 0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_randomNotes(seed: int) -> None:
+    randomGenerator = random.Random(seed)
+    notes = []
+    time = randomGenerator.choice([0, 0.5, 1])
+    for _ in range(randomGenerator.randint(1, 300)):
+        if randomGenerator.random() < 0.6:
+            time += randomGenerator.choice([0, 0.25, 0.5, 1, 1 / 3, 2, 2.0000000001, 4, 0.1])
+        noteTime = int(time) if float(time).is_integer() and randomGenerator.random() < 0.5 else time
+        notes.append(createNote(noteTime, randomGenerator.randint(-4, 3), randomGenerator.choice([0, 1, 0, 1, 3])))
+    if randomGenerator.random() < 0.3:
+        randomGenerator.shuffle(notes)
+    assertSameEvents(notes)
@@ -0,0 +1,119 @@
+"""
+TheNexusAvenger
+
+Tests resolving the BeatSaver download URLs against the local stand-in server.
+"""
+
+import os
+import pytest
+import zipfile
+from benchmark.StandInServer import StandInServer
+from data.Database import Database
+from data.Song import Song
+from process.http import BeatSaver
+from typing import List
+
+MISSING_MAP_ID = "dead"
+
+
+def createSongs(mapIds: List[str], downloadsPath: str) -> List[Song]:
+    """Creates the songs of BeatSaver maps.
+
+    :param mapIds: BeatSaver ids of the maps.
+    :param downloadsPath: Directory to download the maps to.
+    :return: The songs of the maps.
+    """
+
+    songs = []
+    for mapId in mapIds:
+        song = Song()
+        song.mapSource = "BeatSaver"
+        song.artist = "Artist"
+        song.songName = "Song " + mapId
+        song.songSubName = ""
+        song.beatSaverKey = mapId
+        song.mapDownloadPath = os.path.join(downloadsPath, mapId + ".zip")
+        songs.append(song)
+    return songs
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> StandInServer:
+    """Starts the stand-in server and uses it for the BeatSaver requests.
+    """
+
+    server = StandInServer(notes=10, missingMapIds=[MISSING_MAP_ID])
+    monkeypatch.setattr(BeatSaver, "BEATSAVER_API_URL", server.start())
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def database(tmp_path) -> Database:
+    """Creates a temporary database.
+    """
+
+    database = Database(os.path.join(str(tmp_path), "database.sqlite"))
+    yield database
+    database.close()
+
+
+def test_getDownloadUrlsBatchesRequests(server: StandInServer, database: Database, tmp_path) -> None:
+    mapIds = [format(i + 1, "x") for i in range(120)]
+    songs = createSongs(mapIds, str(tmp_path))
+
+    # The maps are requested in batches.
+    downloadUrls, failedIds = BeatSaver.getDownloadUrls(songs, database)
+    assert server.requestCounts["BeatSaverApi"] == 3
+    assert len(failedIds) == 0
+    assert sorted(downloadUrls.keys()) == sorted(mapIds)
+
+    # The cached download URLs are not requested again.
+    downloadUrls, failedIds = BeatSaver.getDownloadUrls(songs, database)
+    assert server.requestCounts["BeatSaverApi"] == 3
+    assert sorted(downloadUrls.keys()) == sorted(mapIds)
+
+
+def test_getDownloadUrlsMissingMap(server: StandInServer, database: Database, tmp_path) -> None:
+    mapIds = [format(i + 1, "x") for i in range(9)] + [MISSING_MAP_ID]
+    songs = createSongs(mapIds, str(tmp_path))
+
+    # The failed batch is requested one map at a time and only the missing map fails.
+    downloadUrls, failedIds = BeatSaver.getDownloadUrls(songs, database)
+    assert server.requestCounts["BeatSaverApi"] == 1 + len(mapIds)
+    assert list(failedIds.keys()) == [MISSING_MAP_ID]
+    assert sorted(downloadUrls.keys()) == sorted(mapIds[:-1])
+
+    # The missing map is not cached, so it is requested again.
+    downloadUrls, failedIds = BeatSaver.getDownloadUrls(songs, database)
+    assert server.requestCounts["BeatSaverApi"] == 2 + len(mapIds)
+    assert list(failedIds.keys()) == [MISSING_MAP_ID]
+
+
+def test_clearDownloadUrls(server: StandInServer, database: Database, tmp_path) -> None:
+    songs = createSongs(["1", "2"], str(tmp_path))
+    BeatSaver.getDownloadUrls(songs, database)
+    assert server.requestCounts["BeatSaverApi"] == 1
+
+    # The cleared download URL is requested again.
+    BeatSaver.clearDownloadUrls(["1"], database)
+    downloadUrls, failedIds = BeatSaver.getDownloadUrls(songs, database)
+    assert server.requestCounts["BeatSaverApi"] == 2
+    assert sorted(downloadUrls.keys()) == ["1", "2"]
+
+
+def test_downloadMapsRateLimit(monkeypatch: pytest.MonkeyPatch, database: Database, tmp_path) -> None:
+    server = StandInServer(notes=10, rateLimitRequests=3, rateLimitWindow=0.5, rateLimitDownloads=True)
+    try:
+        monkeypatch.setattr(BeatSaver, "BEATSAVER_API_URL", server.start())
+        songs = createSongs([format(i + 1, "x") for i in range(8)], str(tmp_path))
+        downloadUrls, _ = BeatSaver.getDownloadUrls(songs, database)
+
+        # The rate limited downloads are retried after the rate limit resets.
+        failedDownloads = BeatSaver.downloadMaps(songs, 4, downloadUrls)
+        assert len(failedDownloads) == 0
+        assert server.requestCounts["BeatSaverRateLimited"] > 0
+        for song in songs:
+            assert zipfile.is_zipfile(song.mapDownloadPath)
+    finally:
+        server.stop()
@@ -0,0 +1,62 @@
+"""
+TheNexusAvenger
+
+Tests that the processing steps report the difficulty files they change.
+"""
+
+import os
+import pickle
+import pytest
+from benchmark import SyntheticMaps
+from data.MapFileSet import MapFileSet
+from process.ProcessMap import BEAT_SAGE_PROCESS_STEPS, BEATSAVER_PROCESS_STEPS, processMap, processMapWithLogs
+from process.ProcessStep import DIFFICULTY_FILES, ProcessStep
+
+
+def moveNotes(mapFiles: MapFileSet) -> None:
+    """Moves the notes of V2 difficulty files without reporting the changed files.
+
+    :param mapFiles: Map to process.
+    """
+
+    for difficultyData in mapFiles.difficultyFiles.values():
+        for note in difficultyData["_notes"]:
+            note["_time"] += 1
+
+
+def failStep(mapFiles: MapFileSet) -> None:
+    """Fails processing a map after logging.
+
+    :param mapFiles: Map to process.
+    """
+
+    print("\t\tFailing " + mapFiles.getMapName())
+    raise ValueError("Step failed.")
+
+
+@pytest.mark.parametrize("asZip", [True, False])
+def test_stepsReportModifiedDifficultyFiles(tmp_path, asZip: bool) -> None:
+    songs = SyntheticMaps.createSongs(os.path.join(str(tmp_path), "Downloads"), 3, notes=100, events=0, asZip=asZip)
+    processSteps = BEATSAVER_PROCESS_STEPS if asZip else BEAT_SAGE_PROCESS_STEPS
+    for song in songs:
+        fileRecords = processMap(song, os.path.join(str(tmp_path), "Maps"), processSteps, verifyDifficultyFiles=True)[0]
+        processMap(song, os.path.join(str(tmp_path), "Maps"), processSteps, fileRecords, verifyDifficultyFiles=True)
+
+
+def test_unreportedDifficultyFileChanges(tmp_path) -> None:
+    song = SyntheticMaps.createSongs(os.path.join(str(tmp_path), "Downloads"), 1, formatVersions=["V2"], notes=100, events=10)[0]
+    processSteps = [ProcessStep(moveNotes, 1, reads=[DIFFICULTY_FILES], writes=[DIFFICULTY_FILES])]
+    with pytest.raises(AssertionError, match="moveNotes"):
+        processMap(song, os.path.join(str(tmp_path), "Maps"), processSteps, verifyDifficultyFiles=True)
+
+
+def test_processMapWithLogsFailure(tmp_path) -> None:
+    song = SyntheticMaps.createSongs(os.path.join(str(tmp_path), "Downloads"), 1, notes=10)[0]
+    processSteps = [ProcessStep(failStep, 1, reads=[], writes=[])]
+    with pytest.raises(ValueError) as errorInfo:
+        processMapWithLogs(song, os.path.join(str(tmp_path), "Maps"), processSteps)
+
+    # The partial log is stored with the error so the main process can print it after it is returned by the worker process.
+    error = pickle.loads(pickle.dumps(errorInfo.value))
+    assert "\tProcessing " in error.processingLog
+    assert "\t\tFailing " in error.processingLog